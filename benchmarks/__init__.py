@@ -0,0 +1 @@
+"""Benchmark suite for the poetry_up package."""
@@ -0,0 +1,180 @@
+"""Run the benchmarks and store the results as JSON.
+
+Usage::
+
+    python -m benchmarks [--output FILE] [--compare FILE] [--sizes 10,100,1000]
+"""
+import argparse
+import contextlib
+from dataclasses import asdict, dataclass
+import datetime
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from poetry_up import poetry, update
+from . import synthetic, tools
+
+
+@dataclass
+class Result:
+    """Timings of a benchmark, in seconds."""
+
+    name: str
+    size: int
+    repeat: int
+    min: float
+    median: float
+
+
+def measure(
+    name: str,
+    size: int,
+    function: Callable[[], None],
+    repeat: int,
+    setup: Callable[[], None] = lambda: None,
+) -> Result:
+    """Measure the function, calling setup before each repetition."""
+    timings = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return Result(name, size, repeat, min(timings), statistics.median(timings))
+
+
+@contextlib.contextmanager
+def project(size: int) -> Iterator[Path]:
+    """Create a synthetic project with fake tools on PATH, and enter it."""
+    cwd = Path.cwd()
+    path = os.environ["PATH"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        tools.install(root / "bin", synthetic.show_outdated_output(size))
+        synthetic.write_project(root, size)
+
+        os.environ["PATH"] = os.pathsep.join([str(root / "bin"), path])
+        os.chdir(root)
+        try:
+            yield root
+        finally:
+            os.chdir(cwd)
+            os.environ["PATH"] = path
+
+
+def benchmark_project(size: int, repeat: int) -> List[Result]:
+    """Run the benchmarks for a synthetic project of the given size."""
+    results = []
+
+    with project(size) as root:
+        pyproject = (root / "pyproject.toml").read_text()
+        packages = synthetic.packages(size)
+
+        def restore() -> None:
+            (root / "pyproject.toml").write_text(pyproject)
+
+        def show_outdated() -> None:
+            list(poetry.show_outdated())
+
+        def update_constraints() -> None:
+            config = poetry._Config()
+            for package in packages:
+                config.update_constraint(package)
+
+        options = update.Options(
+            latest=True,
+            install=False,
+            commit=True,
+            push=False,
+            merge_request=False,
+            pull_request=False,
+            upstream="master",
+            remote="origin",
+            dry_run=False,
+            packages=(),
+        )
+
+        def run_updater() -> None:
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    update.Updater(options).run()
+
+        results.append(measure("show_outdated", size, show_outdated, repeat))
+        results.append(
+            measure("update_constraint", size, update_constraints, repeat, restore)
+        )
+        results.append(measure("updater_run", size, run_updater, repeat, restore))
+
+    return results
+
+
+def benchmark_startup(repeat: int) -> Result:
+    """Measure the startup time of the console script."""
+
+    def start() -> None:
+        subprocess.run(  # noqa: S603
+            [sys.executable, "-m", "poetry_up", "--version"],
+            check=True,
+            capture_output=True,
+        )
+
+    return measure("startup", 0, start, repeat)
+
+
+def compare(results: List[Result], baseline: List[Dict[str, Any]]) -> None:
+    """Print the ratio of each median to the baseline median."""
+    medians = {(entry["name"], entry["size"]): entry["median"] for entry in baseline}
+    for result in results:
+        previous: Optional[float] = medians.get((result.name, result.size))
+        ratio = f"{result.median / previous:.2f}x" if previous else "n/a"
+        print(f"{result.name:20} {result.size:>5} {result.median:10.4f}s  {ratio}")
+
+
+def main() -> None:
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+
+    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    results = [benchmark_startup(args.repeat)]
+    for size in map(int, args.sizes.split(",")):
+        results.extend(benchmark_project(size, args.repeat))
+
+    output = args.output or Path(
+        ".benchmarks", f"{timestamp.strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "timestamp": timestamp.isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": [asdict(result) for result in results],
+            },
+            indent=2,
+        )
+    )
+
+    if args.compare is not None:
+        compare(results, json.loads(args.compare.read_text())["results"])
+    else:
+        for result in results:
+            print(f"{result.name:20} {result.size:>5} {result.median:10.4f}s")
+
+
+if __name__ == "__main__":
+    main()
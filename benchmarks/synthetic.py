@@ -0,0 +1,81 @@
+"""Synthetic Poetry projects."""
+from pathlib import Path
+from typing import List
+
+from poetry_up import poetry
+
+
+def packages(size: int) -> List[poetry.Package]:
+    """Return outdated packages for a project with the given number of dependencies."""
+    return [
+        poetry.Package(f"package-{number:04}", "1.0.0", "1.1.0")
+        for number in range(size)
+    ]
+
+
+def write_project(directory: Path, size: int) -> None:
+    """Write ``pyproject.toml`` and ``poetry.lock`` for a synthetic project.
+
+    Half of the dependencies are declared as strings, the other half as
+    tables. Every tenth dependency is a development dependency.
+
+    Args:
+        directory: The project directory.
+        size: The number of dependencies.
+    """
+    dependencies = ['python = "^3.8"']
+    dev_dependencies: List[str] = []
+
+    for number, package in enumerate(packages(size)):
+        if number % 2:
+            line = f'{package.name} = {{version = "^{package.old_version}"}}'
+        else:
+            line = f'{package.name} = "^{package.old_version}"'
+        (dev_dependencies if number % 10 == 9 else dependencies).append(line)
+
+    (directory / "pyproject.toml").write_text(
+        "\n".join(
+            [
+                "[tool.poetry]",
+                'name = "synthetic"',
+                'version = "0.1.0"',
+                'description = ""',
+                'authors = ["Benchmark <benchmark@example.com>"]',
+                "",
+                "[tool.poetry.dependencies]",
+                *dependencies,
+                "",
+                "[tool.poetry.dev-dependencies]",
+                *dev_dependencies,
+                "",
+            ]
+        )
+    )
+
+    entries = [
+        "\n".join(
+            [
+                "[[package]]",
+                f'name = "{package.name}"',
+                f'version = "{package.old_version}"',
+                'description = ""',
+                'category = "main"',
+                "optional = false",
+                'python-versions = "*"',
+                "",
+            ]
+        )
+        for package in packages(size)
+    ]
+    (directory / "poetry.lock").write_text(
+        "\n".join([*entries, "[metadata]", 'content-hash = "0"', ""])
+    )
+
+
+def show_outdated_output(size: int) -> str:
+    """Return the output of ``poetry show --outdated`` for a synthetic project."""
+    return "".join(
+        f"{package.name} {package.old_version} {package.new_version}"
+        " Synthetic package\n"
+        for package in packages(size)
+    )
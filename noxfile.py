@@ -12,7 +12,7 @@ from nox.sessions import Session
 package = "poetry_up"
 python_versions = ["3.8"]
 nox.options.sessions = "lint", "safety", "mypy", "tests"
-locations = "src", "tests", "noxfile.py", "docs/conf.py"
+locations = "src", "tests", "benchmarks", "noxfile.py", "docs/conf.py"
 
 
 class Poetry:
@@ -165,6 +165,13 @@ def tests(session: Session) -> None:
     session.run("pytest", *args)
 
 
+@nox.session(python="3.8")
+def benchmarks(session: Session) -> None:
+    """Run the benchmark suite."""
+    install_package(session)
+    session.run("python", "-m", "benchmarks", *session.posargs)
+
+
 @nox.session(python=python_versions)
 def typeguard(session: Session) -> None:
     """Runtime type checking using Typeguard."""
@@ -1,8 +1,18 @@
 """Upgrade dependencies using Poetry."""
-from importlib.metadata import PackageNotFoundError, version
+from typing import Any
 
 
-try:
-    __version__ = version(__name__)
-except PackageNotFoundError:  # pragma: no cover
-    __version__ = "unknown"
+def __getattr__(name: str) -> Any:
+    """Return the version, reading the package metadata on first access."""
+    if name != "__version__":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        value = version(__name__)
+    except PackageNotFoundError:  # pragma: no cover
+        value = "unknown"
+
+    globals()["__version__"] = value
+    return value
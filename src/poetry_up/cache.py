@@ -0,0 +1,120 @@
+"""On-disk cache."""
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Any, Optional
+
+
+def cache_directory() -> Path:
+    """Return the cache directory of the program."""
+    root = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(root) / "poetry-up"
+
+
+class Cache:
+    """Cache storing JSON values in files, with a time-to-live.
+
+    Args:
+        directory: The directory holding the cache entries.
+        ttl: The number of seconds after which entries expire.
+    """
+
+    def __init__(self, directory: Path, ttl: float) -> None:
+        """Constructor."""
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _expired(self, path: Path) -> bool:
+        return path.stat().st_mtime + self.ttl < time.time()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value for the given key, or None if not cached."""
+        path = self._path(key)
+        try:
+            if self._expired(path):
+                path.unlink()
+                return None
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store the value under the given key, and evict expired entries."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.evict()
+
+        fd, name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, mode="w", encoding="utf-8") as io:
+            json.dump(value, io)
+        os.replace(name, self._path(key))
+
+    def evict(self) -> None:
+        """Remove expired entries."""
+        for path in self.directory.glob("*.json"):
+            try:
+                if self._expired(path):
+                    path.unlink()
+            except OSError:  # pragma: no cover
+                pass
+
+
+class OutcomeStore:
+    """Outcomes of package updates, stored in an SQLite database.
+
+    Outcomes are keyed by the project directory, the package and its target
+    version, and the project hash, so that they become irrelevant when the
+    lock file or the constraints change.
+
+    Args:
+        path: The database file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Constructor."""
+        import sqlite3
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(path))
+        with self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outcomes (
+                    project TEXT,
+                    package TEXT,
+                    version TEXT,
+                    project_hash TEXT,
+                    outcome TEXT,
+                    PRIMARY KEY (project, package, version, project_hash)
+                )
+                """
+            )
+
+    def get(
+        self, project: str, package: str, version: str, project_hash: str
+    ) -> Optional[str]:
+        """Return the recorded outcome of the package update, if any."""
+        row = self._connection.execute(
+            "SELECT outcome FROM outcomes WHERE project = ? AND package = ?"
+            " AND version = ? AND project_hash = ?",
+            (project, package, version, project_hash),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(
+        self, project: str, package: str, version: str, project_hash: str, outcome: str
+    ) -> None:
+        """Record the outcome of the package update."""
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?)",
+                (project, package, version, project_hash, outcome),
+            )
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
@@ -1,10 +1,29 @@
 """Command-line interface."""
 import os
+from pathlib import Path
 from typing import Tuple
 
 import click
 
-from . import __version__, update
+
+def _print_version(ctx: click.Context, param: click.Parameter, value: bool) -> None:
+    """Print the version and exit.
+
+    The version is looked up only when requested, because reading the package
+    metadata is slow compared to the remaining startup time.
+
+    Args:
+        ctx: The Click context.
+        param: The ``--version`` option.
+        value: True if the option was passed.
+    """
+    if not value or ctx.resilient_parsing:
+        return
+
+    from . import __version__
+
+    click.echo(f"{ctx.find_root().info_name}, version {__version__}")
+    ctx.exit()
 
 
 @click.command()  # noqa: C901
@@ -52,9 +71,105 @@ from . import __version__, update
     type=click.Path(exists=True, file_okay=False),
     help="Change to directory DIR before performing any actions",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    metavar="N",
+    type=click.IntRange(min=0),
+    help="Update N packages in parallel, each in its own worktree (0 for all CPUs)."
+    " Parallel updates only change the lock file, and do not install.",
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--cache-ttl",
+    metavar="SECONDS",
+    type=click.FloatRange(min=0),
+    help="Cache outdated packages for SECONDS, keyed by the lock file (0 disables)",
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--native/--no-native",
+    help="Query the package index directly instead of running poetry show.",
+)
+@click.option(
+    "--pipeline/--no-pipeline",
+    help="Push and open pull requests in the background during the next update.",
+)
+@click.option(
+    "--group/--no-group",
+    help="Update all packages on a single branch, using a single resolve.",
+)
+@click.option(
+    "--profile",
+    metavar="FILE",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write timings of actions and commands to FILE, in Chrome trace format.",
+)
+@click.option(
+    "--checkout/--no-checkout",
+    help="Switch branches in the working tree, or commit using Git plumbing.",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "--batch-push/--no-batch-push",
+    help="Push all update branches with a single git push at the end.",
+)
+@click.option(
+    "--watch",
+    metavar="SECONDS",
+    type=click.FloatRange(min=0),
+    help="Stay resident, updating newly outdated packages every SECONDS and"
+    " whenever poetry.lock changes (0 runs once).",
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "--recursive",
+    is_flag=True,
+    help="Update every Poetry project below the current directory, in parallel"
+    " with --jobs and --no-checkout.",
+)
+@click.option(
+    "--retry-refused",
+    is_flag=True,
+    help="Retry updates refused by Poetry before, even if the project is unchanged.",
+)
+@click.option(
+    "--prefetch/--no-prefetch",
+    help="Download new versions concurrently into the cache of Poetry before"
+    " installing.",
+)
+@click.option(
+    "--defer-install/--no-defer-install",
+    help="Lock each update only, and install once at the end of the run."
+    " Requires --no-commit.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Resume the previous run, skipping the steps it completed.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "ndjson"]),
+    help="Print progress as text, or as one JSON event per line and package.",
+    default="text",
+    show_default=True,
+)
 @click.option("--dry-run", "-n", is_flag=True, help="Just show what would be done.")
 @click.argument("packages", nargs=-1)
-@click.version_option(version=__version__)
+@click.option(
+    "--version",
+    help="Show the version and exit.",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=_print_version,
+)
 def main(  # noqa: C901
     latest: bool,
     install: bool,
@@ -64,25 +179,68 @@ def main(  # noqa: C901
     pull_request: bool,
     upstream: str,
     remote: str,
+    jobs: int,
+    cache_ttl: float,
+    native: bool,
+    pipeline: bool,
+    group: bool,
+    checkout: bool,
+    batch_push: bool,
+    watch: float,
+    recursive: bool,
+    retry_refused: bool,
+    prefetch: bool,
+    defer_install: bool,
+    resume: bool,
+    output_format: str,
     dry_run: bool,
     packages: Tuple[str, ...],
     cwd: str = None,
+    profile: str = None,
 ) -> None:
     """Upgrade dependencies using Poetry."""
+    from . import projects, update
+
     if cwd is not None:
         os.chdir(cwd)
 
     options = update.Options(
-        latest,
-        install,
-        commit,
-        push,
-        merge_request,
-        pull_request,
-        upstream,
-        remote,
-        dry_run,
-        packages,
+        latest=latest,
+        install=install,
+        commit=commit,
+        push=push,
+        merge_request=merge_request,
+        pull_request=pull_request,
+        upstream=upstream,
+        remote=remote,
+        dry_run=dry_run,
+        packages=packages,
+        jobs=jobs,
+        cache_ttl=cache_ttl,
+        native=native,
+        pipeline=pipeline,
+        group=group,
+        profile=profile,
+        checkout=checkout,
+        batch_push=batch_push,
+        watch=watch,
+        retry_refused=retry_refused,
+        prefetch=prefetch,
+        output_format=output_format,
+        defer_install=defer_install,
+        resume=resume,
     )
+    if recursive:
+        if watch:
+            raise click.UsageError("--watch cannot be combined with --recursive")
+        if profile:
+            raise click.UsageError("--profile cannot be combined with --recursive")
+        projects.run(Path.cwd(), options)
+        return
+
     updater = update.Updater(options)
-    updater.run()
+
+    if watch:
+        updater.watch()
+    else:
+        updater.run()
@@ -0,0 +1,178 @@
+"""Format-preserving editor for version constraints in ``pyproject.toml``."""
+import re
+from typing import Dict, Optional, Tuple
+
+from .poetry import canonicalize_name, Package
+
+
+_HEADER_PATTERN = re.compile(r"\s*\[(?P<name>[^\[\]\"']+)\]\s*(?:#.*)?")
+_ARRAY_HEADER_PATTERN = re.compile(r"\s*\[\[")
+_KEY_PATTERN = re.compile(
+    r"\s*(?:(?P<bare>[A-Za-z0-9_-]+)"
+    r"|\"(?P<basic>[^\"\\]*)\""
+    r"|'(?P<literal>[^']*)')"
+    r"\s*=\s*"
+)
+_STRING_PATTERN = re.compile(
+    r"(?P<quote>[\"'])(?P<value>[^\"'\\]*)(?P=quote)\s*(?:#.*)?"
+)
+_INLINE_TABLE_PATTERN = re.compile(
+    r"\{(?P<body>(?:[^{}\[\]]|\[[^{}\[\]]*\])*)\}\s*(?:#.*)?"
+)
+_VERSION_PATTERN = re.compile(
+    r"(?:^|,)\s*(?:version|\"version\"|'version')\s*=\s*"
+    r"(?P<quote>[\"'])(?P<value>[^\"'\\]*)(?P=quote)"
+)
+_DEPENDENCY_TABLE_PATTERN = re.compile(
+    r"tool\.poetry\."
+    r"(?:dependencies|dev-dependencies|group\.[A-Za-z0-9_-]+\.dependencies)"
+)
+
+# Marker for dependencies which are declared in a way the editor does not
+# handle, such as sub-tables and multiple constraints.
+_COMPLEX = (-1, -1)
+
+Span = Optional[Tuple[int, int]]
+
+
+def _is_dependency_table(table: Optional[str]) -> bool:
+    return table is not None and bool(_DEPENDENCY_TABLE_PATTERN.fullmatch(table))
+
+
+class ConstraintEditor:
+    """Edit version constraints by rewriting only the version string.
+
+    The document is scanned line by line for dependency tables, recording the
+    position of each version string. Comments and formatting are preserved
+    exactly. Dependencies declared in other ways, such as sub-tables or lists
+    of constraints, are reported as unsupported, so that callers can fall
+    back to a full TOML parser.
+
+    Args:
+        text: The contents of ``pyproject.toml``.
+    """
+
+    def __init__(self, text: str) -> None:
+        """Constructor."""
+        self.text = text
+        self.changed = False
+        self._scan()
+
+    def _scan(self) -> None:  # noqa: C901
+        # Maps canonical names to the span of the version string, or None for
+        # dependencies without a version. The first declaration wins. Unknown
+        # constructs make lookups of undeclared names inconclusive.
+        self._index: Dict[str, Span] = {}
+        self._complete = True
+        table: Optional[str] = None
+        delimiter: Optional[str] = None
+        offset = 0
+
+        for line in self.text.splitlines(keepends=True):
+            start, offset = offset, offset + len(line)
+            content = line.rstrip("\r\n")
+
+            if delimiter is not None:
+                if content.count(delimiter) % 2:
+                    delimiter = None
+                continue
+
+            for quotes in ['"""', "'''"]:
+                if content.count(quotes) % 2:
+                    delimiter = quotes
+
+            if delimiter is not None and _is_dependency_table(table):
+                self._complete = False
+
+            if not content.strip() or content.lstrip().startswith("#"):
+                continue
+
+            if _ARRAY_HEADER_PATTERN.match(content):
+                table = None
+                continue
+
+            header = _HEADER_PATTERN.fullmatch(content)
+            if header is not None:
+                table = "".join(header["name"].split())
+                parent, _, name = table.rpartition(".")
+                if _DEPENDENCY_TABLE_PATTERN.fullmatch(parent):
+                    self._index.setdefault(canonicalize_name(name), _COMPLEX)
+                continue
+
+            if content.lstrip().startswith("["):
+                # A table header with quoted keys.
+                self._complete = False
+                table = None
+                continue
+
+            if not _is_dependency_table(table):
+                continue
+
+            key = _KEY_PATTERN.match(content)
+            if key is None:
+                self._complete = False
+                continue
+
+            name = key["bare"] or key["basic"] or key["literal"] or ""
+            span = self._find_version(content, key.end())
+            if span is not None and span != _COMPLEX:
+                span = (start + span[0], start + span[1])
+
+            self._index.setdefault(canonicalize_name(name), span)
+
+    @staticmethod
+    def _find_version(content: str, position: int) -> Span:
+        """Return the span of the version string within the line.
+
+        Returns None if the value is a table without a version, and
+        ``_COMPLEX`` if the value cannot be handled.
+
+        Args:
+            content: The line, without its line ending.
+            position: The start of the value within the line.
+
+        Returns:
+            The start and end of the version string.
+        """
+        string = _STRING_PATTERN.fullmatch(content, position)
+        if string is not None:
+            return string.span("value")
+
+        table = _INLINE_TABLE_PATTERN.fullmatch(content, position)
+        if table is None or ("'" in table["body"] and '"' in table["body"]):
+            return _COMPLEX
+
+        version = _VERSION_PATTERN.search(table["body"])
+        if version is None:
+            return None
+
+        offset = table.start("body")
+        return offset + version.start("value"), offset + version.end("value")
+
+    def update_constraint(self, package: Package) -> bool:
+        """Update the constraint for the given package.
+
+        Args:
+            package: The package to update.
+
+        Returns:
+            True if the constraint was updated, or if the package is known to
+            have no version constraint. False if the editor cannot handle the
+            declaration, and the caller needs to fall back to a TOML parser.
+        """
+        name = canonicalize_name(package.name)
+        if name not in self._index:
+            return self._complete
+
+        span = self._index[name]
+        if span is None:
+            return True
+
+        if span == _COMPLEX:
+            return False
+
+        start, end = span
+        self.text = f"{self.text[:start]}^{package.new_version}{self.text[end:]}"
+        self.changed = True
+        self._scan()
+        return True
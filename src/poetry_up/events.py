@@ -0,0 +1,52 @@
+"""Progress events in newline-delimited JSON."""
+import json
+import time
+from typing import Any, Iterable, Optional
+
+import click
+
+from .poetry import Package
+
+
+def emit(event: str, **fields: Any) -> None:
+    """Write the event to standard output, as a single line of JSON.
+
+    The line is written and flushed in one go, so that events from worker
+    processes sharing standard output are not interleaved.
+
+    Args:
+        event: The name of the event, such as ``committed``.
+        fields: Additional information about the event.
+    """
+    click.echo(json.dumps({"event": event, "time": time.time(), **fields}))
+
+
+def report(
+    output_format: str,
+    event: str,
+    text: Optional[str] = None,
+    packages: Iterable[Package] = (),
+    **fields: Any,
+) -> None:
+    """Report an event for each package, or print the text.
+
+    Args:
+        output_format: The output format, either ``text`` or ``ndjson``.
+        event: The name of the event.
+        text: The text printed in text format (optional).
+        packages: The packages the event applies to.
+        fields: Additional information written in NDJSON format.
+    """
+    if output_format != "ndjson":
+        if text is not None:
+            click.echo(text)
+        return
+
+    for package in packages:
+        emit(
+            event,
+            package=package.name,
+            old_version=package.old_version,
+            new_version=package.new_version,
+            **fields,
+        )
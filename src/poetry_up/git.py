@@ -1,13 +1,19 @@
 """Git wrapper."""
 from dataclasses import dataclass
+import os
 import subprocess  # noqa: S404
-from typing import Iterable
+import tempfile
+from typing import Dict, Iterable, Optional, Tuple
 
+from . import tracing
 
-def git(*args: str, check: bool = True) -> subprocess.CompletedProcess:
+
+def git(
+    *args: str, check: bool = True, env: Dict[str, str] = None
+) -> subprocess.CompletedProcess:
     """Invoke git."""
-    return subprocess.run(  # noqa: S603, S607
-        ["git", *args], check=check, capture_output=True, text=True,
+    return tracing.run(  # noqa: S607
+        ["git", *args], check=check, capture_output=True, text=True, env=env,
     )
 
 
@@ -47,12 +53,132 @@ def switch(branch: str, create: bool = False, location: str = None) -> None:
         git("switch", branch)
 
 
+def detach() -> None:
+    """Detach HEAD at the current commit."""
+    git("switch", "--detach")
+
+
+def add_worktree(
+    path: str, branch: str, create: bool = False, location: str = None
+) -> None:
+    """Add a linked working tree with the specified branch checked out.
+
+    Args:
+        path: The directory for the new working tree.
+        branch: The branch to be checked out.
+        create: Create the branch.
+        location: The location at which the branch should be created.
+    """
+    if create and location is not None:
+        git("worktree", "add", "-b", branch, path, location)
+    elif create:
+        git("worktree", "add", "-b", branch, path)
+    else:
+        git("worktree", "add", path, branch)
+
+
+def remove_worktree(path: str) -> None:
+    """Remove the linked working tree at the specified path."""
+    git("worktree", "remove", "--force", path)
+
+
 def resolve_branch(branch: str) -> str:
     """Return the SHA1 hash for the given branch."""
     process = git("rev-parse", f"refs/heads/{branch}")
     return process.stdout.strip()
 
 
+def resolve(revision: str) -> str:
+    """Return the SHA1 hash of the commit for the given revision."""
+    process = git("rev-parse", "--verify", f"{revision}^{{commit}}")
+    return process.stdout.strip()
+
+
+def read_files(revision: str, paths: Iterable[str]) -> Dict[str, bytes]:
+    """Return the contents of files at the given revision.
+
+    The files are read using a single ``git cat-file`` invocation. Paths are
+    relative to the current directory. Files missing from the revision are
+    omitted.
+
+    Args:
+        revision: The revision to read the files from.
+        paths: The files to be read.
+
+    Returns:
+        A mapping of paths to file contents.
+    """
+    paths = list(paths)
+    requests = "".join(f"{revision}:./{path}\n" for path in paths)
+    process = tracing.run(  # noqa: S607
+        ["git", "cat-file", "--batch"],
+        input=requests.encode(),
+        check=True,
+        capture_output=True,
+    )
+
+    files = {}
+    output = process.stdout
+    position = 0
+    for path in paths:
+        end = output.index(b"\n", position)
+        header = output[position:end].split()
+        position = end + 1
+        if header[-1] == b"missing":
+            continue
+        size = int(header[2])
+        files[path] = output[position : position + size]
+        position += size + 1
+
+    return files
+
+
+def commit_files(parent: str, paths: Iterable[str], message: str) -> str:
+    """Create a commit with the given files from the working tree.
+
+    The commit is created using a temporary index, without touching the index
+    or HEAD of the repository. Paths are relative to the current directory.
+
+    Args:
+        parent: The SHA1 hash of the parent commit.
+        paths: The files to be committed.
+        message: The commit message.
+
+    Returns:
+        The SHA1 hash of the new commit.
+    """
+    paths = list(paths)
+    prefix = git("rev-parse", "--show-prefix").stdout.strip()
+    blobs = git("hash-object", "-w", "--", *paths).stdout.split()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, "GIT_INDEX_FILE": os.path.join(directory, "index")}
+        git("read-tree", parent, env=env)
+        entries = [
+            argument
+            for path, blob in zip(paths, blobs)
+            for argument in ["--cacheinfo", f"100644,{blob},{prefix}{path}"]
+        ]
+        git("update-index", "--add", *entries, env=env)
+        tree = git("write-tree", env=env).stdout.strip()
+
+    process = git("commit-tree", tree, "-p", parent, "-m", message)
+    return process.stdout.strip()
+
+
+def update_ref(branch: str, sha: str, old: str = None) -> None:
+    """Point the branch to the given commit, creating it if required.
+
+    If ``old`` is None, the branch is expected not to exist.
+
+    Args:
+        branch: The branch to be updated.
+        sha: The SHA1 hash of the commit.
+        old: The expected SHA1 hash of the branch.
+    """
+    git("update-ref", f"refs/heads/{branch}", sha, old or "")
+
+
 def remove_branch(branch: str) -> None:
     """Remove the specified branch."""
     git("branch", "--delete", branch)
@@ -68,6 +194,135 @@ def commit(message: str) -> None:
     git("commit", f"--message={message}")
 
 
+class RefIndex:
+    """In-memory index of the local branches.
+
+    The index is read using a single ``git for-each-ref`` invocation. Its
+    methods wrap the module functions that switch, create, commit to, and
+    remove branches, and update the index accordingly. The checked out branch
+    is tracked for the working tree of the current process. Commit hashes which
+    are not known are resolved on demand.
+
+    Args:
+        branches: Mapping of branch names to commit hashes, or None if unknown.
+        head: The checked out branch, or ``HEAD`` if HEAD is detached.
+    """
+
+    def __init__(self, branches: Dict[str, Optional[str]], head: str) -> None:
+        """Constructor."""
+        self._branches = branches
+        self._head = head
+
+    @classmethod
+    def load(cls) -> "RefIndex":
+        """Read the local branches from the repository."""
+        process = git(
+            "for-each-ref",
+            "--format=%(objectname)%09%(HEAD)%09%(refname:lstrip=2)",
+            "refs/heads",
+        )
+        branches: Dict[str, Optional[str]] = {}
+        head = "HEAD"
+        for line in process.stdout.splitlines():
+            sha, marker, branch = line.split("\t", 2)
+            branches[branch] = sha
+            if marker == "*":
+                head = branch
+        return cls(branches, head)
+
+    def current_branch(self) -> str:
+        """Return the checked out branch."""
+        return self._head
+
+    def branch_exists(self, branch: str) -> bool:
+        """Return True if the branch exists."""
+        return branch in self._branches
+
+    def resolve_branch(self, branch: str) -> str:
+        """Return the SHA1 hash for the given branch."""
+        sha = self._branches.get(branch)
+        if sha is None:
+            sha = self._branches[branch] = resolve_branch(branch)
+        return sha
+
+    def resolve(self, revision: str) -> str:
+        """Return the SHA1 hash of the commit for the given revision."""
+        if revision in self._branches:
+            return self.resolve_branch(revision)
+        return resolve(revision)
+
+    def _create(self, branch: str, location: Optional[str]) -> None:
+        if location is None:
+            location = self._head
+        self._branches[branch] = self._branches.get(location)
+
+    def switch(self, branch: str, create: bool = False, location: str = None) -> None:
+        """Switch to the specified branch.
+
+        Args:
+            branch: The branch to be switched to.
+            create: Create the branch.
+            location: The location at which the branch should be created.
+        """
+        switch(branch, create=create, location=location)
+        if create:
+            self._create(branch, location)
+        self._head = branch
+
+    def add_worktree(
+        self, path: str, branch: str, create: bool = False, location: str = None
+    ) -> None:
+        """Add a linked working tree for the branch.
+
+        The branch is recorded as checked out, as the caller is expected to
+        change to the new working tree.
+
+        Args:
+            path: The directory for the new working tree.
+            branch: The branch to be checked out.
+            create: Create the branch.
+            location: The location at which the branch should be created.
+        """
+        add_worktree(path, branch, create=create, location=location)
+        if create:
+            self._create(branch, location)
+        self._head = branch
+
+    def detach(self) -> None:
+        """Detach HEAD at the current commit."""
+        detach()
+        self._head = "HEAD"
+
+    def remove_branch(self, branch: str) -> None:
+        """Remove the specified branch."""
+        remove_branch(branch)
+        del self._branches[branch]
+
+    def commit(self, message: str) -> None:
+        """Create a commit on the checked out branch."""
+        commit(message)
+        if self._head in self._branches:
+            self._branches[self._head] = None
+
+    def commit_files(
+        self, branch: str, location: str, paths: Iterable[str], message: str
+    ) -> None:
+        """Commit files from the working tree to a branch, without switching.
+
+        If the branch does not exist, it is created at the given location.
+
+        Args:
+            branch: The branch to commit to.
+            location: The location at which the branch should be created.
+            paths: The files to be committed.
+            message: The commit message.
+        """
+        old = self.resolve_branch(branch) if self.branch_exists(branch) else None
+        sha = commit_files(old or self.resolve(location), paths, message)
+        update_ref(branch, sha, old)
+        self._branches[branch] = sha
+
+
 @dataclass
 class MergeRequest:
     """Merge request with a title and a description."""
@@ -96,3 +351,37 @@ def push(remote: str, branch: str, merge_request: MergeRequest = None) -> None:
         )
     else:
         git("push", "--set-upstream", remote, branch)
+
+
+def push_branches(remote: str, branches: Iterable[str]) -> Dict[str, Tuple[bool, str]]:
+    """Push the branches to the remote, using a single connection.
+
+    Args:
+        remote: The remote to push to.
+        branches: The branches to be pushed.
+
+    Returns:
+        A mapping of each branch to whether it was pushed, and the status
+        reported by Git. If Git did not report a status for a branch, the
+        status is the error message.
+    """
+    branches = list(branches)
+    process = git(
+        "push", "--porcelain", "--set-upstream", remote, *branches, check=False
+    )
+
+    results = {}
+    for line in process.stdout.splitlines():
+        fields = line.split("\t")
+        if len(fields) != 3:
+            continue
+        flag, refs, summary = fields
+        source = refs.split(":", 1)[0]
+        branch = source[len("refs/heads/") :]
+        results[branch] = (flag != "!", summary)
+
+    error = process.stderr.strip() or f"git push exited with {process.returncode}"
+    for branch in branches:
+        results.setdefault(branch, (False, error))
+
+    return results
@@ -1,21 +1,57 @@
 """GitHub wrapper."""
 import subprocess  # noqa: S404
+from typing import Set
 
+from . import tracing
 
-def pull_request_exists(branch: str) -> bool:
-    """Return True if a pull request exists for the given branch."""
-    process = subprocess.run(  # noqa: S603, S607
-        ["gh", "pr", "list"],
+
+def open_pull_requests() -> Set[str]:
+    """Return the head branches of all open pull requests.
+
+    The pull requests are retrieved in a single paginated API query.
+
+    Returns:
+        The head branches of the open pull requests.
+    """
+    process = tracing.run(  # noqa: S607
+        [
+            "gh",
+            "api",
+            "--paginate",
+            "--jq=.[].head.ref",
+            "repos/{owner}/{repo}/pulls?state=open&per_page=100",
+        ],
         check=True,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
     )
-    return branch in process.stdout
+    return set(process.stdout.splitlines())
+
 
+def pull_request_exists(branch: str) -> bool:
+    """Return True if a pull request exists for the given branch."""
+    return branch in open_pull_requests()
 
-def create_pull_request(title: str, body: str) -> None:
-    """Create a pull request for the checked out branch."""
-    subprocess.run(  # noqa: S603, S607
-        ["gh", "pr", "create", f"--title={title}", f"--body={body}"], check=True
+
+def create_pull_request(title: str, body: str, head: str = None) -> str:
+    """Create a pull request.
+
+    By default, the pull request is opened for the checked out branch.
+
+    Args:
+        title: The title of the pull request.
+        body: The description of the pull request.
+        head: The branch containing the changes.
+
+    Returns:
+        The URL of the pull request.
+    """
+    options = [f"--head={head}"] if head is not None else []
+    process = tracing.run(  # noqa: S607
+        ["gh", "pr", "create", f"--title={title}", f"--body={body}", *options],
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
     )
+    return process.stdout.strip()
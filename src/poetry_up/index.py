@@ -0,0 +1,316 @@
+"""Package index client."""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import http.client
+import json
+from pathlib import Path
+import re
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import SplitResult, unquote, urljoin, urlsplit
+
+from . import lockfile, versions
+from .poetry import canonicalize_name, Package
+
+
+PYPI_URL = "https://pypi.org/simple/"
+
+_JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+_ACCEPT = f"{_JSON_CONTENT_TYPE}, text/html;q=0.1"
+_ANCHOR_PATTERN = re.compile(r"<a\s([^>]*)>([^<]*)</a>", re.IGNORECASE)
+_ARCHIVE_EXTENSIONS = (".whl", ".tar.gz", ".tar.bz2", ".tar.xz", ".zip", ".tgz")
+
+# Statuses indicating that the server is temporarily unable to respond.
+_TRANSIENT_STATUSES = {502, 503, 504}
+
+
+class RepositoryError(Exception):
+    """The package index returned an error."""
+
+
+def _distribution_version(filename: str, name: str) -> Optional[str]:
+    """Return the version from a distribution filename."""
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        return parts[1] if len(parts) >= 5 else None
+
+    for extension in _ARCHIVE_EXTENSIONS:
+        if filename.endswith(extension):
+            stem = filename[: -len(extension)]
+            break
+    else:
+        return None
+
+    # Source distributions are named {name}-{version}, and both may contain
+    # hyphens in legacy filenames. Split where the prefix matches the name.
+    for index, character in enumerate(stem):
+        if character == "-" and canonicalize_name(stem[:index]) == name:
+            return stem[index + 1 :]
+
+    return None
+
+
+def _with_hash(url: str, hashes: Dict[str, str]) -> str:
+    """Return the URL with a hash fragment, as given in PEP 503 pages.
+
+    The hash is taken from the ``hashes`` of a file in a PEP 691 response,
+    preferring SHA-256 like Poetry does.
+
+    Args:
+        url: The URL of the file.
+        hashes: The hashes of the file, keyed by the name of the algorithm.
+
+    Returns:
+        The URL, with a fragment unless it has one or no hash is supported.
+    """
+    if "#" in url:
+        return url
+
+    names = sorted(name for name in hashes if name in hashlib.algorithms_guaranteed)
+    if not names:
+        return url
+
+    name = "sha256" if "sha256" in names else names[0]
+    return f"{url}#{name}={hashes[name]}"
+
+
+class Index:
+    """Client for a simple repository API (PEP 503 and PEP 691).
+
+    HTTP connections are kept alive and reused, with one connection per host
+    for each thread. The available versions of each project are retrieved
+    only once. Requests failing with a transient server error are retried,
+    doubling the delay after each attempt.
+
+    Args:
+        url: The base URL of the simple repository.
+        timeout: The timeout for network operations, in seconds.
+        retries: The number of retries after a transient server error.
+        backoff: The delay before the first retry, in seconds.
+    """
+
+    def __init__(
+        self,
+        url: str = PYPI_URL,
+        timeout: float = 30,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ) -> None:
+        """Constructor."""
+        self.url = url if url.endswith("/") else f"{url}/"
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._local = threading.local()
+        self._releases: Dict[str, List[versions.Version]] = {}
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        connection = connections.get((scheme, netloc))
+        if connection is None:
+            factory = (
+                http.client.HTTPSConnection
+                if scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = connections[(scheme, netloc)] = factory(
+                netloc, timeout=self.timeout
+            )
+        return connection
+
+    def _get(self, url: str, redirects: int = 5) -> Tuple[int, str, bytes]:
+        """Retrieve the URL, and return status, content type, and body."""
+        parts = urlsplit(url)
+
+        if parts.scheme == "file":
+            path = Path(unquote(parts.path))
+            if path.is_dir():
+                path = path / "index.html"
+            if not path.exists():
+                return 404, "", b""
+            return 200, "text/html", path.read_bytes()
+
+        response, body = self._request(parts)
+        for attempt in range(self.retries):
+            if response.status not in _TRANSIENT_STATUSES:
+                break
+            time.sleep(self.backoff * 2 ** attempt)
+            response, body = self._request(parts)
+
+        location = response.getheader("Location")
+        if 300 <= response.status < 400 and location and redirects:
+            return self._get(urljoin(url, location), redirects - 1)
+
+        content_type = response.getheader("Content-Type", "")
+        return response.status, content_type, body
+
+    def _request(self, parts: SplitResult) -> Tuple[http.client.HTTPResponse, bytes]:
+        """Send a GET request, and return the response and its body."""
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        connection = self._connection(parts.scheme, parts.netloc)
+        try:
+            connection.request("GET", target, headers={"Accept": _ACCEPT})
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            # The server may have closed the kept-alive connection; retry once.
+            connection.close()
+            connection.request("GET", target, headers={"Accept": _ACCEPT})
+            response = connection.getresponse()
+            body = response.read()
+
+        return response, body
+
+    def download(self, url: str) -> bytes:
+        """Retrieve a file from the index.
+
+        Args:
+            url: The URL of the file.
+
+        Returns:
+            The contents of the file.
+
+        Raises:
+            RepositoryError: The index returned an error.
+        """
+        status, _, body = self._get(url)
+        if status != 200:
+            raise RepositoryError(f"{url}: HTTP status {status}")
+        return body
+
+    def files(self, name: str) -> List[Tuple[str, str, bool]]:
+        """Return the distribution files for a project.
+
+        Args:
+            name: The project name.
+
+        Returns:
+            A list of tuples with the filename, URL, and whether the file was
+            yanked. The URL has a fragment with the hash of the file, if the
+            index provides one. The list is empty if the project does not
+            exist.
+
+        Raises:
+            RepositoryError: The index returned an error.
+        """
+        url = urljoin(self.url, f"{canonicalize_name(name)}/")
+        status, content_type, body = self._get(url)
+
+        if status == 404:
+            return []
+
+        if status != 200:
+            raise RepositoryError(f"{url}: HTTP status {status}")
+
+        if content_type.startswith(_JSON_CONTENT_TYPE):
+            data = json.loads(body)
+            return [
+                (
+                    file["filename"],
+                    _with_hash(urljoin(url, file["url"]), file.get("hashes", {})),
+                    bool(file.get("yanked")),
+                )
+                for file in data.get("files", [])
+            ]
+
+        files = []
+        for match in _ANCHOR_PATTERN.finditer(body.decode("utf-8", "replace")):
+            attributes, filename = match.groups()
+            href = re.search(r'href\s*=\s*"([^"]*)"', attributes)
+            if href is not None:
+                yanked = "data-yanked" in attributes
+                files.append((filename.strip(), urljoin(url, href[1]), yanked))
+        return files
+
+    def releases(self, name: str) -> List[versions.Version]:
+        """Return the available versions of a project, excluding yanked files."""
+        canonical_name = canonicalize_name(name)
+        if canonical_name in self._releases:
+            return self._releases[canonical_name]
+
+        result = set()
+
+        for filename, _, yanked in self.files(name):
+            if yanked:
+                continue
+            text = _distribution_version(filename, canonical_name)
+            version = versions.parse(text) if text is not None else None
+            if version is not None:
+                result.add(version)
+
+        releases = self._releases[canonical_name] = sorted(result)
+        return releases
+
+
+def latest_version(
+    available: Iterable[versions.Version], current: versions.Version
+) -> Optional[versions.Version]:
+    """Return the latest version, if it is newer than the current version.
+
+    Pre-releases are only considered if the current version is a pre-release.
+
+    Args:
+        available: The available versions.
+        current: The current version.
+
+    Returns:
+        The latest version, or None if there is no newer version.
+    """
+    candidates = [
+        version
+        for version in available
+        if version > current and (current.is_prerelease or not version.is_prerelease)
+    ]
+    return max(candidates, default=None)
+
+
+def _find_update(index: Index, package: lockfile.LockedPackage) -> Optional[Package]:
+    current = versions.parse(package.version)
+    if current is None:
+        return None
+
+    latest = latest_version(index.releases(package.name), current)
+    if latest is None:
+        return None
+
+    return Package(package.name, package.version, str(latest))
+
+
+def show_outdated(
+    url: str = PYPI_URL,
+    packages: Iterable[lockfile.LockedPackage] = None,
+    max_workers: int = 16,
+    indexes: Dict[str, Index] = None,
+) -> Iterator[Package]:
+    """Yield outdated packages, querying the package index concurrently.
+
+    Args:
+        url: The URL of the default package index.
+        packages: The locked packages. By default, read from ``poetry.lock``.
+        max_workers: The maximum number of concurrent queries.
+        indexes: Index clients by URL, to share between calls (optional).
+
+    Yields:
+        The outdated packages, in the order of the lock file.
+    """
+    if packages is None:
+        packages = lockfile.read()
+
+    candidates = [package for package in packages if package.from_index]
+    if indexes is None:
+        indexes = {}
+    for source in {package.source_url or url for package in candidates}:
+        if source not in indexes:
+            indexes[source] = Index(source)
+
+    def find_update(package: lockfile.LockedPackage) -> Optional[Package]:
+        return _find_update(indexes[package.source_url or url], package)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for package in executor.map(find_update, candidates):
+            if package is not None:
+                yield package
@@ -0,0 +1,49 @@
+"""Journal of completed update steps, for resuming interrupted runs."""
+import json
+from pathlib import Path
+from typing import Set, Tuple
+
+
+class Journal:
+    """Append-only record of the steps completed for each update branch.
+
+    Each step is appended to the file as a line of JSON as soon as it has
+    completed, so that the journal survives if the process is killed. A line
+    truncated by a crash is ignored. As branch names include the new version,
+    steps recorded for an outdated release do not apply to a newer one. Unless
+    the run is resumed, the journal is cleared.
+
+    Args:
+        path: The file holding the journal.
+        resume: Keep the steps recorded by the previous run.
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        """Constructor."""
+        self.path = path
+        self._steps: Set[Tuple[str, str]] = set()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if not resume:
+            path.unlink(missing_ok=True)
+            return
+
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._steps.add((entry["branch"], entry["step"]))
+
+    def done(self, branch: str, step: str) -> bool:
+        """Return True if the step was completed for the branch."""
+        return (branch, step) in self._steps
+
+    def record(self, branch: str, step: str) -> None:
+        """Record that the step was completed for the branch."""
+        entry = {"branch": branch, "step": step}
+        with self.path.open(mode="a", encoding="utf-8") as io:
+            io.write(f"{json.dumps(entry)}\n")
+        self._steps.add((branch, step))
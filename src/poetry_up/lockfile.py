@@ -0,0 +1,108 @@
+"""Poetry lock file."""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .poetry import canonicalize_name
+
+
+@dataclass
+class LockedPackage:
+    """Package entry in the lock file.
+
+    Dependencies map canonical names to the version constraints of each
+    declaration.
+    """
+
+    name: str
+    version: str
+    source_type: Optional[str] = None
+    source_url: Optional[str] = None
+    dependencies: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def from_index(self) -> bool:
+        """Return True if the package was installed from a package index."""
+        return self.source_type in (None, "legacy")
+
+
+@dataclass(frozen=True)
+class Change:
+    """Change to a locked package.
+
+    The old version is None for added packages, and the new version is None
+    for removed packages.
+    """
+
+    name: str
+    old_version: Optional[str]
+    new_version: Optional[str]
+
+
+def _constraints(value: Any) -> List[str]:
+    declarations = value if isinstance(value, list) else [value]
+    return [
+        declaration if isinstance(declaration, str) else declaration.get("version", "*")
+        for declaration in declarations
+    ]
+
+
+def read(path: Path = None) -> List[LockedPackage]:
+    """Return the packages in the lock file."""
+    if path is None:
+        path = Path.cwd() / "poetry.lock"
+
+    return parse(path.read_text(encoding="utf-8"))
+
+
+def parse(text: str) -> List[LockedPackage]:
+    """Return the packages in the lock file contents."""
+    try:
+        from tomllib import loads
+    except ImportError:  # pragma: no cover (Python < 3.11)
+        from tomlkit import parse as loads  # type: ignore[assignment]
+
+    data = loads(text)
+    packages = []
+
+    for entry in data.get("package", []):
+        source = entry.get("source", {})
+        package = LockedPackage(
+            entry["name"],
+            entry["version"],
+            source_type=source.get("type"),
+            source_url=source.get("url"),
+            dependencies={
+                canonicalize_name(name): _constraints(value)
+                for name, value in entry.get("dependencies", {}).items()
+            },
+        )
+        packages.append(package)
+
+    return packages
+
+
+def diff(old: Iterable[LockedPackage], new: Iterable[LockedPackage]) -> List[Change]:
+    """Return the packages whose locked version differs.
+
+    Packages are identified by their canonical name, and ordered by it.
+
+    Args:
+        old: The locked packages before the update.
+        new: The locked packages after the update.
+
+    Returns:
+        The changes to the locked versions.
+    """
+    before: Dict[str, str] = {
+        canonicalize_name(package.name): package.version for package in old
+    }
+    after: Dict[str, str] = {
+        canonicalize_name(package.name): package.version for package in new
+    }
+
+    return [
+        Change(name, before.get(name), after.get(name))
+        for name in sorted(before.keys() | after.keys())
+        if before.get(name) != after.get(name)
+    ]
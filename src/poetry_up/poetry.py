@@ -1,13 +1,18 @@
 """Poetry wrapper."""
 from dataclasses import dataclass
+import hashlib
+import os
 from pathlib import Path
 import re
-import subprocess  # noqa: S404
 from typing import Any
+from typing import Dict
 from typing import Iterator
+from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
-import tomlkit
+from . import tracing
 
 
 @dataclass
@@ -22,29 +27,74 @@ class Package:
 _CANONICALIZE_PATTERN = re.compile(r"[-_.]+")
 
 
-def _canonicalize_name(name: str) -> str:
-    # From ``packaging.utils.canonicalize_name`` (PEP 503)
+def canonicalize_name(name: str) -> str:
+    """Return the normalized form of a package name, as defined in PEP 503."""
+    # From ``packaging.utils.canonicalize_name``
     return _CANONICALIZE_PATTERN.sub("-", name).lower()
 
 
 class _Config:
-    """Poetry configuration."""
+    """Poetry configuration.
 
-    def __init__(self) -> None:
+    The document is parsed once, and reloaded by :meth:`refresh` only if the
+    file has changed on disk. Dependencies are indexed by canonical name.
+    """
+
+    def __init__(self, path: Path = None) -> None:
         """Initialize."""
-        self._path = Path.cwd() / "pyproject.toml"
+        self._path = path if path is not None else Path.cwd() / "pyproject.toml"
         self.load()
 
+    def _stamp(self) -> Tuple[int, int, int]:
+        stat = self._path.stat()
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
     def load(self) -> None:
         """Read the document from disk."""
-        text = self._path.read_text(encoding="utf-8")
-        self._data = tomlkit.parse(text)
+        self._parse(self._path.read_bytes())
+
+    def _parse(self, data: bytes) -> None:
+        import tomlkit
+
+        self._digest = hashlib.sha256(data).digest()
+        self._data = tomlkit.parse(data.decode("utf-8"))
         self._config = self._data["tool"]["poetry"]
+        # Map canonical names to tables and keys; the first table wins.
+        self._index = {
+            canonicalize_name(dependency): (dependencies, dependency)
+            for dependencies in reversed(list(self._dependency_tables()))
+            for dependency in dependencies
+        }
+        self._stamp_value: Optional[Tuple[int, int, int]] = self._stamp()
+
+    def _dependency_tables(self) -> Iterator[Any]:
+        for key in ["dependencies", "dev-dependencies"]:
+            if key in self._config:
+                yield self._config[key]
+
+        for group in self._config.get("group", {}).values():
+            if "dependencies" in group:
+                yield group["dependencies"]
+
+    def refresh(self) -> None:
+        """Reload the document if the file has changed on disk."""
+        if self._stamp_value == self._stamp():
+            return
+
+        data = self._path.read_bytes()
+        if hashlib.sha256(data).digest() == self._digest:
+            self._stamp_value = self._stamp()
+        else:
+            self._parse(data)
 
     def write(self) -> None:
         """Write the document back to disk."""
-        text = tomlkit.dumps(self._data)
-        self._path.write_text(text, encoding="utf-8")
+        import tomlkit
+
+        data = tomlkit.dumps(self._data).encode("utf-8")
+        self._path.write_bytes(data)
+        self._digest = hashlib.sha256(data).digest()
+        self._stamp_value = self._stamp()
 
     def __enter__(self) -> "_Config":
         """Enter the runtime context."""
@@ -56,33 +106,156 @@ class _Config:
         """Enter the runtime context."""
         if exception is None:
             self.write()
+        else:
+            # The document may have been modified; force a reload.
+            self._digest = b""
+            self._stamp_value = None
+
+    def default_source(self) -> Optional[str]:
+        """Return the URL of the default package source, if configured."""
+        for source in self._config.get("source", []):
+            if source.get("default") or source.get("priority") in (
+                "default",
+                "primary",
+            ):
+                return str(source["url"])
+        return None
+
+    def constraints(self, name: str) -> Optional[List[str]]:
+        """Return the declared version constraints for a dependency.
+
+        Args:
+            name: The name of the dependency.
+
+        Returns:
+            None if the package is not a direct dependency. Otherwise, the
+            version constraints of each declaration, with ``*`` for
+            declarations without a version, such as Git dependencies.
+        """
+        entry = self._index.get(canonicalize_name(name))
+        if entry is None:
+            return None
+
+        dependencies, dependency = entry
+        value = dependencies[dependency]
+        declarations = value if isinstance(value, list) else [value]
+        return [
+            str(declaration)
+            if isinstance(declaration, str)
+            else str(declaration.get("version", "*"))
+            for declaration in declarations
+        ]
 
     def update_constraint(self, package: Package) -> None:
         """Update the constraint for the given package."""
-        groups = [self._config["dependencies"], self._config["dev-dependencies"]]
-        for dependencies in groups:
-            for dependency, value in dependencies.items():
-                if _canonicalize_name(dependency) == _canonicalize_name(package.name):
-                    if isinstance(value, str):
-                        dependencies[dependency] = f"^{package.new_version}"
-                    elif "version" in value:
-                        dependencies[dependency]["version"] = f"^{package.new_version}"
-                    return
+        entry = self._index.get(canonicalize_name(package.name))
+        if entry is None:
+            return
+
+        dependencies, dependency = entry
+        value = dependencies[dependency]
+        if isinstance(value, str):
+            dependencies[dependency] = f"^{package.new_version}"
+        elif "version" in value:
+            dependencies[dependency]["version"] = f"^{package.new_version}"
+
+
+_configs: Dict[Path, _Config] = {}
+
+
+def _load_config() -> _Config:
+    """Return the configuration in the current directory.
+
+    The configuration is kept for the lifetime of the process, and refreshed
+    on every call.
+
+    Returns:
+        The configuration.
+    """
+    path = Path.cwd() / "pyproject.toml"
+    config = _configs.get(path)
+
+    if config is None:
+        config = _configs[path] = _Config(path)
+    else:
+        config.refresh()
+
+    return config
+
+
+def project_hash() -> str:
+    """Return a hash identifying the dependency specification of the project.
+
+    The hash covers ``pyproject.toml`` including its package sources,
+    ``poetry.lock``, and repositories configured via environment variables.
+
+    Returns:
+        The hexadecimal SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+
+    for filename in ["pyproject.toml", "poetry.lock"]:
+        path = Path(filename)
+        digest.update(path.read_bytes() if path.exists() else b"")
+        digest.update(b"\0")
+
+    for name in sorted(os.environ):
+        if name.startswith("POETRY_REPOSITORIES_"):
+            digest.update(f"{name}={os.environ[name]}\0".encode())
+
+    return digest.hexdigest()
+
+
+def _update_constraints(packages: Sequence[Package]) -> None:
+    """Update the version constraints for the given packages.
+
+    Constraints are edited in place where possible, falling back to parsing
+    and serializing the entire document.
+
+    Args:
+        packages: The packages whose constraints are updated.
+    """
+    from .editor import ConstraintEditor
+
+    path = Path.cwd() / "pyproject.toml"
+    editor = ConstraintEditor(path.read_bytes().decode("utf-8"))
+    remaining = [
+        package for package in packages if not editor.update_constraint(package)
+    ]
+
+    if editor.changed:
+        path.write_bytes(editor.text.encode("utf-8"))
+
+    if remaining:
+        with _load_config() as config:
+            for package in remaining:
+                config.update_constraint(package)
+
+
+def default_source() -> Optional[str]:
+    """Return the URL of the default package source, if configured."""
+    return _load_config().default_source()
+
+
+def constraints(name: str) -> Optional[List[str]]:
+    """Return the declared version constraints for a dependency, if any."""
+    return _load_config().constraints(name)
 
 
 def show_outdated() -> Iterator[Package]:
-    """Yield outdated packages."""
-    package = "[a-z][-a-z0-9]*"
-    version = "[0-9][.0-9a-z]*"
+    """Yield outdated packages.
+
+    Packages are yielded as soon as Poetry prints them.
+
+    Yields:
+        The outdated packages.
+    """
+    package = "[A-Za-z0-9][-_.A-Za-z0-9]*"
+    version = "[0-9][-_.!+0-9A-Za-z]*"
     separator = "[ (!)]*"
     pattern = re.compile(f"({package}) +{separator}({version}) +({version}) +")
-    process = subprocess.run(  # noqa: S603, S607
-        ["poetry", "show", "--outdated", "--no-ansi"],
-        check=True,
-        capture_output=True,
-        text=True,
-    )
-    for line in process.stdout.splitlines():
+    command = ["poetry", "show", "--outdated", "--no-ansi"]
+    for line in tracing.stream(command):
         match = pattern.match(line)
         if match is None:
             continue
@@ -97,12 +270,36 @@ def update(package: Package, lock: bool = False, latest: bool = False) -> None:
         lock: If True, do not install the package into the environment.
         latest: If True, update the version constraint when required.
     """
+    update_packages([package], lock=lock, latest=latest)
+
+
+def update_packages(
+    packages: Sequence[Package], lock: bool = False, latest: bool = False
+) -> None:
+    """Update the given packages using a single invocation of Poetry.
+
+    Args:
+        packages: The packages to be updated.
+        lock: If True, do not install the packages into the environment.
+        latest: If True, update the version constraints when required.
+    """
     options = ["--lock"] if lock else []
 
     if latest:
-        with _Config() as config:
-            config.update_constraint(package)
+        _update_constraints(packages)
+
+    tracing.run(  # noqa: S607
+        ["poetry", "update", *options, *(package.name for package in packages)],
+        check=True,
+        capture_output=True,
+    )
+
 
-    subprocess.run(  # noqa: S603, S607
-        ["poetry", "update", *options, package.name], check=True, capture_output=True
+def install() -> None:
+    """Synchronize the virtual environment with the lock file.
+
+    Packages which are not in the lock file are removed from the environment.
+    """
+    tracing.run(  # noqa: S607
+        ["poetry", "install", "--sync"], check=True, capture_output=True
     )
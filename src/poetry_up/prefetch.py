@@ -0,0 +1,203 @@
+"""Prefetch distributions into the artifact cache of Poetry."""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import http.client
+import json
+import os
+from pathlib import Path
+import sys
+import tempfile
+from typing import Dict, Iterable, List, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from . import index, lockfile, versions
+from .poetry import canonicalize_name, Package
+
+
+def poetry_cache_directory() -> Path:
+    """Return the cache directory of Poetry."""
+    if "POETRY_CACHE_DIR" in os.environ:
+        return Path(os.environ["POETRY_CACHE_DIR"])
+
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "pypoetry"
+
+    if sys.platform == "win32":
+        root = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+        return Path(root) / "pypoetry" / "Cache"
+
+    root = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(root) / "pypoetry"
+
+
+def artifact_directory(cache_directory: Path, url: str) -> Path:
+    """Return the directory for artifacts downloaded from the URL.
+
+    The layout matches Poetry, which keys artifacts by a hash of the URL
+    without its fragment, and of the file hash given in the fragment.
+
+    Args:
+        cache_directory: The cache directory of Poetry.
+        url: The URL of the file, with the hash in its fragment.
+
+    Returns:
+        The artifact directory.
+    """
+    url, _, fragment = url.partition("#")
+    parts = {"url": url}
+    name, _, value = fragment.partition("=")
+    if name in hashlib.algorithms_guaranteed and value:
+        parts[name] = value
+
+    key = hashlib.sha256(
+        json.dumps(parts, sort_keys=True, separators=(",", ":")).encode("ascii")
+    ).hexdigest()
+    return cache_directory / "artifacts" / key[:2] / key[2:4] / key[4:6] / key[6:]
+
+
+def select_files(
+    files: Iterable[Tuple[str, str, bool]], name: str, version: str
+) -> List[Tuple[str, str]]:
+    """Return the files of the version which Poetry would install.
+
+    These are the pure Python wheels, or the source distributions if there
+    are no wheels at all. Platform-specific wheels are not selected, as
+    choosing between them requires the tags of the target environment.
+
+    Args:
+        files: The filename, URL, and yanked status of each file.
+        name: The name of the package.
+        version: The version of the package.
+
+    Returns:
+        The filename and URL of each selected file.
+    """
+    target = versions.parse(version)
+    canonical_name = canonicalize_name(name)
+    wheels, sdists = [], []
+    platform_wheels = False
+
+    for filename, url, yanked in files:
+        text = index._distribution_version(filename, canonical_name)
+        if yanked or text is None or versions.parse(text) != target:
+            continue
+        if filename.endswith("-none-any.whl"):
+            wheels.append((filename, url))
+        elif filename.endswith(".whl"):
+            platform_wheels = True
+        else:
+            sdists.append((filename, url))
+
+    if wheels or platform_wheels:
+        return wheels
+    return sdists
+
+
+def _verify(url: str, data: bytes) -> None:
+    """Check the data against the hash in the fragment of the URL, if any.
+
+    Args:
+        url: The URL of the file, with the hash in its fragment.
+        data: The contents of the file.
+
+    Raises:
+        RepositoryError: The data does not match the hash.
+    """
+    url, _, fragment = url.partition("#")
+    name, _, value = fragment.partition("=")
+    if name not in hashlib.algorithms_guaranteed or not value:
+        return
+
+    digest = hashlib.new(name, data)
+    # Variable-length digests such as shake_128 have no default size.
+    if digest.digest_size and digest.hexdigest() != value.lower():
+        raise index.RepositoryError(f"{url}: {name} digest does not match")
+
+
+def _download(client: index.Index, url: str, directory: Path) -> Path:
+    """Download the file into the directory, unless it is already there.
+
+    The file is verified before it is written, so that a truncated or
+    tampered download does not end up in the artifact cache.
+
+    Args:
+        client: The package index.
+        url: The URL of the file, with the hash in its fragment.
+        directory: The artifact directory for the URL.
+
+    Returns:
+        The path of the file.
+    """
+    filename = Path(urlsplit(url).path).name
+    path = directory / filename
+    if path.exists():
+        return path
+
+    data = client.download(url.partition("#")[0])
+    _verify(url, data)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, mode="wb") as io:
+        io.write(data)
+    os.replace(name, path)
+    return path
+
+
+def prefetch(
+    packages: Sequence[Package],
+    url: str = index.PYPI_URL,
+    locked: Iterable[lockfile.LockedPackage] = None,
+    cache_directory: Path = None,
+    max_workers: int = 16,
+) -> List[Path]:
+    """Download the new versions of packages into the artifact cache.
+
+    Downloads run concurrently. Failures are ignored, as Poetry downloads
+    any missing files itself. This includes files which do not match the
+    hash given by the package index. By default, the locked packages are read
+    from ``poetry.lock``, and files are downloaded into the cache directory
+    returned by :func:`poetry_cache_directory`.
+
+    Args:
+        packages: The packages to be updated.
+        url: The URL of the default package index.
+        locked: The locked packages, for their package sources (optional).
+        cache_directory: The cache directory of Poetry (optional).
+        max_workers: The maximum number of concurrent downloads.
+
+    Returns:
+        The paths of the downloaded files, including files already cached.
+    """
+    if cache_directory is None:
+        cache_directory = poetry_cache_directory()
+
+    if locked is None:
+        locked = lockfile.read()
+
+    sources = {
+        canonicalize_name(package.name): package.source_url or url
+        for package in locked
+        if package.from_index
+    }
+    clients: Dict[str, index.Index] = {
+        source: index.Index(source) for source in {url, *sources.values()}
+    }
+
+    def fetch(package: Package) -> List[Path]:
+        client = clients[sources.get(canonicalize_name(package.name), url)]
+        try:
+            files = client.files(package.name)
+            return [
+                _download(
+                    client, file_url, artifact_directory(cache_directory, file_url)
+                )
+                for _, file_url in select_files(
+                    files, package.name, package.new_version
+                )
+            ]
+        except (OSError, http.client.HTTPException, index.RepositoryError):
+            return []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [path for paths in executor.map(fetch, packages) for path in paths]
@@ -0,0 +1,268 @@
+"""Update multiple Poetry projects in a repository."""
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import dataclasses
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import click
+
+from . import git, lockfile, poetry
+from .update import Options, Updater
+
+
+_EXCLUDED_DIRECTORIES = {"node_modules", "__pycache__", "site-packages"}
+
+
+def _is_poetry_project(directory: Path) -> bool:
+    if not (directory / "poetry.lock").is_file():
+        return False
+    text = (directory / "pyproject.toml").read_text(encoding="utf-8")
+    return "[tool.poetry" in text
+
+
+def discover(root: Path) -> List[Path]:
+    """Return the directories of Poetry projects below the root.
+
+    A Poetry project has a ``pyproject.toml`` with Poetry configuration, and
+    a ``poetry.lock``. Hidden directories are skipped.
+
+    Args:
+        root: The directory to search.
+
+    Returns:
+        The project directories, in the order of a depth-first traversal.
+    """
+    projects = []
+
+    for directory, directories, files in os.walk(root):
+        directories[:] = sorted(
+            name
+            for name in directories
+            if not name.startswith(".") and name not in _EXCLUDED_DIRECTORIES
+        )
+        if "pyproject.toml" in files and _is_poetry_project(Path(directory)):
+            projects.append(Path(directory))
+
+    return projects
+
+
+@contextlib.contextmanager
+def _working_directory(directory: Path) -> Iterator[None]:
+    cwd = Path.cwd()
+    try:
+        os.chdir(directory)
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+@dataclass
+class ProjectResult:
+    """Outcome of updating a project.
+
+    The outcomes are pairs of the package update and what became of it.
+    """
+
+    project: str
+    outcomes: List[Tuple[str, str]] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class _Listing:
+    """Outdated packages of a project, or the error raised listing them."""
+
+    packages: List[poetry.Package] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def _describe_error(error: Exception) -> str:
+    if isinstance(error, click.ClickException):
+        return error.format_message()
+    return f"{type(error).__name__}: {error}"
+
+
+def _list_project(directory: Path, options: Options) -> _Listing:
+    """List the outdated packages of a project.
+
+    This function is an entry point for worker processes.
+
+    Args:
+        directory: The project directory.
+        options: The options for the project.
+
+    Returns:
+        The outdated packages, or the error raised listing them.
+    """
+    with _working_directory(directory):
+        try:
+            return _Listing(list(Updater(options).show_outdated()))
+        except Exception as error:
+            return _Listing(error=_describe_error(error))
+
+
+def _update_project(
+    directory: Path, options: Options, listing: _Listing
+) -> ProjectResult:
+    """Update the outdated packages of a project.
+
+    This function is an entry point for worker processes. Projects whose
+    outdated packages could not be listed are not updated.
+
+    Args:
+        directory: The project directory.
+        options: The options for the project.
+        listing: The outdated packages of the project.
+
+    Returns:
+        The outcome of each package update, or the error.
+    """
+    result = ProjectResult(options.branch_prefix.rstrip("/") or ".")
+    if listing.error is not None:
+        result.error = listing.error
+        return result
+
+    updater = Updater(options, listing.packages)
+
+    with _working_directory(directory):
+        try:
+            updater.run()
+        except Exception as error:
+            result.error = _describe_error(error)
+
+    result.outcomes = updater.outcomes
+    return result
+
+
+def _map(
+    function: Callable[..., Any], jobs: Optional[int], *iterables: Sequence[Any]
+) -> List[Any]:
+    """Apply the function in a process pool, or in this process for one job.
+
+    Args:
+        function: The function to apply.
+        jobs: The number of processes, or None for the number of processors.
+        iterables: The arguments of each call.
+
+    Returns:
+        The return values, in the order of the arguments.
+    """
+    if jobs == 1:
+        return list(map(function, *iterables))
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(function, *iterables))
+
+
+def _list_natively(projects: Sequence[Path]) -> List[_Listing]:
+    """List outdated packages of all projects, querying each package once.
+
+    Queries are shared between projects using the same package index.
+
+    Args:
+        projects: The project directories.
+
+    Returns:
+        The outdated packages of each project, or the error raised listing them.
+    """
+    from . import index
+
+    indexes: Dict[str, index.Index] = {}
+    listings = []
+
+    for directory in projects:
+        try:
+            with _working_directory(directory):
+                url = poetry.default_source() or index.PYPI_URL
+                packages = lockfile.read()
+            outdated = list(index.show_outdated(url, packages, indexes=indexes))
+        except Exception as error:
+            listings.append(_Listing(error=_describe_error(error)))
+        else:
+            listings.append(_Listing(outdated))
+
+    return listings
+
+
+def report(results: Sequence[ProjectResult]) -> str:
+    """Return a table with the outcome of each package update, per project.
+
+    Args:
+        results: The outcomes of each project.
+
+    Returns:
+        The table, as text.
+    """
+    rows = [("Project", "Package", "Outcome")]
+
+    for result in results:
+        if result.error is not None:
+            rows.append((result.project, "-", f"error: {result.error}"))
+        for subject, outcome in result.outcomes:
+            rows.append((result.project, subject, outcome))
+        if result.error is None and not result.outcomes:
+            rows.append((result.project, "-", "up to date"))
+
+    widths = [max(len(cell) for cell in column) for column in zip(*rows)]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def run(root: Path, options: Options) -> None:
+    """Update every Poetry project below the root.
+
+    Outdated packages are listed for all projects in parallel. Projects are
+    updated one after another, unless ``--jobs`` and ``--no-checkout`` are
+    given, in which case they are updated in parallel as well. Branch names
+    are prefixed with the path of the project. The run ends with a report
+    for all projects, unless progress is reported as JSON events. A project
+    failing does not stop the other projects from being updated.
+
+    Args:
+        root: The directory containing the projects.
+        options: The options for the update operation.
+
+    Raises:
+        ClickException: No projects were found, or a project failed.
+    """
+    projects = discover(root)
+    if not projects:
+        raise click.ClickException(f"No Poetry projects found in {root}")
+
+    if options.checkout and not git.is_clean():
+        raise click.ClickException("Working tree is not clean")
+
+    jobs = options.jobs or None
+    parallel = jobs != 1 and not options.checkout
+    project_options = [
+        dataclasses.replace(
+            options,
+            jobs=1 if parallel else options.jobs,
+            watch=0,
+            branch_prefix=""
+            if directory == root
+            else f"{directory.relative_to(root).as_posix()}/",
+        )
+        for directory in projects
+    ]
+
+    listings = (
+        _list_natively(projects)
+        if options.native
+        else _map(_list_project, jobs, projects, project_options)
+    )
+    results: List[ProjectResult] = _map(
+        _update_project, jobs if parallel else 1, projects, project_options, listings
+    )
+
+    if options.output_format == "text":
+        click.echo(report(results))
+
+    failed = [result.project for result in results if result.error is not None]
+    if failed:
+        raise click.ClickException(f"Updating failed for {', '.join(failed)}")
@@ -0,0 +1,274 @@
+"""Timing spans for actions and external commands."""
+import contextlib
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+import subprocess  # noqa: S404
+import threading
+import time
+from typing import Any, cast, Dict, IO, Iterator, List, Optional, Sequence
+
+
+@dataclass
+class Span:
+    """Timed operation."""
+
+    name: str
+    category: str
+    start: float
+    duration: float
+    pid: int
+    tid: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class Profiler:
+    """Record timing spans, and export them.
+
+    Spans may be recorded from multiple threads. Spans recorded in other
+    processes can be added using :meth:`extend`, as the clock is shared
+    between processes. Commands run within a span are also listed in the
+    ``commands`` entry of the enclosing span.
+    """
+
+    def __init__(self) -> None:
+        """Constructor."""
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """Record a span for the duration of the context.
+
+        The caller may add to the additional information via the yielded
+        dictionary.
+
+        Args:
+            name: The name of the span.
+            category: The category of the span, such as ``action``.
+            args: Additional information.
+
+        Yields:
+            The additional information for the span.
+        """
+        stack = self._stack()
+        stack.append(args)
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            stack.pop()
+            span = Span(
+                name,
+                category,
+                start,
+                time.perf_counter() - start,
+                os.getpid(),
+                threading.get_ident(),
+                args,
+            )
+            self.extend([span])
+
+            if category == "command" and stack:
+                command = {"command": args["command"], "duration": span.duration}
+                if "returncode" in args:
+                    command["returncode"] = args["returncode"]
+                stack[-1].setdefault("commands", []).append(command)
+
+    def record(self, name: str, category: str, start: float, **args: Any) -> None:
+        """Record a span that started at the given time and ends now.
+
+        Unlike :meth:`span`, this does not make the span enclose commands run
+        in the meantime, which is useful for spans that outlive a generator.
+
+        Args:
+            name: The name of the span.
+            category: The category of the span, such as ``action``.
+            start: The start time, as returned by :func:`time.perf_counter`.
+            args: Additional information.
+        """
+        span = Span(
+            name,
+            category,
+            start,
+            time.perf_counter() - start,
+            os.getpid(),
+            threading.get_ident(),
+            args,
+        )
+        self.extend([span])
+
+    def extend(self, spans: Sequence[Span]) -> None:
+        """Add spans recorded elsewhere."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def trace(self) -> Dict[str, Any]:
+        """Return the spans in the Chrome trace event format."""
+        origin = min((span.start for span in self.spans), default=0.0)
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - origin) * 1e6),
+                "dur": round(span.duration * 1e6),
+                "pid": span.pid,
+                "tid": span.tid,
+                "args": span.args,
+            }
+            for span in sorted(self.spans, key=lambda span: span.start)
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: Path) -> None:
+        """Write the spans to a file in the Chrome trace event format."""
+        path.write_text(json.dumps(self.trace(), indent=1), encoding="utf-8")
+
+    def summary(self) -> str:
+        """Return a table with the time spent in each action, per package."""
+        names: List[str] = []
+        table: Dict[str, Dict[str, float]] = {}
+
+        for span in self.spans:
+            if span.category != "action":
+                continue
+            if span.name not in names:
+                names.append(span.name)
+            row = table.setdefault(span.args.get("package", ""), {})
+            row[span.name] = row.get(span.name, 0.0) + span.duration
+
+        header = ["Package", *names, "Total"]
+        rows = [header] + [
+            [
+                package,
+                *(f"{row[name]:.2f}" if name in row else "-" for name in names),
+                f"{sum(row.values()):.2f}",
+            ]
+            for package, row in table.items()
+        ]
+        widths = [max(len(cell) for cell in column) for column in zip(*rows)]
+        return "\n".join(
+            "  ".join(
+                cell.ljust(width) if column == 0 else cell.rjust(width)
+                for column, (cell, width) in enumerate(zip(row, widths))
+            ).rstrip()
+            for row in rows
+        )
+
+
+_profiler: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    """Start recording spans in this process."""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable() -> None:
+    """Stop recording spans in this process."""
+    global _profiler
+    _profiler = None
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "action", **args: Any) -> Iterator[Dict[str, Any]]:
+    """Record a span if profiling is enabled.
+
+    Args:
+        name: The name of the span.
+        category: The category of the span.
+        args: Additional information.
+
+    Yields:
+        The additional information for the span.
+    """
+    if _profiler is None:
+        yield args
+    else:
+        with _profiler.span(name, category, **args) as args:
+            yield args
+
+
+def run(command: Sequence[str], **kwargs: Any) -> Any:
+    """Run an external command, recording a span if profiling is enabled.
+
+    The arguments are passed to :func:`subprocess.run`. The span records the
+    command line and the exit status.
+
+    Args:
+        command: The command line.
+        kwargs: Keyword arguments for :func:`subprocess.run`.
+
+    Returns:
+        The completed process.
+
+    Raises:
+        subprocess.CalledProcessError: The command exited with a non-zero status,
+            and ``check`` was passed.
+    """
+    if _profiler is None:
+        return subprocess.run(command, **kwargs)  # noqa: S603
+
+    name = " ".join(command[:2])
+    with _profiler.span(name, "command", command=list(command)) as args:
+        try:
+            process = subprocess.run(command, **kwargs)  # noqa: S603
+        except subprocess.CalledProcessError as error:
+            args["returncode"] = error.returncode
+            raise
+        args["returncode"] = process.returncode
+        return process
+
+
+def stream(command: Sequence[str]) -> Iterator[str]:
+    """Run an external command, and yield its output as it is printed.
+
+    Args:
+        command: The command line.
+
+    Yields:
+        The lines of standard output.
+
+    Raises:
+        CalledProcessError: The command exited with a non-zero status.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(  # noqa: S603
+        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    # Both are set, as they were requested as pipes.
+    stdout = cast(IO[str], process.stdout)
+    stderr = cast(IO[str], process.stderr)
+
+    # Standard error is drained concurrently, as the command would block once
+    # the pipe buffer is full.
+    errors: List[str] = []
+    thread = threading.Thread(target=lambda: errors.append(stderr.read()))
+    thread.start()
+    try:
+        yield from stdout
+    finally:
+        stdout.close()
+        thread.join()
+        stderr.close()
+        returncode = process.wait()
+
+        if _profiler is not None:
+            name = " ".join(command[:2])
+            _profiler.record(
+                name, "command", start, command=list(command), returncode=returncode
+            )
+
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, command, stderr="".join(errors))
@@ -1,13 +1,37 @@
 """Update module."""
-from dataclasses import dataclass
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+from dataclasses import asdict, astuple, dataclass
+import hashlib
+import os
+from pathlib import Path
+import queue
+import subprocess  # noqa: S404
+import tempfile
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import click
 
-from . import git, github, poetry
+from . import events, git, github, lockfile, poetry, tracing, versions
+from .cache import Cache, cache_directory, OutcomeStore
+from .journal import Journal
 
 
 program_name = "poetry-up"
+project_files = ["pyproject.toml", "poetry.lock"]
 
 
 @dataclass
@@ -24,6 +48,33 @@ class Options:
     remote: str
     dry_run: bool
     packages: Tuple[str, ...]
+    jobs: int = 1
+    cache_ttl: float = 0
+    native: bool = False
+    pipeline: bool = False
+    group: bool = False
+    profile: Optional[str] = None
+    checkout: bool = True
+    batch_push: bool = False
+    watch: float = 0
+    branch_prefix: str = ""
+    retry_refused: bool = False
+    prefetch: bool = False
+    output_format: str = "text"
+    defer_install: bool = False
+    resume: bool = False
+
+    @property
+    def lock_only(self) -> bool:
+        """Return True if updates only change the lock file.
+
+        This is the case without ``--install``, and with ``--defer-install``,
+        which installs once at the end of the run instead.
+
+        Returns:
+            True if updates only change the lock file.
+        """
+        return not self.install or self.defer_install
 
 
 class Action:
@@ -43,7 +94,13 @@ class Action:
 
 
 class Switch(Action):
-    """Switch to the update branch."""
+    """Switch to the update branch.
+
+    New branches are not created here. Instead, the project files at the
+    upstream branch are written to the working tree, and the branch is created
+    when committing. A refused update therefore does not touch the repository.
+    Without checkout, existing branches are handled in the same way.
+    """
 
     @property
     def required(self) -> bool:
@@ -56,21 +113,78 @@ class Switch(Action):
 
     def __call__(self) -> None:
         """Run the action."""
-        git.switch(
-            self.updater.branch,
-            create=not git.branch_exists(self.updater.branch),
-            location=self.updater.options.upstream,
-        )
+        refs = self.updater.refs
+        create = not refs.branch_exists(self.updater.branch)
+        self.updater.existing = not create
+
+        if self.updater.worktree is not None:
+            refs.add_worktree(
+                self.updater.worktree,
+                self.updater.branch,
+                create=create,
+                location=self.updater.options.upstream,
+            )
+            os.chdir(self.updater.worktree)
+        elif create or not self.updater.options.checkout:
+            self.updater.deferred = create and self.updater.options.checkout
+            location = self.updater.options.upstream if create else self.updater.branch
+            self.updater.saved = {
+                name: Path(name).read_bytes() for name in project_files
+            }
+            # The project files are clean, so they match the checked out commit.
+            if refs.resolve(location) != refs.resolve(refs.current_branch()):
+                for name, data in git.read_files(location, project_files).items():
+                    Path(name).write_bytes(data)
+        else:
+            refs.switch(self.updater.branch)
 
 
 class Update(Action):
-    """Update the package using Poetry."""
+    """Update the package using Poetry.
+
+    The project files are saved before the update, and restored if Poetry
+    fails. The locked versions are compared afterwards to find out which
+    packages Poetry upgraded. An existing update branch may already have the
+    new versions from an earlier run. In this case, the branch is left as it
+    is, and the project files are restored.
+    """
 
     def __call__(self) -> None:
         """Run the action."""
+        snapshot = {name: Path(name).read_bytes() for name in project_files}
+        self.updater.snapshot = snapshot
+        try:
+            self.update()
+        except Exception:
+            self.updater.restore()
+            raise
+
+        old = lockfile.parse(snapshot["poetry.lock"].decode("utf-8"))
+        locked = {
+            poetry.canonicalize_name(package.name): package.version for package in old
+        }
+        self.updater.up_to_date = self.updater.existing and all(
+            locked.get(poetry.canonicalize_name(package.name)) == package.new_version
+            for package in self.updater.packages
+        )
+        changes = lockfile.diff(old, lockfile.read())
+
+        # Keep the existing branch as it is, discarding other changes by Poetry.
+        if self.updater.up_to_date:
+            self.updater.restore()
+
+        self.updater.set_changes(changes)
+
+    def update(self) -> None:
+        """Invoke Poetry.
+
+        In a linked working tree, only the lock file is updated. Installing
+        would either write to the same environment as concurrent updates, or
+        leave an environment behind for the temporary working tree.
+        """
         poetry.update(
             self.updater.package,
-            lock=not self.updater.options.install,
+            lock=self.updater.options.lock_only or self.updater.worktree is not None,
             latest=self.updater.options.latest,
         )
 
@@ -81,36 +195,77 @@ class Commit(Action):
     @property
     def required(self) -> bool:
         """Return True if the action needs to run."""
-        return self.updater.options.commit and not git.is_clean(
-            ["pyproject.toml", "poetry.lock"]
+        return (
+            self.updater.options.commit
+            and self.updater.upgraded
+            and not self.updater.up_to_date
         )
 
     def __call__(self) -> None:
         """Run the action."""
-        git.add(["pyproject.toml", "poetry.lock"])
-        git.commit(message=f"{self.updater.title}\n")
+        if not self.updater.options.checkout and self.updater.worktree is None:
+            self.updater.refs.commit_files(
+                self.updater.branch,
+                self.updater.options.upstream,
+                project_files,
+                message=self.updater.message,
+            )
+            return
+
+        if self.updater.deferred:
+            self._create_branch()
+
+        git.add(project_files)
+        self.updater.refs.commit(message=self.updater.message)
+
+    def _create_branch(self) -> None:
+        """Create the update branch, carrying over the updated project files."""
+        updated = {name: Path(name).read_bytes() for name in project_files}
+        for name, data in self.updater.saved.items():
+            Path(name).write_bytes(data)
+        self.updater.saved = {}
+
+        self.updater.refs.switch(
+            self.updater.branch, create=True, location=self.updater.options.upstream,
+        )
+        for name, data in updated.items():
+            Path(name).write_bytes(data)
 
 
 class Rollback(Action):
-    """Rollback an attempted package update."""
+    """Rollback an attempted package update.
+
+    Only branches created in this run are removed. New branches are created
+    when committing, except in linked working trees, so the other branches
+    removed are those created for a working tree.
+    """
 
     @property
     def required(self) -> bool:
         """Return True if the action needs to run."""
-        return self.updater.actions.switch.required and (
-            git.resolve_branch(self.updater.branch)
-            == git.resolve_branch(self.updater.options.upstream)
+        return (
+            self.updater.actions.switch.required
+            and not self.updater.actions.commit.required
+            and not self.updater.up_to_date
         )
 
     def __call__(self) -> None:
         """Run the action."""
-        click.echo(
-            f"Skipping {self.updater.package.name} {self.updater.package.new_version}"
-            " (Poetry refused upgrade)"
+        self.updater.report(
+            "refused",
+            f"Skipping {self.updater.subject} (Poetry refused upgrade)",
+            packages=self.updater.packages,
         )
 
-        git.switch(self.updater.original_branch)
-        git.remove_branch(self.updater.branch)
+        self.updater.restore()
+
+        refs = self.updater.refs
+        if self.updater.worktree is not None:
+            refs.detach()
+            if not self.updater.existing:
+                refs.remove_branch(self.updater.branch)
+        elif self.updater.existing and self.updater.options.checkout:
+            refs.switch(self.updater.original_branch)
 
 
 class Push(Action):
@@ -141,13 +296,17 @@ class PullRequest(Action):
     @property
     def required(self) -> bool:
         """Return True if the action needs to run."""
-        return self.updater.options.pull_request and not github.pull_request_exists(
-            self.updater.branch
+        return (
+            self.updater.options.pull_request
+            and self.updater.branch not in self.updater.pull_requests
         )
 
     def __call__(self) -> None:
         """Run the action."""
-        github.create_pull_request(self.updater.title, self.updater.description)
+        self.updater.pull_request_url = github.create_pull_request(
+            self.updater.title, self.updater.description, self.updater.branch
+        )
+        self.updater.pull_requests.add(self.updater.branch)
 
 
 @dataclass
@@ -178,76 +337,998 @@ class PackageUpdater:
     """Update a package."""
 
     def __init__(
-        self, package: poetry.Package, options: Options, original_branch: str
+        self,
+        package: poetry.Package,
+        options: Options,
+        original_branch: str,
+        worktree: Optional[str] = None,
+        refs: Optional[git.RefIndex] = None,
+        pull_requests: Optional[Set[str]] = None,
+        journal: Optional[Journal] = None,
     ) -> None:
         """Constructor."""
         self.package = package
+        self.packages = [package]
         self.options = options
         self.original_branch = original_branch
+        self.worktree = worktree
+        self._refs = refs
+        self._pull_requests = pull_requests
+        self.journal = journal
 
-        self.branch = f"{program_name}/{package.name}-{package.new_version}"
+        self.branch = (
+            f"{program_name}/{options.branch_prefix}"
+            f"{package.name}-{package.new_version}"
+        )
         self.title = (
             f"Bump {package.name} from {package.old_version} to {package.new_version}"
         )
         self.description = self.title
+        self.snapshot: Dict[str, bytes] = {}
+        self.saved: Dict[str, bytes] = {}
+        self.deferred = False
+        self.existing = False
+        self.up_to_date = False
+        self.outcome: Optional[str] = None
+        self.changes: List[lockfile.Change] = []
+        self.updated = [package]
+        self.pull_request_url: Optional[str] = None
 
         self.actions = Actions.create(self)
 
+    @property
+    def subject(self) -> str:
+        """Return the package and version to update to."""
+        return f"{self.package.name} {self.package.new_version}"
+
+    @property
+    def message(self) -> str:
+        """Return the commit message."""
+        if self.description == self.title:
+            return f"{self.title}\n"
+        return f"{self.title}\n\n{self.description}\n"
+
+    @property
+    def refs(self) -> git.RefIndex:
+        """Return the index of local branches, loading it if required."""
+        if self._refs is None:
+            self._refs = git.RefIndex.load()
+        return self._refs
+
+    @property
+    def pull_requests(self) -> Set[str]:
+        """Return the head branches of open pull requests, fetching if required."""
+        if self._pull_requests is None:
+            self._pull_requests = github.open_pull_requests()
+        return self._pull_requests
+
     @property
     def required(self) -> bool:
         """Return True if the package needs to be updated."""
         return not self.options.packages or self.package.name in self.options.packages
 
-    def run(self) -> None:
-        """Run the package update."""
-        if self.actions.switch.required:
-            self.actions.switch()
+    @property
+    def upgraded(self) -> bool:
+        """Return True if Poetry changed the locked version of the package."""
+        return self._changed(self.package)
+
+    def _changed(self, package: poetry.Package) -> bool:
+        name = poetry.canonicalize_name(package.name)
+        return any(change.name == name for change in self.changes)
+
+    def set_changes(self, changes: Iterable[lockfile.Change]) -> None:
+        """Record the changes to the lock file, and describe the update."""
+        self.changes = list(changes)
+        self.description = _describe_changes(self.changes, [self.package]) or self.title
+
+    def restore(self) -> None:
+        """Restore the project files saved before the update."""
+        for name, data in self.snapshot.items():
+            Path(name).write_bytes(data)
 
-        self.actions.update()
+    def report(
+        self,
+        event: str,
+        text: Optional[str] = None,
+        packages: Optional[Iterable[poetry.Package]] = None,
+        **fields: Any,
+    ) -> None:
+        """Report an event, as text or as a line of JSON per package.
+
+        By default, the event applies to the packages being updated.
+
+        Args:
+            event: The name of the event.
+            text: The text printed in text format (optional).
+            packages: The packages the event applies to.
+            fields: Additional information written in NDJSON format.
+        """
+        events.report(
+            self.options.output_format,
+            event,
+            text,
+            packages=self.updated if packages is None else packages,
+            branch=self.branch,
+            **fields,
+        )
 
-        if self.actions.commit.required:
-            self.actions.commit()
+    def _call(self, action: Action) -> float:
+        """Run the action, and return its duration in seconds."""
+        start = time.perf_counter()
+        with tracing.span(type(action).__name__, package=self.subject):
+            action()
+        return round(time.perf_counter() - start, 3)
 
-        if self.actions.rollback.required:
-            self.actions.rollback()
+    def run(self, pipeline: "Pipeline" = None, batch: "PushBatch" = None) -> None:
+        """Run the package update.
+
+        Args:
+            pipeline: Pipeline for pushing and opening pull requests in the
+                background (optional).
+            batch: Batch for pushing the branch and opening the pull request
+                at the end of the run (optional).
+
+        Steps completed by a previous run are skipped, if recorded in the
+        journal.
+        """
+        if self.done("refused") or not (self.done("committed") or self._update()):
+            self.outcome = "refused"
             return
 
-        if self.actions.push.required:
-            self.actions.push()
+        self.outcome = "updated"
+
+        if batch is not None:
+            batch.add(self)
+        elif pipeline is not None:
+            pipeline.submit(self.subject, self.publish)
+        else:
+            self.publish()
+
+    def _update(self) -> bool:
+        """Switch, update, and commit. Return False if the upgrade was refused."""
+        try:
+            if self.actions.switch.required:
+                self._call(self.actions.switch)
+
+            duration = self._call(self.actions.update)
+            if self.upgraded:
+                self.report(
+                    "updated",
+                    duration=duration,
+                    changes=[asdict(change) for change in self.changes],
+                )
+
+            if self.actions.commit.required:
+                self.report("committed", duration=self._call(self.actions.commit))
+                self.record("committed")
+
+            if self.actions.rollback.required:
+                self._call(self.actions.rollback)
+                self.record("refused")
+                return False
+        finally:
+            # Restore the working tree after updating without switching branches.
+            for name, data in self.saved.items():
+                Path(name).write_bytes(data)
+            self.saved = {}
+
+        return True
+
+    def done(self, step: str) -> bool:
+        """Return True if the journal records the step as completed."""
+        return self.journal is not None and self.journal.done(self.branch, step)
+
+    def record(self, step: str) -> None:
+        """Record the step as completed in the journal, if any."""
+        if self.journal is not None:
+            self.journal.record(self.branch, step)
+
+    def publish(self) -> None:
+        """Push the update branch and open a pull request, as required."""
+        if self.actions.push.required and not self.done("pushed"):
+            self.report("pushed", duration=self.push())
+            self.record("pushed")
 
         if self.actions.pull_request.required:
-            self.actions.pull_request()
+            self.open_pull_request()
+
+    def push(self) -> float:
+        """Push the update branch, and return the duration in seconds."""
+        return self._call(self.actions.push)
+
+    def open_pull_request(self) -> None:
+        """Open a pull request, unless the journal records it as opened."""
+        if self.done("pull-request"):
+            return
+
+        duration = self._call(self.actions.pull_request)
+        self.record("pull-request")
+        self.report(
+            "pull-request",
+            self.pull_request_url,
+            duration=duration,
+            url=self.pull_request_url,
+        )
 
     def show(self) -> None:
         """Print information about the package update."""
-        message = "{}: {} → {}".format(
-            click.style(self.package.name, fg="bright_green"),
-            click.style(self.package.old_version, fg="blue"),
-            click.style(self.package.new_version, fg="yellow"),
+        for package in self.packages:
+            message = "{}: {} → {}".format(
+                click.style(package.name, fg="bright_green"),
+                click.style(package.old_version, fg="blue"),
+                click.style(package.new_version, fg="yellow"),
+            )
+            self.report("planned", message, packages=[package])
+
+
+def _describe_change(change: lockfile.Change) -> str:
+    if change.old_version is None:
+        return f"{change.name}: added {change.new_version}"
+    if change.new_version is None:
+        return f"{change.name}: removed {change.old_version}"
+    return f"{change.name}: {change.old_version} → {change.new_version}"
+
+
+def _describe_changes(
+    changes: Iterable[lockfile.Change], packages: Iterable[poetry.Package]
+) -> str:
+    """Describe changes to the lock file, other than to the given packages."""
+    names = {poetry.canonicalize_name(package.name) for package in packages}
+    lines = [
+        f"- {_describe_change(change)}"
+        for change in changes
+        if change.name not in names
+    ]
+    if not lines:
+        return ""
+    return "\n".join(["Other changes to poetry.lock:", "", *lines])
+
+
+class GroupUpdate(Update):
+    """Update a group of packages using Poetry.
+
+    If Poetry fails to resolve the group, the group is split in halves which
+    are updated in turn, until every package that can be upgraded is.
+    """
+
+    updater: "GroupUpdater"
+
+    def update(self) -> None:
+        """Invoke Poetry, bisecting the group on failure."""
+        self.updater.set_updated(self._update(self.updater.packages))
+
+    def _update(self, packages: Sequence[poetry.Package]) -> List[poetry.Package]:
+        snapshot = {path: path.read_bytes() for path in map(Path, project_files)}
+        try:
+            poetry.update_packages(
+                packages,
+                lock=self.updater.options.lock_only,
+                latest=self.updater.options.latest,
+            )
+        except subprocess.CalledProcessError:
+            for path, data in snapshot.items():
+                path.write_bytes(data)
+
+            if len(packages) == 1:
+                [package] = packages
+                self.updater.report(
+                    "skipped",
+                    f"Skipping {package.name} {package.new_version}"
+                    " (Poetry failed to resolve)",
+                    packages=packages,
+                    reason="Poetry failed to resolve",
+                )
+                return []
+
+            middle = len(packages) // 2
+            return self._update(packages[:middle]) + self._update(packages[middle:])
+
+        return list(packages)
+
+
+class GroupUpdater(PackageUpdater):
+    """Update a group of packages on a single branch."""
+
+    def __init__(
+        self,
+        packages: Sequence[poetry.Package],
+        options: Options,
+        original_branch: str,
+        refs: Optional[git.RefIndex] = None,
+        pull_requests: Optional[Set[str]] = None,
+        journal: Optional[Journal] = None,
+    ) -> None:
+        """Constructor."""
+        super().__init__(
+            packages[0],
+            options,
+            original_branch,
+            refs=refs,
+            pull_requests=pull_requests,
+            journal=journal,
+        )
+        self.packages = list(packages)
+
+        digest = hashlib.sha256(
+            " ".join(
+                sorted(f"{package.name}-{package.new_version}" for package in packages)
+            ).encode()
+        ).hexdigest()
+        self.branch = f"{program_name}/{options.branch_prefix}group-{digest[:8]}"
+        self.set_updated(self.packages)
+
+        self.actions.update = GroupUpdate(self)
+
+    def set_updated(self, packages: Sequence[poetry.Package]) -> None:
+        """Set the packages which were updated, and describe the update."""
+        self.updated = list(packages)
+
+        lines = [
+            f"Bump {package.name} from {package.old_version} to {package.new_version}"
+            for package in self.updated
+        ]
+        self.title = lines[0] if len(lines) == 1 else f"Bump {len(lines)} dependencies"
+        self.description = "\n".join(lines) if len(lines) != 1 else self.title
+
+        changes = _describe_changes(self.changes, self.updated)
+        if changes:
+            self.description = (
+                changes
+                if self.description == self.title
+                else f"{self.description}\n\n{changes}"
+            )
+
+    def set_changes(self, changes: Iterable[lockfile.Change]) -> None:
+        """Record the changes to the lock file, and describe the update.
+
+        Packages whose locked version did not change are dropped from the
+        update, unless the update branch already has the new versions.
+
+        Args:
+            changes: The changes to the lock file.
+        """
+        self.changes = list(changes)
+        if self.up_to_date:
+            return
+
+        self.set_updated(
+            [package for package in self.updated if self._changed(package)]
+        )
+
+    @property
+    def upgraded(self) -> bool:
+        """Return True if Poetry changed the locked version of any package."""
+        return bool(self.updated)
+
+    @property
+    def subject(self) -> str:
+        """Return the packages and versions to update to."""
+        return ", ".join(
+            f"{package.name} {package.new_version}" for package in self.packages
+        )
+
+    @property
+    def required(self) -> bool:
+        """Return True if the packages need to be updated."""
+        return bool(self.packages)
+
+
+def _allows(constraints: Iterable[str], version: versions.Version) -> bool:
+    """Return False if every constraint excludes the version.
+
+    Unsupported constraints are assumed to allow the version.
+
+    Args:
+        constraints: The version constraints.
+        version: The version to check.
+
+    Returns:
+        False if every constraint excludes the version, True otherwise.
+    """
+    for text in constraints:
+        constraint = versions.parse_constraint(text)
+        if constraint is None or constraint.allows(version):
+            return True
+    return False
+
+
+class Preflight:
+    """Check whether package updates can succeed, before running Poetry.
+
+    An update cannot succeed if the new version is excluded by the constraint
+    in ``pyproject.toml``, unless constraints are bumped using ``--latest``.
+    Nor can it succeed if the new version is excluded by a locked package
+    which depends on it, as Poetry keeps other packages at their locked
+    versions. By default, the locked packages are read from ``poetry.lock``
+    when first needed.
+
+    Args:
+        latest: Whether constraints in ``pyproject.toml`` are bumped.
+        packages: The locked packages.
+    """
+
+    def __init__(
+        self, latest: bool, packages: Optional[Iterable[lockfile.LockedPackage]] = None
+    ) -> None:
+        """Constructor."""
+        self.latest = latest
+        self._packages = packages
+        self._dependents: Optional[Dict[str, List[lockfile.LockedPackage]]] = None
+
+    @property
+    def dependents(self) -> Dict[str, List[lockfile.LockedPackage]]:
+        """Return the locked packages depending on each package."""
+        if self._dependents is None:
+            packages = self._packages if self._packages is not None else lockfile.read()
+            self._dependents = {}
+            for package in packages:
+                for name in package.dependencies:
+                    self._dependents.setdefault(name, []).append(package)
+        return self._dependents
+
+    def check(
+        self, package: poetry.Package, updating: Iterable[str] = ()
+    ) -> Optional[str]:
+        """Return the reason why the package update cannot succeed, if any.
+
+        Args:
+            package: The package to be updated.
+            updating: The canonical names of packages updated along with it.
+
+        Returns:
+            None if the update may succeed.
+        """
+        version = versions.parse(package.new_version)
+        if version is None:
+            return None
+
+        if not self.latest:
+            constraints = poetry.constraints(package.name)
+            if constraints is not None and not _allows(constraints, version):
+                return f"pyproject.toml requires {' or '.join(constraints)}"
+
+        name = poetry.canonicalize_name(package.name)
+        excluded = set(updating)
+        for dependent in self.dependents.get(name, []):
+            constraints = dependent.dependencies[name]
+            if poetry.canonicalize_name(dependent.name) not in excluded and not _allows(
+                constraints, version
+            ):
+                return (
+                    f"{dependent.name} {dependent.version} requires"
+                    f" {' or '.join(constraints)}"
+                )
+
+        return None
+
+
+class Pipeline:
+    """Run tasks in a background thread, in the order they were submitted.
+
+    Errors are collected and reported in submission order by :meth:`check`.
+
+    Args:
+        maxsize: The maximum number of pending tasks. Submitting blocks while
+            the queue is full.
+    """
+
+    def __init__(self, maxsize: int = 8) -> None:
+        """Constructor."""
+        self._queue: "queue.Queue[Optional[Tuple[str, Callable[[], None]]]]" = (
+            queue.Queue(maxsize)
         )
-        click.echo(message)
+        self._errors: List[Tuple[str, Exception]] = []
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            name, task = item
+            try:
+                task()
+            except Exception as error:
+                self._errors.append((name, error))
+
+    def submit(self, name: str, task: Callable[[], None]) -> None:
+        """Queue a task for the background thread."""
+        self._queue.put((name, task))
+
+    def join(self) -> None:
+        """Wait for all pending tasks to finish."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def check(self) -> None:
+        """Report the errors of failed tasks, in order.
+
+        Raises:
+            ClickException: At least one task failed.
+        """
+        for name, error in self._errors:
+            click.echo(f"{name}: {error}", err=True)
+
+        if self._errors:
+            names = ", ".join(name for name, _ in self._errors)
+            raise click.ClickException(f"Publishing failed for {names}")
+
+
+class PushBatch:
+    """Push the update branches of a run using a single ``git push``.
+
+    Branches are collected as updates complete. Branches with merge requests
+    are pushed one at a time, as their push options differ. Pull requests are
+    opened once their branches have been pushed.
+
+    Args:
+        remote: The remote to push to.
+    """
+
+    def __init__(self, remote: str) -> None:
+        """Constructor."""
+        self.remote = remote
+        self.updaters: List[PackageUpdater] = []
+
+    def add(self, updater: PackageUpdater) -> None:
+        """Add the update branch to the batch."""
+        self.updaters.append(updater)
+
+    def _push(self) -> Dict[str, Tuple[bool, str]]:
+        branches = [
+            updater.branch
+            for updater in self.updaters
+            if updater.actions.push.required
+            and not updater.options.merge_request
+            and not updater.done("pushed")
+        ]
+        if not branches:
+            return {}
+
+        with tracing.span("Push", branches=branches):
+            return git.push_branches(self.remote, branches)
+
+    def push(self) -> None:
+        """Push the branches and open pull requests, reporting each branch.
+
+        Raises:
+            ClickException: A branch could not be pushed, or a pull request
+                could not be opened.
+        """
+        results = self._push()
+        failed = []
+
+        for updater in self.updaters:
+            try:
+                if updater.actions.push.required and not updater.done("pushed"):
+                    if updater.options.merge_request:
+                        updater.push()
+                        results[updater.branch] = (True, "pushed")
+
+                    pushed, status = results[updater.branch]
+                    if not pushed:
+                        click.echo(f"{updater.branch}: {status}", err=True)
+                        updater.report("failed", error=status)
+                        failed.append(updater.subject)
+                        continue
+
+                    updater.report(
+                        "pushed", f"{updater.branch}: {status}", status=status
+                    )
+                    updater.record("pushed")
+
+                if updater.actions.pull_request.required:
+                    updater.open_pull_request()
+            except Exception as error:
+                click.echo(f"{updater.subject}: {error}", err=True)
+                updater.report("failed", error=str(error))
+                failed.append(updater.subject)
+
+        if failed:
+            raise click.ClickException(f"Publishing failed for {', '.join(failed)}")
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """Return the modification time and size of the file, if it exists."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _journal_path() -> Path:
+    """Return the path of the journal for the project in this directory."""
+    digest = hashlib.sha256(str(Path.cwd()).encode()).hexdigest()
+    return cache_directory() / "journals" / f"{digest[:16]}.jsonl"
+
+
+def _run_in_worktree(
+    updater: PackageUpdater,
+) -> Tuple[List[tracing.Span], PackageUpdater]:
+    """Run a package update in a linked working tree.
+
+    This function is the entry point for worker processes. The working tree is
+    created by the switch action and removed when the update is done. The
+    updater is returned with its outcome, together with the spans recorded by
+    the worker if profiling is enabled. If pushes are batched, publishing is
+    left to the caller.
+
+    Args:
+        updater: The package update to run.
+
+    Returns:
+        The spans recorded by the worker, and the updater.
+    """
+    profiler = tracing.enable() if updater.options.profile else None
+    batch = PushBatch(updater.options.remote) if updater.options.batch_push else None
+    cwd = os.getcwd()
+    try:
+        updater.run(batch=batch)
+    finally:
+        os.chdir(cwd)
+        if updater.worktree is not None and os.path.exists(updater.worktree):
+            git.remove_worktree(updater.worktree)
+        tracing.disable()
+
+    spans = profiler.spans if profiler is not None else []
+    return spans, updater
 
 
 class Updater:
     """Update packages."""
 
-    def __init__(self, options: Options) -> None:
-        """Constructor."""
+    def __init__(
+        self, options: Options, outdated: Optional[Sequence[poetry.Package]] = None
+    ) -> None:
+        """Constructor.
+
+        Args:
+            options: The options for the update operation.
+            outdated: The outdated packages, if they are already known.
+        """
         self.options = options
+        self.outdated = outdated
+        self.profiler: Optional[tracing.Profiler] = None
+        self.seen: Optional[Set[Tuple[str, str]]] = None
+        self.outcomes: List[Tuple[str, str]] = []
+        self.store: Optional[OutcomeStore] = None
+        self.journal: Optional[Journal] = None
+        self.project_hash = ""
 
     def run(self) -> None:
         """Run the package updates."""
-        if not git.is_clean():
+        if not self.options.profile:
+            self._run()
+            return
+
+        profiler = self.profiler = tracing.enable()
+        try:
+            self._run()
+        finally:
+            tracing.disable()
+            profiler.write(Path(self.options.profile))
+            click.echo(profiler.summary(), err=True)
+
+    def _run(self) -> None:
+        # Without checkout, only the project files are touched.
+        if not git.is_clean([] if self.options.checkout else project_files):
             raise click.ClickException("Working tree is not clean")
 
-        original_branch = git.current_branch()
+        if self.options.jobs != 1 and not self.options.commit:
+            raise click.ClickException("Parallel updates require --commit")
+
+        if not self.options.checkout and not self.options.commit:
+            raise click.ClickException("Updates without checkout require --commit")
+
+        # Committed updates leave the working tree unchanged, so there would be
+        # nothing to install at the end of the run.
+        if self.options.install and self.options.defer_install and self.options.commit:
+            raise click.ClickException("Deferred installs require --no-commit")
+
+        self.project_hash = poetry.project_hash()
+        if not self.options.dry_run:
+            self.journal = Journal(_journal_path(), resume=self.options.resume)
+
+        path = cache_directory() / "outcomes.sqlite3"
+        with contextlib.closing(OutcomeStore(path)) as self.store:
+            self._update()
+
+    def _update(self) -> None:
+        refs = git.RefIndex.load()
+        original_branch = refs.current_branch()
+        pull_requests = (
+            github.open_pull_requests()
+            if self.options.pull_request and not self.options.dry_run
+            else set()
+        )
+        updaters: Iterable[PackageUpdater] = self._create_updaters(
+            original_branch, refs, pull_requests
+        )
+        if self.options.prefetch and self.options.install and not self.options.dry_run:
+            updaters = self._prefetch(updaters)
+
+        batch = (
+            PushBatch(self.options.remote)
+            if self.options.batch_push and not self.options.dry_run
+            else None
+        )
+        pipeline = (
+            Pipeline()
+            if self.options.pipeline
+            and self.options.jobs == 1
+            and not self.options.dry_run
+            and batch is None
+            else None
+        )
+
+        try:
+            if self.options.jobs != 1 and not self.options.group:
+                self._run_in_parallel(updaters, batch)
+            else:
+                try:
+                    self._run_serially(updaters, pipeline, batch)
+                finally:
+                    if pipeline is not None:
+                        pipeline.join()
+        finally:
+            # Return to the original branch even if an update failed, so that
+            # the run can be resumed from there.
+            if original_branch != refs.current_branch():
+                refs.switch(original_branch)
+
+        if self.options.install and self.options.defer_install:
+            self._install()
+
+        if batch is not None:
+            batch.push()
+
+        if pipeline is not None:
+            pipeline.check()
+
+    def _install(self) -> None:
+        """Install the updates left in the working tree, using a single sync.
+
+        Nothing is installed if the project files are unchanged, for example
+        when Poetry refused every update.
+        """
+        if poetry.project_hash() == self.project_hash:
+            return
+
+        with tracing.span("Install"):
+            poetry.install()
+
+    def watch(self, cycles: int = None) -> None:
+        """Run the package updates repeatedly, staying resident.
+
+        The updates run every ``watch`` seconds, and as soon as ``poetry.lock``
+        changes on disk. Only packages with a version not seen in a previous
+        run are updated. A version counts as seen once its update finished,
+        so failed updates are retried. The parsed configuration is kept in
+        memory, but the index of local branches is reloaded for every run, as
+        the user may have switched branches or committed in the meantime. When
+        the lock file changes, refused or skipped versions are considered
+        again. Errors are reported, and do not end the process.
+
+        Args:
+            cycles: The number of runs (optional). By default, run forever.
+        """
+        self.seen = set()
+        path = Path("poetry.lock")
+        interval = self.options.watch
+        cycle = 0
+
+        while True:
+            try:
+                self.run()
+            except click.ClickException as error:
+                error.show()
+            except Exception as error:
+                click.echo(f"{type(error).__name__}: {error}", err=True)
+
+            cycle += 1
+            if cycles is not None and cycle >= cycles:
+                return
+
+            stamp = _stamp(path)
+            deadline = time.monotonic() + interval
+            while time.monotonic() < deadline:
+                time.sleep(min(1.0, interval))
+                if _stamp(path) != stamp:
+                    self.seen = set()
+                    break
 
-        for package in poetry.show_outdated():
-            updater = PackageUpdater(package, self.options, original_branch)
+    def _create_updaters(
+        self, original_branch: str, refs: git.RefIndex, pull_requests: Set[str]
+    ) -> Iterator[PackageUpdater]:
+        preflight = Preflight(self.options.latest)
+        updaters = (
+            PackageUpdater(
+                package,
+                self.options,
+                original_branch,
+                refs=refs,
+                pull_requests=pull_requests,
+                journal=self.journal,
+            )
+            for package in self._unseen(self.show_outdated())
+        )
+
+        if not self.options.group:
+            for updater in updaters:
+                if not updater.required or (
+                    self._check_outcome(updater.package)
+                    and self._check(preflight, updater.package)
+                ):
+                    yield updater
+            return
+
+        packages = [updater.package for updater in updaters if updater.required]
+        names = {poetry.canonicalize_name(package.name) for package in packages}
+        packages = [
+            package for package in packages if self._check(preflight, package, names)
+        ]
+        if packages:
+            yield GroupUpdater(
+                packages,
+                self.options,
+                original_branch,
+                refs=refs,
+                pull_requests=pull_requests,
+                journal=self.journal,
+            )
+
+    def _prefetch(self, updaters: Iterable[PackageUpdater]) -> List[PackageUpdater]:
+        """Download the new versions into the cache of Poetry, concurrently."""
+        from . import index, prefetch
+
+        updaters = list(updaters)
+        packages = [
+            package
+            for updater in updaters
+            if updater.required
+            for package in updater.packages
+        ]
+
+        with tracing.span("Prefetch", packages=len(packages)):
+            prefetch.prefetch(packages, poetry.default_source() or index.PYPI_URL)
+
+        return updaters
+
+    def _key(self, package: poetry.Package) -> Tuple[str, str, str, str]:
+        return (str(Path.cwd()), package.name, package.new_version, self.project_hash)
+
+    def _check_outcome(self, package: poetry.Package) -> bool:
+        """Return False if Poetry refused the package update before."""
+        if self.options.retry_refused or self.store is None:
+            return True
+
+        if self.store.get(*self._key(package)) != "refused":
+            return True
+
+        subject = f"{package.name} {package.new_version}"
+        events.report(
+            self.options.output_format,
+            "skipped",
+            f"Skipping {subject} (Poetry refused upgrade before)",
+            packages=[package],
+            reason="Poetry refused upgrade before",
+        )
+        self._see([package])
+        self.outcomes.append((subject, "refused before"))
+        return False
+
+    def _finish(self, updater: PackageUpdater) -> None:
+        """Record the outcome of the package update."""
+        self._see(updater.packages)
+        self.outcomes.append((updater.subject, updater.outcome or ""))
+        if (
+            self.store is not None
+            and updater.outcome is not None
+            and not isinstance(updater, GroupUpdater)
+        ):
+            self.store.set(*self._key(updater.package), updater.outcome)
+
+    def _check(
+        self,
+        preflight: Preflight,
+        package: poetry.Package,
+        updating: Iterable[str] = (),
+    ) -> bool:
+        """Return True if the package update may succeed, or report why not."""
+        reason = preflight.check(package, updating)
+        if reason is not None:
+            subject = f"{package.name} {package.new_version}"
+            events.report(
+                self.options.output_format,
+                "skipped",
+                f"Skipping {subject} ({reason})",
+                packages=[package],
+                reason=reason,
+            )
+            self._see([package])
+            self.outcomes.append((subject, f"skipped: {reason}"))
+        return reason is None
+
+    def _unseen(self, packages: Iterable[poetry.Package]) -> Iterator[poetry.Package]:
+        """Yield packages whose new version was not seen before, if watching."""
+        seen = self.seen if self.seen is not None else set()
+        for package in packages:
+            if (package.name, package.new_version) not in seen:
+                yield package
+
+    def _see(self, packages: Iterable[poetry.Package]) -> None:
+        """Mark the new versions of the packages as seen, if watching."""
+        if self.seen is not None:
+            self.seen.update(
+                (package.name, package.new_version) for package in packages
+            )
+
+    def _list_outdated(self) -> Iterable[poetry.Package]:
+        if self.options.native:
+            from . import index
+
+            return index.show_outdated(poetry.default_source() or index.PYPI_URL)
+        return poetry.show_outdated()
+
+    def show_outdated(self) -> Iterable[poetry.Package]:
+        """Return the outdated packages, using the cache if enabled."""
+        if self.outdated is not None:
+            return self.outdated
+
+        if not self.options.cache_ttl:
+            return self._list_outdated()
+
+        cache = Cache(cache_directory() / "outdated", self.options.cache_ttl)
+        key = poetry.project_hash()
+        entries = cache.get(key)
+
+        if entries is not None:
+            return [poetry.Package(*entry) for entry in entries]
+
+        packages = list(self._list_outdated())
+        cache.set(key, [astuple(package) for package in packages])
+        return packages
+
+    def _run_serially(
+        self,
+        updaters: Iterable[PackageUpdater],
+        pipeline: Pipeline = None,
+        batch: PushBatch = None,
+    ) -> None:
+        for updater in updaters:
             if updater.required:
                 updater.show()
-                if not self.options.dry_run:
-                    updater.run()
+                if self.options.dry_run:
+                    self._see(updater.packages)
+                else:
+                    updater.run(pipeline, batch)
+                    self._finish(updater)
+
+    def _run_in_parallel(
+        self, updaters: Iterable[PackageUpdater], batch: PushBatch = None
+    ) -> None:
+        with tempfile.TemporaryDirectory(prefix=f"{program_name}-") as directory:
+            with ProcessPoolExecutor(max_workers=self.options.jobs or None) as pool:
+                futures = []
+                for updater in updaters:
+                    if updater.required:
+                        updater.show()
+                        if self.options.dry_run:
+                            self._see(updater.packages)
+                        else:
+                            package = updater.package
+                            updater.worktree = os.path.join(
+                                directory, f"{package.name}-{package.new_version}"
+                            )
+                            futures.append(pool.submit(_run_in_worktree, updater))
 
-        if original_branch != git.current_branch():
-            git.switch(original_branch)
+                for future in futures:
+                    spans, updater = future.result()
+                    self._finish(updater)
+                    if self.profiler is not None:
+                        self.profiler.extend(spans)
+                    if batch is not None and updater.outcome == "updated":
+                        batch.add(updater)
@@ -0,0 +1,293 @@
+"""Version handling according to PEP 440."""
+import functools
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+
+_VERSION_PATTERN = re.compile(
+    r"""
+    v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?:
+        [-_.]?
+        (?P<pre_l>alpha|a|beta|b|preview|pre|c|rc)
+        [-_.]?
+        (?P<pre_n>[0-9]+)?
+    )?
+    (?:
+        -(?P<post_n1>[0-9]+)
+        |
+        [-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?
+    )?
+    (?:[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>[0-9]+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+_PRE_RELEASE_ORDER = {
+    "a": 0,
+    "alpha": 0,
+    "b": 1,
+    "beta": 1,
+    "c": 2,
+    "rc": 2,
+    "pre": 2,
+    "preview": 2,
+}
+
+
+_CONSTRAINT_PATTERN = re.compile(
+    r"\s*(?P<operator>===|==|!=|<=|>=|~=|<|>|\^|~)?\s*(?P<version>[^\s,|<>=!~^]+)"
+    r"\s*,?"
+)
+
+
+class InvalidVersion(ValueError):
+    """The version does not conform to PEP 440."""
+
+
+class InvalidConstraint(ValueError):
+    """The version constraint is not supported."""
+
+
+@functools.total_ordering
+class Version:
+    """Version according to PEP 440.
+
+    Args:
+        text: The version string.
+
+    Raises:
+        InvalidVersion: The version string is not valid.
+    """
+
+    def __init__(self, text: str) -> None:
+        """Constructor."""
+        match = _VERSION_PATTERN.fullmatch(text.strip())
+        if match is None:
+            raise InvalidVersion(text)
+
+        self.text = text
+        self.epoch = int(match["epoch"] or 0)
+        self.release: Tuple[int, ...] = tuple(
+            int(part) for part in match["release"].split(".")
+        )
+        self.pre: Optional[Tuple[int, int]] = (
+            (_PRE_RELEASE_ORDER[match["pre_l"].lower()], int(match["pre_n"] or 0))
+            if match["pre_l"]
+            else None
+        )
+        self.post: Optional[int] = (
+            int(match["post_n1"] or match["post_n2"] or 0)
+            if match["post_n1"] or match["post_l"]
+            else None
+        )
+        self.dev: Optional[int] = int(match["dev_n"] or 0) if match["dev_l"] else None
+        self.local: Optional[str] = match["local"]
+
+    @property
+    def is_prerelease(self) -> bool:
+        """Return True if this is a pre-release or development release."""
+        return self.pre is not None or self.dev is not None
+
+    def _key(self) -> Tuple[Any, ...]:
+        release = list(self.release)
+        while len(release) > 1 and release[-1] == 0:
+            release.pop()
+
+        # Sort development releases of final releases before pre-releases.
+        if self.pre is None and self.post is None and self.dev is not None:
+            pre: Tuple[int, ...] = (-1,)
+        elif self.pre is None:
+            pre = (1,)
+        else:
+            pre = (0, *self.pre)
+
+        post = (-1,) if self.post is None else (0, self.post)
+        dev = (1,) if self.dev is None else (0, self.dev)
+        local = (
+            ()
+            if self.local is None
+            else tuple(
+                (1, int(part), "") if part.isdigit() else (0, 0, part.lower())
+                for part in re.split(r"[-_.]", self.local)
+            )
+        )
+        return self.epoch, tuple(release), pre, post, dev, local
+
+    def __eq__(self, other: object) -> bool:
+        """Return True if the versions are equal."""
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __lt__(self, other: "Version") -> bool:
+        """Return True if this version is lower than the other version."""
+        return self._key() < other._key()
+
+    def __hash__(self) -> int:
+        """Return the hash value."""
+        return hash(self._key())
+
+    def __str__(self) -> str:
+        """Return the version string."""
+        return self.text
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"Version({self.text!r})"
+
+
+def parse(text: str) -> Optional[Version]:
+    """Return the version, or None if the version string is not valid."""
+    try:
+        return Version(text)
+    except InvalidVersion:
+        return None
+
+
+def _bump(release: Tuple[int, ...], position: int) -> "Version":
+    """Return the first version after the release with the given prefix."""
+    parts = [*release[:position], release[position] + 1]
+    return Version(".".join(map(str, parts)))
+
+
+def _before(version: "Version", bound: "Version") -> bool:
+    """Return True if the version is below the exclusive upper bound.
+
+    As in PEP 440, pre-releases of the bound are excluded unless the bound is
+    itself a pre-release.
+
+    Args:
+        version: The version to check.
+        bound: The exclusive upper bound.
+
+    Returns:
+        True if the version is below the bound.
+    """
+    if version >= bound:
+        return False
+    if version.is_prerelease and not bound.is_prerelease:
+        return _final(version) != _final(bound)
+    return True
+
+
+def _final(version: "Version") -> "Version":
+    """Return the final release for a version."""
+    return Version(f"{version.epoch}!{'.'.join(map(str, version.release))}")
+
+
+Predicate = Callable[[Version], bool]
+
+
+def _range(lower: "Version", upper: "Version") -> Predicate:
+    return lambda version: version >= lower and _before(version, upper)
+
+
+def _compile(operator: str, text: str) -> Predicate:  # noqa: C901
+    """Return a predicate for a single constraint."""
+    if text == "*":
+        return lambda version: True
+
+    if operator == "===":
+        return lambda version: version.text == text
+
+    if text.endswith(".*"):
+        prefix = Version(text[:-2])
+        upper = _bump(prefix.release, len(prefix.release) - 1)
+        predicate = _range(prefix, upper)
+        if operator == "!=":
+            return lambda version: not predicate(version)
+        if operator in ("", "=="):
+            return predicate
+        raise InvalidConstraint(f"{operator}{text}")
+
+    bound = Version(text)
+    release = bound.release
+
+    if operator == "^":
+        position = next(
+            (index for index, part in enumerate(release) if part), len(release) - 1,
+        )
+        return _range(bound, _bump(release, position))
+
+    if operator == "~":
+        return _range(bound, _bump(release, min(1, len(release) - 1)))
+
+    if operator == "~=":
+        if len(release) < 2:
+            raise InvalidConstraint(f"{operator}{text}")
+        return _range(bound, _bump(release, len(release) - 2))
+
+    comparisons = {
+        "": lambda version: version == bound,
+        "==": lambda version: version == bound,
+        "!=": lambda version: version != bound,
+        "<": lambda version: _before(version, bound),
+        "<=": lambda version: version <= bound,
+        ">": lambda version: version > bound,
+        ">=": lambda version: version >= bound,
+    }
+    return comparisons[operator]
+
+
+class Constraint:
+    """Version constraint in Poetry or PEP 440 syntax.
+
+    Constraints may use comparison operators, wildcards, and the caret and
+    tilde operators of Poetry. Constraints separated by commas or spaces must
+    all be satisfied, and alternatives are separated by ``||``.
+
+    Args:
+        text: The constraint string.
+
+    Raises:
+        InvalidConstraint: The constraint string is not supported.
+    """
+
+    def __init__(self, text: str) -> None:
+        """Constructor."""
+        self.text = text
+        self._alternatives: List[List[Predicate]] = []
+
+        for alternative in text.split("||"):
+            predicates = []
+            position = 0
+            alternative = alternative.strip()
+            while position < len(alternative):
+                match = _CONSTRAINT_PATTERN.match(alternative, position)
+                if match is None:
+                    raise InvalidConstraint(text)
+                try:
+                    predicates.append(
+                        _compile(match["operator"] or "", match["version"])
+                    )
+                except InvalidVersion as error:
+                    raise InvalidConstraint(text) from error
+                position = match.end()
+            self._alternatives.append(predicates)
+
+    def allows(self, version: Version) -> bool:
+        """Return True if the version satisfies the constraint."""
+        return any(
+            all(predicate(version) for predicate in predicates)
+            for predicates in self._alternatives
+        )
+
+    def __str__(self) -> str:
+        """Return the constraint string."""
+        return self.text
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"Constraint({self.text!r})"
+
+
+def parse_constraint(text: str) -> Optional[Constraint]:
+    """Return the constraint, or None if it is not supported."""
+    try:
+        return Constraint(text)
+    except InvalidConstraint:
+        return None
@@ -5,6 +5,7 @@ from pathlib import Path
 import subprocess  # noqa: S404
 from typing import Iterator
 
+from _pytest.monkeypatch import MonkeyPatch
 import pytest
 
 from poetry_up import poetry
@@ -21,6 +22,14 @@ def working_directory(directory: Path) -> Iterator[None]:
         os.chdir(cwd)
 
 
+@pytest.fixture(autouse=True)
+def cache_directory(monkeypatch: MonkeyPatch, tmp_path: Path) -> Path:
+    """Isolated cache directory."""
+    directory = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(directory))
+    return directory / "poetry-up"
+
+
 @pytest.fixture
 def repository(shared_datadir: Path, tmp_path: Path) -> Iterator[Path]:
     """Git repository with Poetry project."""
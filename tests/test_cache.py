@@ -0,0 +1,74 @@
+"""Tests for cache module."""
+import os
+from pathlib import Path
+import time
+
+import pytest
+
+from poetry_up import cache as cache_module
+from poetry_up.cache import Cache
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> Cache:
+    """Cache with a time-to-live of one minute."""
+    return Cache(tmp_path / "entries", ttl=60)
+
+
+def expire(cache: Cache, key: str) -> None:
+    """Backdate the cache entry beyond its time-to-live."""
+    path = cache.directory / f"{key}.json"
+    timestamp = time.time() - cache.ttl - 1
+    os.utime(path, (timestamp, timestamp))
+
+
+def test_cache_directory(cache_directory: Path) -> None:
+    """It is located in the XDG cache directory."""
+    assert cache_directory == cache_module.cache_directory()
+
+
+def test_get_missing(cache: Cache) -> None:
+    """It returns None for unknown keys."""
+    assert cache.get("key") is None
+
+
+def test_set_and_get(cache: Cache) -> None:
+    """It returns the stored value."""
+    cache.set("key", [["marshmallow", "3.0.0", "3.5.1"]])
+    assert cache.get("key") == [["marshmallow", "3.0.0", "3.5.1"]]
+
+
+def test_get_expired(cache: Cache) -> None:
+    """It does not return expired entries."""
+    cache.set("key", "value")
+    expire(cache, "key")
+    assert cache.get("key") is None
+    assert not list(cache.directory.iterdir())
+
+
+def test_set_evicts_expired(cache: Cache) -> None:
+    """It removes expired entries when storing a value."""
+    cache.set("old", "value")
+    expire(cache, "old")
+    cache.set("new", "value")
+    assert [path.name for path in cache.directory.iterdir()] == ["new.json"]
+
+
+def test_evict_keeps_fresh_entries(cache: Cache) -> None:
+    """It keeps entries within their time-to-live."""
+    cache.set("key", "value")
+    cache.evict()
+    assert cache.get("key") == "value"
+
+
+def test_outcome_store(tmp_path: Path) -> None:
+    """It records outcomes by project, package, version, and project hash."""
+    path = tmp_path / "outcomes.sqlite3"
+    store = cache_module.OutcomeStore(path)
+    store.set("project", "click", "8.0", "abc", "refused")
+    store.close()
+
+    store = cache_module.OutcomeStore(path)
+    assert store.get("project", "click", "8.0", "abc") == "refused"
+    assert store.get("project", "click", "8.0", "def") is None
+    store.close()
@@ -1,14 +1,24 @@
 """Test cases for the console module."""
+from concurrent.futures import ThreadPoolExecutor
+import json
 from pathlib import Path
-from typing import Iterator, List
+import subprocess  # noqa: S404
+import sys
+import time
+from typing import Any, Callable, Iterator, List
 
 from _pytest.monkeypatch import MonkeyPatch
 from click.testing import CliRunner
+import pretend
 import pytest
 
 from poetry_up import console, git, poetry
 
 
+# Budget for importing the package when printing the version, in seconds.
+IMPORT_TIME_BUDGET = 0.25
+
+
 @pytest.fixture
 def runner() -> CliRunner:
     """Fixture for invoking command-line interfaces."""
@@ -62,9 +72,9 @@ def stub_git_push(monkeypatch: MonkeyPatch) -> None:
 
 
 @pytest.fixture
-def stub_pull_request_exists(monkeypatch: MonkeyPatch) -> None:
-    """Stub for github.pull_request_exists."""
-    monkeypatch.setattr("poetry_up.github.pull_request_exists", lambda branch: False)
+def stub_open_pull_requests(monkeypatch: MonkeyPatch) -> None:
+    """Stub for github.open_pull_requests."""
+    monkeypatch.setattr("poetry_up.github.open_pull_requests", lambda: set())
 
 
 @pytest.fixture
@@ -73,6 +83,60 @@ def stub_create_pull_request(monkeypatch: MonkeyPatch) -> None:
     monkeypatch.setattr("poetry_up.github.create_pull_request", lambda *args: None)
 
 
+@pytest.fixture
+def stub_process_pool(monkeypatch: MonkeyPatch) -> None:
+    """Stub for the process pool, using threads instead."""
+    monkeypatch.setattr("poetry_up.update.ProcessPoolExecutor", ThreadPoolExecutor)
+
+
+class StopWatching(Exception):
+    """Raised to end the watch loop."""
+
+
+@pytest.fixture
+def watch_cycles(monkeypatch: MonkeyPatch) -> List[Callable[[], None]]:
+    """Stub for time.sleep which runs a callback between watch cycles.
+
+    The stub sleeps for the entire interval after each callback, and raises
+    StopWatching when no callbacks are left.
+
+    Args:
+        monkeypatch: The pytest monkeypatch fixture.
+
+    Returns:
+        The callbacks, to be appended by the test.
+    """
+    callbacks: List[Callable[[], None]] = []
+    sleep = time.sleep
+
+    def stub(seconds: float) -> None:
+        if not callbacks:
+            raise StopWatching()
+        callbacks.pop(0)()
+        sleep(seconds)
+
+    monkeypatch.setattr("poetry_up.update.time.sleep", stub)
+    return callbacks
+
+
+@pytest.fixture
+def stub_poetry_update_any(monkeypatch: MonkeyPatch) -> None:
+    """Stub for poetry.update which locks the new version of any package."""
+
+    def stub(package: poetry.Package, lock: bool = False, latest: bool = False) -> None:
+        path = Path("poetry.lock")
+        text = path.read_text()
+        path.write_text(
+            text.replace(
+                f'version = "{package.old_version}"',
+                f'version = "{package.new_version}"',
+                1,
+            )
+        )
+
+    monkeypatch.setattr("poetry_up.poetry.update", stub)
+
+
 class TestMain:
     """Tests for main."""
 
@@ -83,6 +147,39 @@ class TestMain:
         result = runner.invoke(console.main, ["--dry-run"])
         assert result.exit_code == 0
 
+    def test_it_prints_version(self, runner: CliRunner) -> None:
+        """It prints the version."""
+        result = runner.invoke(console.main, ["--version"], prog_name="poetry-up")
+        assert result.output.startswith("poetry-up, version ")
+
+    def test_it_starts_quickly(self) -> None:
+        """It prints the version without importing heavy modules."""
+        process = subprocess.run(  # noqa: S603
+            [sys.executable, "-X", "importtime", "-m", "poetry_up", "--version"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+
+        # Lines have the form "import time: self | cumulative | name", with the
+        # name indented by nesting level.
+        imports = {}
+        for line in process.stderr.splitlines():
+            if line.startswith("import time:") and "cumulative" not in line:
+                _, cumulative, name = line.split("|")
+                imports[name.strip()] = (name, int(cumulative))
+
+        assert not {"tomlkit", "http.client", "sqlite3", "poetry_up.update"} & set(
+            imports
+        )
+
+        elapsed = sum(
+            microseconds
+            for module, (name, microseconds) in imports.items()
+            if module.startswith("poetry_up") and not name.startswith("  ")
+        )
+        assert elapsed / 1e6 < IMPORT_TIME_BUDGET
+
     @pytest.mark.parametrize(
         "options",
         [
@@ -95,6 +192,9 @@ class TestMain:
             ["--push", "--merge-request"],
             ["marshmallow"],
             ["another-package"],
+            ["--jobs=2"],
+            ["--jobs=2", "--dry-run"],
+            ["--push", "--pull-request", "--pipeline"],
         ],
     )
     def test_it_succeeds(
@@ -105,8 +205,9 @@ class TestMain:
         stub_poetry_show_outdated: None,
         stub_poetry_update: None,
         stub_git_push: None,
-        stub_pull_request_exists: None,
+        stub_open_pull_requests: None,
         stub_create_pull_request: None,
+        stub_process_pool: None,
     ) -> None:
         """It exits with a status code of zero."""
         result = runner.invoke(console.main, options)
@@ -144,3 +245,825 @@ class TestMain:
         """It removes the branch if the upgrade was refused."""
         runner.invoke(console.main, catch_exceptions=False)
         assert not git.branch_exists("poetry-up/marshmallow-3.5.1")
+
+    def test_it_restores_files_on_refused_upgrade(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """It discards changes to the project files if the upgrade was refused."""
+
+        def stub(package: poetry.Package, lock: bool, latest: bool) -> None:
+            with Path("pyproject.toml").open(mode="a") as io:
+                io.write("\n")
+
+        monkeypatch.setattr("poetry_up.poetry.update", stub)
+        runner.invoke(console.main, catch_exceptions=False)
+        assert git.current_branch() == "master"
+        assert git.is_clean()
+
+    @pytest.mark.parametrize("options", [[], ["--no-checkout"], ["--jobs=2"]])
+    def test_it_publishes_existing_branch_on_rerun(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        options: List[str],
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It keeps and pushes an update branch created by an earlier run."""
+        runner.invoke(console.main, options, catch_exceptions=False)
+        branch = "poetry-up/marshmallow-3.5.1"
+        sha = git.resolve_branch(branch)
+
+        push = pretend.call_recorder(lambda *args, **kwargs: None)
+        monkeypatch.setattr("poetry_up.git.push", push)
+        result = runner.invoke(
+            console.main, [*options, "--push"], catch_exceptions=False
+        )
+
+        assert result.exit_code == 0
+        assert "refused" not in result.output
+        assert git.resolve_branch(branch) == sha
+        assert len(push.calls) == 1
+        assert git.current_branch() == "master"
+
+    @pytest.mark.parametrize("options", [[], ["--no-checkout"], ["--jobs=2"]])
+    def test_it_keeps_existing_branch_despite_other_changes(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        shared_datadir: Path,
+        monkeypatch: MonkeyPatch,
+        options: List[str],
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It discards other changes if the branch already has the upgrade."""
+        runner.invoke(console.main, options, catch_exceptions=False)
+        branch = "poetry-up/marshmallow-3.5.1"
+        sha = git.resolve_branch(branch)
+
+        def stub(package: poetry.Package, lock: bool, latest: bool) -> None:
+            text = (shared_datadir / "poetry.lock.new").read_text()
+            Path("poetry.lock").write_text(
+                f'[[package]]\nname = "six"\nversion = "1.15.0"\n\n{text}'
+            )
+
+        monkeypatch.setattr("poetry_up.poetry.update", stub)
+        result = runner.invoke(console.main, options, catch_exceptions=False)
+
+        assert result.exit_code == 0
+        assert git.resolve_branch(branch) == sha
+        assert git.current_branch() == "master"
+        assert git.is_clean()
+
+    @pytest.mark.parametrize("options", [[], ["--jobs=2"]])
+    def test_it_keeps_existing_branch_on_refused_upgrade(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        options: List[str],
+        stub_poetry_show_outdated: None,
+        stub_poetry_update_noop: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It keeps an update branch created before if the upgrade was refused."""
+        branch = "poetry-up/marshmallow-3.5.1"
+        git.git("branch", branch)
+        result = runner.invoke(console.main, options, catch_exceptions=False)
+
+        assert "refused" in result.output
+        assert git.resolve_branch(branch) == git.resolve_branch("master")
+        assert git.current_branch() == "master"
+        assert git.is_clean()
+
+    def test_it_does_not_touch_git_on_refused_upgrade(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update_noop: None,
+    ) -> None:
+        """It creates no branch if the upgrade was refused."""
+        switch = pretend.call_recorder(lambda *args, **kwargs: None)
+        monkeypatch.setattr("poetry_up.git.switch", switch)
+
+        runner.invoke(console.main, catch_exceptions=False)
+        assert not switch.calls
+
+    def test_it_restores_files_on_failed_upgrade(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """It discards changes to the project files if Poetry failed."""
+
+        def stub(package: poetry.Package, lock: bool, latest: bool) -> None:
+            with Path("pyproject.toml").open(mode="a") as io:
+                io.write("\n")
+            raise subprocess.CalledProcessError(1, ["poetry", "update"])
+
+        monkeypatch.setattr("poetry_up.poetry.update", stub)
+        runner.invoke(console.main)
+        assert git.is_clean()
+
+    def test_it_creates_branch_from_upstream(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It creates the branch at the upstream branch, from another branch."""
+        git.switch("topic", create=True)
+        with Path("pyproject.toml").open(mode="a") as io:
+            io.write("\n")
+        git.add(["pyproject.toml"])
+        git.commit("Change pyproject.toml")
+
+        runner.invoke(console.main, catch_exceptions=False)
+
+        branch = "poetry-up/marshmallow-3.5.1"
+        assert git.resolve(f"{branch}^") == git.resolve("master")
+        assert git.current_branch() == "topic"
+        assert git.is_clean()
+
+    def test_it_describes_transitive_changes(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        shared_datadir: Path,
+        stub_poetry_show_outdated: None,
+        stub_open_pull_requests: None,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """It lists other changes to the lock file in the pull request."""
+
+        def stub(package: poetry.Package, lock: bool, latest: bool) -> None:
+            text = (shared_datadir / "poetry.lock.new").read_text()
+            Path("poetry.lock").write_text(
+                f'[[package]]\nname = "six"\nversion = "1.15.0"\n\n{text}'
+            )
+
+        descriptions = []
+        monkeypatch.setattr("poetry_up.poetry.update", stub)
+        monkeypatch.setattr(
+            "poetry_up.github.create_pull_request",
+            lambda title, description, head: descriptions.append(description),
+        )
+        runner.invoke(console.main, ["--pull-request"], catch_exceptions=False)
+        assert descriptions == ["Other changes to poetry.lock:\n\n- six: added 1.15.0"]
+
+    def test_it_skips_excluded_upgrade(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_update: None,
+    ) -> None:
+        """It skips upgrades excluded by pyproject.toml without switching."""
+
+        def stub() -> Iterator[poetry.Package]:
+            yield poetry.Package("marshmallow", "3.0.0", "4.0.0")
+
+        monkeypatch.setattr("poetry_up.poetry.show_outdated", stub)
+        result = runner.invoke(console.main, ["--no-latest"], catch_exceptions=False)
+        assert "Skipping marshmallow 4.0.0 (pyproject.toml requires" in result.output
+        assert not git.branch_exists("poetry-up/marshmallow-4.0.0")
+
+    def test_it_creates_branch_without_checkout(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It creates the branch without touching the working tree."""
+        runner.invoke(console.main, ["--no-checkout"], catch_exceptions=False)
+        branch = "poetry-up/marshmallow-3.5.1"
+        assert git.branch_exists(branch)
+        assert git.current_branch() == "master"
+        assert git.is_clean()
+        assert (
+            b'version = "3.5.1"'
+            in git.read_files(branch, ["poetry.lock"])["poetry.lock"]
+        )
+
+    def test_it_skips_refused_upgrade_without_checkout(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update_noop: None,
+    ) -> None:
+        """It does not create the branch if the upgrade was refused."""
+        runner.invoke(console.main, ["--no-checkout"], catch_exceptions=False)
+        assert not git.branch_exists("poetry-up/marshmallow-3.5.1")
+        assert git.is_clean()
+
+    def test_it_watches_from_the_current_branch(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        watch_cycles: List[Callable[[], None]],
+        stub_poetry_update_any: None,
+    ) -> None:
+        """It returns to the branch checked out by the user between runs."""
+        versions = iter(["3.5.1", "3.6.0"])
+
+        def stub() -> Iterator[poetry.Package]:
+            yield poetry.Package("marshmallow", "3.0.0", next(versions))
+
+        monkeypatch.setattr("poetry_up.poetry.show_outdated", stub)
+        watch_cycles.append(lambda: git.switch("develop", create=True))
+
+        result = runner.invoke(console.main, ["--watch=0.01"])
+
+        assert isinstance(result.exception, StopWatching)
+        assert git.branch_exists("poetry-up/marshmallow-3.6.0")
+        assert git.current_branch() == "develop"
+
+    def test_it_watches_upstream_without_checkout(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        watch_cycles: List[Callable[[], None]],
+        stub_poetry_update_any: None,
+    ) -> None:
+        """It creates branches from the upstream branch as of each run."""
+        versions = iter(["3.5.1", "3.6.0"])
+
+        def stub() -> Iterator[poetry.Package]:
+            yield poetry.Package("marshmallow", "3.0.0", next(versions))
+
+        def commit() -> None:
+            Path("README.md").write_text("# Project\n")
+            git.add(["README.md"])
+            git.commit("Add README")
+
+        monkeypatch.setattr("poetry_up.poetry.show_outdated", stub)
+        watch_cycles.append(commit)
+
+        result = runner.invoke(console.main, ["--watch=0.01", "--no-checkout"])
+
+        assert isinstance(result.exception, StopWatching)
+        assert git.resolve("poetry-up/marshmallow-3.6.0^") == git.resolve("master")
+
+    @pytest.mark.parametrize("options", [[], ["--jobs=2"]])
+    def test_it_pushes_branches_in_batch(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        options: List[str],
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It pushes the update branches at the end, reporting their status."""
+        result = runner.invoke(
+            console.main, ["--push", "--batch-push", *options], catch_exceptions=False
+        )
+        assert "poetry-up/marshmallow-3.5.1: [new branch]" in result.output
+        remote = git.git("ls-remote", "--heads", "origin").stdout
+        assert "refs/heads/poetry-up/marshmallow-3.5.1" in remote
+
+    def test_it_pushes_merge_requests_in_batch(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It pushes branches with merge requests one at a time."""
+        push = pretend.call_recorder(lambda *args, **kwargs: None)
+        monkeypatch.setattr("poetry_up.git.push", push)
+        result = runner.invoke(
+            console.main,
+            ["--push", "--merge-request", "--batch-push"],
+            catch_exceptions=False,
+        )
+        [call] = push.calls
+        assert (
+            call.kwargs["merge_request"].title == "Bump marshmallow from 3.0.0 to 3.5.1"
+        )
+        assert "poetry-up/marshmallow-3.5.1: pushed" in result.output
+
+    def test_it_opens_pull_requests_in_batch(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_open_pull_requests: None,
+    ) -> None:
+        """It opens pull requests at the end of the run, without pushing."""
+        create = pretend.call_recorder(lambda title, body, head: None)
+        monkeypatch.setattr("poetry_up.github.create_pull_request", create)
+        result = runner.invoke(
+            console.main, ["--pull-request", "--batch-push"], catch_exceptions=False
+        )
+        assert result.exit_code == 0
+        [call] = create.calls
+        assert call.args[2] == "poetry-up/marshmallow-3.5.1"
+
+    def test_it_reports_failed_batch_push(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It reports branches which could not be pushed."""
+        git.git("remote", "set-url", "origin", str(repository / "missing"))
+        result = runner.invoke(console.main, ["--push", "--batch-push"])
+        assert result.exit_code == 1
+        assert "poetry-up/marshmallow-3.5.1: " in result.output
+        assert "Publishing failed for marshmallow 3.5.1" in result.output
+
+    def test_it_reports_failed_merge_request_in_batch(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It reports branches with merge requests which could not be pushed."""
+
+        def stub(remote: str, branch: str, merge_request: git.MergeRequest) -> None:
+            raise subprocess.CalledProcessError(1, ["git", "push"])
+
+        monkeypatch.setattr("poetry_up.git.push", stub)
+        result = runner.invoke(
+            console.main, ["--push", "--merge-request", "--batch-push"]
+        )
+        assert result.exit_code == 1
+        assert "marshmallow 3.5.1: Command '['git', 'push']'" in result.output
+        assert "Publishing failed for marshmallow 3.5.1" in result.output
+
+    def test_it_skips_upgrade_refused_before(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """It does not retry refused upgrades unless passed --retry-refused."""
+        calls: List[None] = []
+        monkeypatch.setattr(
+            "poetry_up.poetry.update", lambda *args, **kwargs: calls.append(None)
+        )
+
+        outputs = [
+            runner.invoke(console.main, options, catch_exceptions=False).output
+            for options in [[], [], ["--retry-refused"]]
+        ]
+        assert len(calls) == 2
+        assert "Poetry refused upgrade before" in outputs[1]
+
+    def test_it_creates_branch_in_parallel(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It creates the branch without touching the checkout."""
+        runner.invoke(console.main, ["--jobs=2"], catch_exceptions=False)
+        assert git.branch_exists("poetry-up/marshmallow-3.5.1")
+        assert git.current_branch() == "master"
+        assert git.is_clean()
+
+    def test_it_skips_packages_not_requested_in_parallel(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It updates only the packages passed on the command line."""
+        result = runner.invoke(
+            console.main, ["--jobs=2", "other"], catch_exceptions=False
+        )
+        assert result.exit_code == 0
+        assert not git.branch_exists("poetry-up/marshmallow-3.5.1")
+
+    def test_it_only_locks_in_parallel(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It does not install into the environment from a linked working tree."""
+        update = pretend.call_recorder(lambda *args, **kwargs: None)
+        monkeypatch.setattr("poetry_up.poetry.update", update)
+
+        runner.invoke(console.main, ["--jobs=2", "--install"], catch_exceptions=False)
+        [call] = update.calls
+        assert call.kwargs["lock"]
+
+    def test_it_removes_branch_on_refused_upgrade_in_parallel(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update_noop: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It removes the branch if the upgrade was refused."""
+        runner.invoke(console.main, ["--jobs=2"], catch_exceptions=False)
+        assert not git.branch_exists("poetry-up/marshmallow-3.5.1")
+
+    def test_it_fails_on_parallel_updates_without_commit(
+        self, runner: CliRunner, repository: Path
+    ) -> None:
+        """It fails if parallel updates are requested without commits."""
+        result = runner.invoke(console.main, ["--jobs=2", "--no-commit"])
+        assert result.exit_code == 1
+        assert "Parallel updates require --commit" in result.output
+
+    def test_it_fails_on_updates_without_checkout_and_commit(
+        self, runner: CliRunner, repository: Path
+    ) -> None:
+        """It fails if updates without checkout are requested without commits."""
+        result = runner.invoke(console.main, ["--no-checkout", "--no-commit"])
+        assert result.exit_code == 1
+        assert "Updates without checkout require --commit" in result.output
+
+    def test_it_prefetches_new_versions(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It downloads the new versions before updating, if installing."""
+        prefetch = pretend.call_recorder(lambda packages, url: [])
+        monkeypatch.setattr("poetry_up.prefetch.prefetch", prefetch)
+        runner.invoke(console.main, ["--prefetch"], catch_exceptions=False)
+        [call] = prefetch.calls
+        assert [package.name for package in call.args[0]] == ["marshmallow"]
+        assert git.branch_exists("poetry-up/marshmallow-3.5.1")
+
+    def test_it_updates_recursively(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It updates the projects below the current directory."""
+        result = runner.invoke(console.main, ["--recursive"], catch_exceptions=False)
+        assert ".        marshmallow 3.5.1  updated" in result.output
+        assert git.branch_exists("poetry-up/marshmallow-3.5.1")
+
+    @pytest.mark.parametrize("option", ["--watch=1", "--profile=profile.json"])
+    def test_it_fails_on_recursive_updates_with(
+        self, runner: CliRunner, repository: Path, option: str
+    ) -> None:
+        """It rejects options which do not apply to multiple projects."""
+        result = runner.invoke(console.main, ["--recursive", option])
+        assert result.exit_code == 2
+        assert "cannot be combined with --recursive" in result.output
+
+    def test_it_caches_outdated_packages(
+        self, runner: CliRunner, repository: Path, monkeypatch: MonkeyPatch,
+    ) -> None:
+        """It does not list outdated packages again if the project is unchanged."""
+        calls: List[None] = []
+
+        def stub() -> Iterator[poetry.Package]:
+            calls.append(None)
+            yield poetry.Package("marshmallow", "3.0.0", "3.5.1")
+
+        monkeypatch.setattr("poetry_up.poetry.show_outdated", stub)
+
+        for _ in range(2):
+            result = runner.invoke(console.main, ["--dry-run", "--cache-ttl=60"])
+            assert "marshmallow" in result.output
+
+        assert len(calls) == 1
+
+    def test_it_queries_the_index_with_native(
+        self, runner: CliRunner, repository: Path, monkeypatch: MonkeyPatch
+    ) -> None:
+        """It queries the default package index when passed --native."""
+
+        def stub(url: str) -> Iterator[poetry.Package]:
+            assert url == "https://pypi.org/simple/"
+            yield poetry.Package("marshmallow", "3.0.0", "3.5.1")
+
+        monkeypatch.setattr("poetry_up.index.show_outdated", stub)
+        result = runner.invoke(console.main, ["--dry-run", "--native"])
+        assert "marshmallow" in result.output
+
+    def test_it_reports_background_failures(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_open_pull_requests: None,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """It fails after restoring the branch if a background task failed."""
+
+        def stub(*args: Any) -> None:
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr("poetry_up.github.create_pull_request", stub)
+        result = runner.invoke(
+            console.main, ["--pull-request", "--pipeline"], catch_exceptions=False
+        )
+        assert result.exit_code == 1
+        assert "marshmallow 3.5.1: boom" in result.output
+        assert git.current_branch() == "master"
+
+    def test_it_updates_group_with_bisection(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        shared_datadir: Path,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """It updates the group on one branch, skipping packages left unchanged."""
+        packages = [
+            poetry.Package("marshmallow", "3.0.0", "3.5.1"),
+            poetry.Package("broken", "1.0.0", "2.0.0"),
+            poetry.Package("noop", "1.0.0", "2.0.0"),
+        ]
+
+        def stub_show_outdated() -> Iterator[poetry.Package]:
+            yield from packages
+
+        def stub_update_packages(
+            packages: List[poetry.Package], lock: bool = False, latest: bool = False
+        ) -> None:
+            Path("poetry.lock").write_text("garbage")
+            if any(package.name == "broken" for package in packages):
+                raise subprocess.CalledProcessError(1, "poetry")
+
+            source = shared_datadir / "poetry.lock.new"
+            Path("poetry.lock").write_text(source.read_text())
+
+        monkeypatch.setattr("poetry_up.poetry.show_outdated", stub_show_outdated)
+        monkeypatch.setattr("poetry_up.poetry.update_packages", stub_update_packages)
+
+        result = runner.invoke(console.main, ["--group"], catch_exceptions=False)
+        assert "Skipping broken 2.0.0 (Poetry failed to resolve)" in result.output
+
+        branch = git.git(
+            "branch", "--list", "--format=%(refname:short)", "poetry-up/group-*"
+        ).stdout.strip()
+        message = git.git("log", "-1", "--format=%B", branch).stdout
+        assert message.strip() == "Bump marshmallow from 3.0.0 to 3.5.1"
+        assert git.current_branch() == "master"
+
+    def test_it_describes_group_updates_and_keeps_them_on_rerun(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        shared_datadir: Path,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        """It lists other changes in the group commit, and keeps it on rerun."""
+        packages = [
+            poetry.Package("marshmallow", "3.0.0", "3.5.1"),
+            poetry.Package("six", "1.14.0", "1.15.0"),
+        ]
+
+        def stub_show_outdated() -> Iterator[poetry.Package]:
+            yield from packages
+
+        def stub_update_packages(
+            packages: List[poetry.Package], lock: bool = False, latest: bool = False
+        ) -> None:
+            text = (shared_datadir / "poetry.lock.new").read_text()
+            Path("poetry.lock").write_text(
+                '[[package]]\nname = "idna"\nversion = "2.10"\n\n'
+                f'[[package]]\nname = "six"\nversion = "1.15.0"\n\n{text}'
+            )
+
+        monkeypatch.setattr("poetry_up.poetry.show_outdated", stub_show_outdated)
+        monkeypatch.setattr("poetry_up.poetry.update_packages", stub_update_packages)
+
+        runner.invoke(console.main, ["--group"], catch_exceptions=False)
+        branch = git.git(
+            "branch", "--list", "--format=%(refname:short)", "poetry-up/group-*"
+        ).stdout.strip()
+        sha = git.resolve_branch(branch)
+        message = git.git("log", "-1", "--format=%B", branch).stdout
+        assert message.strip() == "\n".join(
+            [
+                "Bump 2 dependencies",
+                "",
+                "Bump marshmallow from 3.0.0 to 3.5.1",
+                "Bump six from 1.14.0 to 1.15.0",
+                "",
+                "Other changes to poetry.lock:",
+                "",
+                "- idna: added 2.10",
+            ]
+        )
+
+        runner.invoke(console.main, ["--group"], catch_exceptions=False)
+        assert git.resolve_branch(branch) == sha
+        assert git.current_branch() == "master"
+        assert git.is_clean()
+
+    def test_it_skips_empty_group(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_update: None,
+    ) -> None:
+        """It does not create a group branch if every update is excluded."""
+
+        def stub() -> Iterator[poetry.Package]:
+            yield poetry.Package("marshmallow", "3.0.0", "4.0.0")
+
+        monkeypatch.setattr("poetry_up.poetry.show_outdated", stub)
+        result = runner.invoke(
+            console.main, ["--group", "--no-latest"], catch_exceptions=False
+        )
+        assert "Skipping marshmallow 4.0.0 (pyproject.toml requires" in result.output
+        assert not git.git("branch", "--list", "poetry-up/group-*").stdout
+
+    def test_it_defers_install(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It locks each update, and installs once at the end."""
+        update = poetry.update
+        locks: List[bool] = []
+        install = pretend.call_recorder(lambda: None)
+
+        def stub_update(
+            package: poetry.Package, lock: bool = False, latest: bool = False
+        ) -> None:
+            locks.append(lock)
+            update(package, lock=lock, latest=latest)
+
+        monkeypatch.setattr("poetry_up.poetry.update", stub_update)
+        monkeypatch.setattr("poetry_up.poetry.install", install)
+
+        options = ["--defer-install", "--no-commit"]
+        result = runner.invoke(console.main, options, catch_exceptions=False)
+        assert result.exit_code == 0
+        assert locks == [True]
+        assert len(install.calls) == 1
+
+    def test_it_fails_on_deferred_install_with_commit(
+        self, runner: CliRunner, repository: Path
+    ) -> None:
+        """It fails if installs are deferred for committed updates."""
+        result = runner.invoke(console.main, ["--defer-install"])
+        assert result.exit_code == 1
+        assert "Deferred installs require --no-commit" in result.output
+
+    def test_it_skips_deferred_install_without_changes(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update_noop: None,
+    ) -> None:
+        """It does not install at the end if Poetry refused every update."""
+        install = pretend.call_recorder(lambda: None)
+        monkeypatch.setattr("poetry_up.poetry.install", install)
+
+        options = ["--defer-install", "--no-commit"]
+        result = runner.invoke(console.main, options, catch_exceptions=False)
+        assert result.exit_code == 0
+        assert not install.calls
+
+    def test_it_writes_ndjson_events(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It writes one JSON event per line as the update progresses."""
+        result = runner.invoke(
+            console.main, ["--format=ndjson"], catch_exceptions=False
+        )
+        records = [json.loads(line) for line in result.output.splitlines()]
+        assert [record["event"] for record in records] == [
+            "planned",
+            "updated",
+            "committed",
+        ]
+        assert records[2]["branch"] == "poetry-up/marshmallow-3.5.1"
+        assert records[2]["new_version"] == "3.5.1"
+        assert records[2]["duration"] >= 0
+
+    def test_it_resumes_after_failed_push(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+    ) -> None:
+        """It skips the update and the commit when resuming, and pushes."""
+
+        def fail(remote: str, branch: str, merge_request: Any = None) -> None:
+            raise subprocess.CalledProcessError(128, ["git", "push"])
+
+        monkeypatch.setattr("poetry_up.git.push", fail)
+        result = runner.invoke(console.main, ["--push"])
+        assert result.exit_code != 0
+
+        update = pretend.call_recorder(lambda *args, **kwargs: None)
+        push = pretend.call_recorder(lambda *args, **kwargs: None)
+        monkeypatch.setattr("poetry_up.poetry.update", update)
+        monkeypatch.setattr("poetry_up.git.push", push)
+
+        options = ["--push", "--resume"]
+        result = runner.invoke(console.main, options, catch_exceptions=False)
+        assert result.exit_code == 0
+        assert not update.calls
+        assert len(push.calls) == 1
+
+    def test_it_resumes_without_reopening_pull_request(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_open_pull_requests: None,
+    ) -> None:
+        """It does not open a pull request again when resuming."""
+        create = pretend.call_recorder(lambda title, body, head: None)
+        monkeypatch.setattr("poetry_up.github.create_pull_request", create)
+
+        for options in [["--pull-request"], ["--pull-request", "--resume"]]:
+            result = runner.invoke(console.main, options, catch_exceptions=False)
+            assert result.exit_code == 0
+
+        assert len(create.calls) == 1
+
+    def test_it_resumes_refused_upgrade_in_parallel(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        monkeypatch: MonkeyPatch,
+        stub_poetry_show_outdated: None,
+        stub_poetry_update_noop: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It does not retry an upgrade refused in the interrupted run."""
+        runner.invoke(console.main, ["--jobs=2"], catch_exceptions=False)
+
+        update = pretend.call_recorder(lambda *args, **kwargs: None)
+        monkeypatch.setattr("poetry_up.poetry.update", update)
+        options = ["--jobs=2", "--resume", "--retry-refused"]
+        result = runner.invoke(console.main, options, catch_exceptions=False)
+        assert result.exit_code == 0
+        assert not update.calls
+        assert not git.branch_exists("poetry-up/marshmallow-3.5.1")
+
+    @pytest.mark.parametrize("options", [[], ["--jobs=2"]])
+    def test_it_writes_profile(
+        self,
+        runner: CliRunner,
+        repository: Path,
+        tmp_path: Path,
+        options: List[str],
+        stub_poetry_show_outdated: None,
+        stub_poetry_update: None,
+        stub_process_pool: None,
+    ) -> None:
+        """It writes a trace file and prints a summary, including workers."""
+        path = tmp_path / "trace.json"
+        result = runner.invoke(
+            console.main, [*options, f"--profile={path}"], catch_exceptions=False
+        )
+        assert "Commit" in result.output
+        assert path.exists()
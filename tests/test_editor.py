@@ -0,0 +1,146 @@
+"""Tests for editor module."""
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+import tomlkit
+
+from poetry_up import poetry
+from poetry_up.editor import ConstraintEditor
+
+
+CORPUS = sorted((Path(__file__).parent / "data" / "editor").glob("*.toml"))
+
+
+def dependencies(path: Path) -> List[str]:
+    """Return the dependencies declared in the file."""
+    data = tomlkit.parse(path.read_bytes().decode("utf-8"))["tool"]["poetry"]
+    tables = [data.get("dependencies", {}), data.get("dev-dependencies", {})]
+    tables += [group["dependencies"] for group in data.get("group", {}).values()]
+    return [name for table in tables for name in table if name != "python"]
+
+
+CASES: List[Tuple[Path, str]] = [
+    (path, name) for path in CORPUS for name in dependencies(path)
+]
+
+
+@pytest.mark.parametrize(
+    "path,name", CASES, ids=[f"{path.stem}-{name}" for path, name in CASES]
+)
+def test_round_trip(path: Path, name: str, tmp_path: Path) -> None:
+    """It matches the TOML parser, changing at most one line."""
+    text = path.read_bytes().decode("utf-8")
+    package = poetry.Package(name, "1.0.0", "9.9.9")
+    editor = ConstraintEditor(text)
+
+    if not editor.update_constraint(package):
+        pytest.skip("handled by the TOML parser")
+
+    expected = tmp_path / "pyproject.toml"
+    expected.write_bytes(path.read_bytes())
+    with poetry._Config(expected) as config:
+        config.update_constraint(package)
+
+    assert tomlkit.parse(editor.text) == tomlkit.parse(
+        expected.read_bytes().decode("utf-8")
+    )
+
+    changes = [
+        (old, new)
+        for old, new in zip(text.splitlines(True), editor.text.splitlines(True))
+        if old != new
+    ]
+    assert len(editor.text.splitlines()) == len(text.splitlines())
+    assert len(changes) <= 1
+
+
+def test_update_constraint_preserves_comments() -> None:
+    """It rewrites only the version string."""
+    editor = ConstraintEditor(
+        '[tool.poetry.dependencies]\nclick   =   "^7.0"    # keep\n'
+    )
+    package = poetry.Package("click", "7.0", "8.0.1")
+    assert editor.update_constraint(package)
+    assert editor.text == '[tool.poetry.dependencies]\nclick   =   "^8.0.1"    # keep\n'
+
+
+def test_update_constraint_preserves_line_endings() -> None:
+    """It preserves CRLF line endings."""
+    editor = ConstraintEditor('[tool.poetry.dependencies]\r\nclick = "^7.0"\r\n')
+    editor.update_constraint(poetry.Package("click", "7.0", "8.0.1"))
+    assert editor.text == '[tool.poetry.dependencies]\r\nclick = "^8.0.1"\r\n'
+
+
+def test_update_constraint_canonical_name() -> None:
+    """It matches names after normalization."""
+    editor = ConstraintEditor('[tool.poetry.dependencies]\nFlask_Login = "^0.4"\n')
+    assert editor.update_constraint(poetry.Package("flask-login", "0.4", "0.5"))
+    assert '"^0.5"' in editor.text
+
+
+def test_update_constraint_unchanged_without_version() -> None:
+    """It leaves dependencies without a version alone."""
+    text = '[tool.poetry.dependencies]\nfoo = { path = "../foo" }\n'
+    editor = ConstraintEditor(text)
+    assert editor.update_constraint(poetry.Package("foo", "1.0", "2.0"))
+    assert editor.text == text and not editor.changed
+
+
+@pytest.mark.parametrize("name", ["marshmallow", "click"])
+def test_update_constraint_falls_back(name: str) -> None:
+    """It reports sub-tables and multiple constraints as unsupported."""
+    path = (
+        Path(__file__).parent
+        / "data"
+        / "editor"
+        / ("subtable.toml" if name == "marshmallow" else "multiple.toml")
+    )
+    editor = ConstraintEditor(path.read_text())
+    assert not editor.update_constraint(poetry.Package(name, "1.0", "2.0"))
+    assert not editor.changed
+
+
+def test_update_constraint_ignores_other_tables() -> None:
+    """It does not touch keys outside of dependency tables."""
+    text = '[tool.other]\nclick = "^7.0"\n'
+    editor = ConstraintEditor(text)
+    assert editor.update_constraint(poetry.Package("click", "7.0", "8.0"))
+    assert editor.text == text
+
+
+def test_update_constraint_ignores_multiline_strings() -> None:
+    """It does not mistake the contents of multi-line strings for keys."""
+    text = (
+        '[tool.poetry]\ndescription = """\n[tool.poetry.dependencies]\n'
+        'click = "^7.0"\n"""\n'
+    )
+    editor = ConstraintEditor(text)
+    assert editor.update_constraint(poetry.Package("click", "7.0", "8.0"))
+    assert editor.text == text
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '[tool.poetry.dependencies]\nfoo = """\n^1.0\n"""\n',
+        '[tool.poetry."dependencies"]\nclick = "^7.0"\n',
+    ],
+    ids=["multiline-string", "quoted-header"],
+)
+def test_update_constraint_inconclusive(text: str) -> None:
+    """It cannot rule out declarations in constructs it does not parse."""
+    editor = ConstraintEditor(text)
+    assert not editor.update_constraint(poetry.Package("click", "7.0", "8.0"))
+    assert editor.text == text
+
+
+def test_update_constraint_ignores_arrays_of_tables() -> None:
+    """It does not mistake keys in arrays of tables for dependencies."""
+    text = (
+        '[tool.poetry.dependencies]\nclick = "^7.0"\n\n'
+        '[[tool.poetry.source]]\nname = "click"\nclick = "^7.0"\n'
+    )
+    editor = ConstraintEditor(text)
+    assert editor.update_constraint(poetry.Package("click", "7.0", "8.0"))
+    assert editor.text == text.replace('"^7.0"', '"^8.0"', 1)
@@ -0,0 +1,42 @@
+"""Tests for the events module."""
+import json
+
+import pytest
+
+from poetry_up import events
+from poetry_up.poetry import Package
+
+
+def test_emit(capsys: pytest.CaptureFixture) -> None:
+    """It writes the event as a line of JSON."""
+    events.emit("committed", branch="poetry-up/marshmallow-3.5.1")
+    [line] = capsys.readouterr().out.splitlines()
+    event = json.loads(line)
+    assert event["event"] == "committed"
+    assert event["branch"] == "poetry-up/marshmallow-3.5.1"
+
+
+def test_report_text(capsys: pytest.CaptureFixture) -> None:
+    """It prints the text in text format."""
+    package = Package("marshmallow", "3.0.0", "3.5.1")
+    events.report("text", "refused", "Skipping marshmallow", packages=[package])
+    assert capsys.readouterr().out == "Skipping marshmallow\n"
+
+
+def test_report_text_without_text(capsys: pytest.CaptureFixture) -> None:
+    """It prints nothing in text format if there is no text."""
+    package = Package("marshmallow", "3.0.0", "3.5.1")
+    events.report("text", "committed", packages=[package], duration=0.1)
+    assert capsys.readouterr().out == ""
+
+
+def test_report_ndjson(capsys: pytest.CaptureFixture) -> None:
+    """It writes one event per package in NDJSON format."""
+    packages = [
+        Package("marshmallow", "3.0.0", "3.5.1"),
+        Package("click", "7.0", "7.1.2"),
+    ]
+    events.report("ndjson", "planned", "ignored", packages=packages, branch="b")
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["package"] for line in lines] == ["marshmallow", "click"]
+    assert json.loads(lines[1])["new_version"] == "7.1.2"
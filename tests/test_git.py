@@ -19,3 +19,138 @@ def test_push_with_merge_request(repository: Path) -> None:
         # fatal: the receiving end does not support push options
         merge_request = git.MergeRequest("title", "description")
         git.push("origin", "master", merge_request=merge_request)
+
+
+def test_add_worktree(repository: Path, tmp_path: Path) -> None:
+    """It creates the branch in a linked working tree."""
+    worktree = str(tmp_path / "worktree")
+    git.add_worktree(worktree, "topic", create=True, location="master")
+    assert git.resolve_branch("topic") == git.resolve_branch("master")
+    assert git.current_branch() == "master"
+
+    git.remove_worktree(worktree)
+    git.add_worktree(worktree, "topic")
+    assert (tmp_path / "worktree" / "pyproject.toml").exists()
+
+
+def test_add_worktree_without_location(repository: Path, tmp_path: Path) -> None:
+    """It creates the branch at the checked out commit by default."""
+    git.add_worktree(str(tmp_path / "worktree"), "topic", create=True)
+    assert git.resolve_branch("topic") == git.resolve_branch("master")
+
+
+def test_ref_index_load(repository: Path) -> None:
+    """It reads the local branches and the checked out branch."""
+    refs = git.RefIndex.load()
+    assert refs.current_branch() == "master"
+    assert refs.branch_exists("master")
+    assert refs.resolve_branch("master") == git.resolve_branch("master")
+
+
+def test_ref_index_load_other_branch(repository: Path) -> None:
+    """It reads branches which are not checked out."""
+    git.git("branch", "topic")
+    refs = git.RefIndex.load()
+    assert refs.current_branch() == "master"
+    assert refs.branch_exists("topic")
+    assert refs.resolve_branch("topic") == git.resolve_branch("master")
+
+
+def test_ref_index_load_detached(repository: Path) -> None:
+    """It reports HEAD as the checked out branch if HEAD is detached."""
+    git.detach()
+    assert git.RefIndex.load().current_branch() == "HEAD"
+
+
+def test_ref_index_switch(repository: Path) -> None:
+    """It records created branches and the checked out branch."""
+    refs = git.RefIndex.load()
+    refs.switch("topic", create=True)
+    assert refs.current_branch() == git.current_branch() == "topic"
+    assert refs.resolve_branch("topic") == git.resolve_branch("master")
+
+    refs.switch("master")
+    refs.remove_branch("topic")
+    assert not refs.branch_exists("topic")
+
+
+def test_ref_index_commit(repository: Path) -> None:
+    """It resolves the branch again after a commit."""
+    refs = git.RefIndex.load()
+    refs.switch("topic", create=True, location="master")
+    Path("pyproject.toml").write_text("")
+    git.add(["pyproject.toml"])
+    refs.commit("Empty pyproject.toml")
+    assert refs.resolve_branch("topic") == git.resolve_branch("topic")
+    assert refs.resolve_branch("topic") != refs.resolve_branch("master")
+
+
+def test_ref_index_add_worktree(repository: Path, tmp_path: Path) -> None:
+    """It records the branch as checked out for the new working tree."""
+    refs = git.RefIndex.load()
+    worktree = str(tmp_path / "worktree")
+    refs.add_worktree(worktree, "topic", create=True, location="master")
+    assert refs.current_branch() == "topic"
+    assert git.current_branch() == "master"
+
+
+def test_ref_index_commit_detached(repository: Path) -> None:
+    """It leaves the branches alone when committing on a detached HEAD."""
+    refs = git.RefIndex.load()
+    refs.detach()
+    Path("pyproject.toml").write_text("")
+    git.add(["pyproject.toml"])
+    refs.commit("Empty pyproject.toml")
+    assert refs.resolve_branch("master") == git.resolve_branch("master")
+    assert git.resolve("HEAD") != git.resolve_branch("master")
+
+
+def test_read_files(repository: Path) -> None:
+    """It reads the files at the revision, omitting missing files."""
+    expected = Path("poetry.lock").read_bytes()
+    Path("poetry.lock").write_text("")
+    files = git.read_files("master", ["poetry.lock", "missing.txt"])
+    assert files == {"poetry.lock": expected}
+
+
+def test_ref_index_commit_files(repository: Path) -> None:
+    """It commits to a new branch without touching the working tree."""
+    refs = git.RefIndex.load()
+    Path("pyproject.toml").write_text("")
+    refs.commit_files("topic", "master", ["pyproject.toml"], "Empty pyproject.toml")
+
+    assert refs.resolve_branch("topic") == git.resolve_branch("topic")
+    assert git.current_branch() == "master"
+    assert git.read_files("topic", ["pyproject.toml"]) == {"pyproject.toml": b""}
+    assert git.is_clean(["poetry.lock"])
+    assert not git.is_clean(["pyproject.toml"])
+
+    message = git.git("log", "-1", "--format=%s", "topic").stdout.strip()
+    assert message == "Empty pyproject.toml"
+
+
+def test_ref_index_resolve(repository: Path) -> None:
+    """It resolves revisions other than local branches using Git."""
+    refs = git.RefIndex.load()
+    assert refs.resolve("HEAD") == refs.resolve("master") == git.resolve("HEAD")
+
+
+def test_push_branches(repository: Path) -> None:
+    """It pushes the branches, reporting the status of each branch."""
+    for branch in ["first", "second"]:
+        git.git("branch", branch)
+
+    results = git.push_branches("origin", ["first", "second"])
+    assert results == {
+        "first": (True, "[new branch]"),
+        "second": (True, "[new branch]"),
+    }
+
+    remote = git.git("ls-remote", "--heads", "origin").stdout
+    assert "refs/heads/first" in remote and "refs/heads/second" in remote
+
+
+def test_push_branches_failure(repository: Path) -> None:
+    """It reports branches without a status as failed."""
+    [(pushed, error)] = git.push_branches("origin", ["missing"]).values()
+    assert not pushed and "missing" in error
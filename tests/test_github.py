@@ -20,12 +20,36 @@ def test_pull_request_exists(monkeypatch: MonkeyPatch, branch: str) -> None:
         assert github.pull_request_exists(branch) is (branch == "topic")
 
 
+def test_open_pull_requests(monkeypatch: MonkeyPatch) -> None:
+    """It returns the head branches, one per line of process output."""
+
+    def stub(*args: Any, **kwargs: Any) -> Any:
+        return pretend.stub(stdout="topic\nanother-topic\n")
+
+    with monkeypatch.context() as m:
+        m.setattr("subprocess.run", stub)
+        assert github.open_pull_requests() == {"topic", "another-topic"}
+
+
 def test_create_pull_request(monkeypatch: MonkeyPatch) -> None:
     """It runs a subprocess."""
-    stub = pretend.call_recorder(lambda *args, **kwargs: None)
+    url = "https://github.com/owner/repo/pull/1"
+    stub = pretend.call_recorder(lambda *args, **kwargs: pretend.stub(stdout=url))
 
     with monkeypatch.context() as m:
         m.setattr("subprocess.run", stub)
-        github.create_pull_request("title", "body")
+        assert github.create_pull_request("title", "body") == url
 
     assert stub.calls
+
+
+def test_create_pull_request_head(monkeypatch: MonkeyPatch) -> None:
+    """It passes the head branch to gh."""
+    stub = pretend.call_recorder(lambda *args, **kwargs: pretend.stub(stdout=""))
+
+    with monkeypatch.context() as m:
+        m.setattr("subprocess.run", stub)
+        github.create_pull_request("title", "body", "topic")
+
+    [call] = stub.calls
+    assert "--head=topic" in call.args[0]
@@ -0,0 +1,257 @@
+"""Tests for index module."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import threading
+from typing import Dict, Iterator, List, Set, Tuple, Union
+
+import pytest
+
+from poetry_up import index, lockfile, poetry, versions
+
+
+Page = Tuple[int, str, bytes]
+Pages = Dict[str, Union[Page, List[Page]]]
+
+
+def json_page(*filenames: str, yanked: Tuple[str, ...] = ()) -> Tuple[int, str, bytes]:
+    """Return a project page in JSON format (PEP 691)."""
+    files = [
+        {
+            "filename": filename,
+            "url": filename,
+            "hashes": {"md5": "1", "sha256": "0"},
+            "yanked": filename in yanked,
+        }
+        for filename in filenames
+    ]
+    body = json.dumps({"meta": {"api-version": "1.0"}, "files": files})
+    return 200, "application/vnd.pypi.simple.v1+json", body.encode()
+
+
+def html_page(*filenames: str, yanked: Tuple[str, ...] = ()) -> Tuple[int, str, bytes]:
+    """Return a project page in HTML format (PEP 503)."""
+    anchors = "".join(
+        '<a href="{0}#sha256=0"{1}>{0}</a>'.format(
+            filename, " data-yanked" if filename in yanked else ""
+        )
+        for filename in filenames
+    )
+    return 200, "text/html", f"<html><body>{anchors}</body></html>".encode()
+
+
+@pytest.fixture
+def pages() -> Pages:
+    """Pages served by the stand-in index server, keyed by path."""
+    return {
+        "/simple/marshmallow/": json_page(
+            "marshmallow-3.0.0-py2.py3-none-any.whl",
+            "marshmallow-3.5.1.tar.gz",
+            "marshmallow-3.6.0-py2.py3-none-any.whl",
+            "marshmallow-4.0.0b1.tar.gz",
+            yanked=("marshmallow-3.6.0-py2.py3-none-any.whl",),
+        ),
+        "/simple/zope-interface/": html_page(
+            "zope.interface-5.0.0.tar.gz", "zope.interface-5.1.0.zip"
+        ),
+        "/simple/moved/": (301, "", b""),
+        "/simple/broken/": (500, "text/plain", b"boom"),
+    }
+
+
+@pytest.fixture
+def dropped() -> Set[str]:
+    """Paths after which the server closes the connection without notice."""
+    return set()
+
+
+@pytest.fixture
+def server(pages: Pages, dropped: Set[str]) -> Iterator[str]:
+    """Stand-in package index server, returning its URL.
+
+    Pages given as a list are served in turn, repeating the last one.
+
+    Args:
+        pages: The pages to serve.
+        dropped: The paths after which the connection is closed.
+
+    Yields:
+        The URL of the simple repository.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:  # noqa: N802
+            page = pages.get(self.path, (404, "", b""))
+            if isinstance(page, list):
+                page = page.pop(0) if len(page) > 1 else page[0]
+            status, content_type, body = page
+            self.send_response(status)
+            if status == 301:
+                self.send_header("Location", "/simple/marshmallow/")
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            self.close_connection = self.path in dropped
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_port}/simple"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_releases_json(server: str) -> None:
+    """It returns the versions of files that were not yanked."""
+    releases = index.Index(server).releases("marshmallow")
+    assert releases == [
+        versions.Version(text) for text in ["3.0.0", "3.5.1", "4.0.0b1"]
+    ]
+
+
+def test_files_json(server: str) -> None:
+    """It adds the SHA-256 hash to the URL of files listed in JSON."""
+    [(filename, url, _), *_] = index.Index(server).files("marshmallow")
+    assert url == f"{server}/marshmallow/{filename}#sha256=0"
+
+
+@pytest.mark.parametrize(
+    "url,hashes,expected",
+    [
+        ("a.whl", {"md5": "1", "sha256": "0"}, "a.whl#sha256=0"),
+        ("a.whl", {"md5": "1", "sha512": "0"}, "a.whl#md5=1"),
+        ("a.whl#md5=1", {"sha256": "0"}, "a.whl#md5=1"),
+        ("a.whl", {"blake3": "0"}, "a.whl"),
+        ("a.whl", {}, "a.whl"),
+    ],
+)
+def test_with_hash(url: str, hashes: Dict[str, str], expected: str) -> None:
+    """It prefers SHA-256, and keeps URLs without a usable hash unchanged."""
+    assert index._with_hash(url, hashes) == expected
+
+
+def test_download_error(server: str) -> None:
+    """It raises an exception if the file cannot be retrieved."""
+    with pytest.raises(index.RepositoryError, match="HTTP status 500"):
+        index.Index(server).download(f"{server}/broken/")
+
+
+def test_releases_html(server: str) -> None:
+    """It parses HTML pages and legacy sdist filenames."""
+    releases = index.Index(server).releases("zope.interface")
+    assert [str(version) for version in releases] == ["5.0.0", "5.1.0"]
+
+
+def test_releases_html_other_links(server: str, pages: Pages) -> None:
+    """It ignores anchors without a link, and files which are not archives."""
+    body = (
+        '<a name="top">top</a>'
+        '<a href="other-1.0.exe">other-1.0.exe</a>'
+        '<a href="other-1.1.tar.gz">other-1.1.tar.gz</a>'
+    )
+    pages["/simple/other/"] = (200, "text/html", body.encode())
+    assert index.Index(server).releases("other") == [versions.Version("1.1")]
+
+
+def test_releases_missing(server: str) -> None:
+    """It returns an empty list for unknown projects."""
+    assert index.Index(server).releases("surprise") == []
+
+
+def test_releases_redirect(server: str) -> None:
+    """It follows redirects."""
+    assert index.Index(server).releases("moved")
+
+
+def test_releases_error(server: str) -> None:
+    """It raises an exception on server errors."""
+    with pytest.raises(index.RepositoryError):
+        index.Index(server).releases("broken")
+
+
+def test_releases_transient_error(server: str, pages: Pages) -> None:
+    """It retries requests failing with a transient server error."""
+    pages["/simple/flaky/"] = [
+        (503, "text/plain", b"busy"),
+        (502, "text/plain", b"busy"),
+        html_page("flaky-1.0.tar.gz"),
+    ]
+    client = index.Index(server, backoff=0)
+    assert client.releases("flaky") == [versions.Version("1.0")]
+
+
+def test_releases_transient_error_persists(server: str, pages: Pages) -> None:
+    """It gives up after the configured number of retries."""
+    pages["/simple/flaky/"] = [(503, "text/plain", b"busy")]
+    with pytest.raises(index.RepositoryError, match="HTTP status 503"):
+        index.Index(server, retries=1, backoff=0).releases("flaky")
+
+
+def test_releases_reconnect(server: str, dropped: Set[str]) -> None:
+    """It reconnects if the server closed the kept-alive connection."""
+    dropped.add("/simple/zope-interface/")
+    client = index.Index(server)
+    assert client.releases("zope.interface")
+    assert client.releases("marshmallow")
+
+
+def test_releases_file(tmp_path: Path) -> None:
+    """It reads file-based indexes."""
+    project = tmp_path / "simple" / "marshmallow"
+    project.mkdir(parents=True)
+    (project / "index.html").write_bytes(html_page("marshmallow-3.5.1.tar.gz")[2])
+
+    url = (tmp_path / "simple").as_uri()
+    assert index.Index(url).releases("marshmallow") == [versions.Version("3.5.1")]
+    assert index.Index(url).releases("surprise") == []
+
+
+@pytest.mark.parametrize(
+    "current,expected", [("3.0.0", "3.5.1"), ("3.5.1", None), ("4.0.0a1", "4.0.0b1")]
+)
+def test_latest_version(current: str, expected: str) -> None:
+    """It ignores pre-releases unless the current version is a pre-release."""
+    available = [versions.Version(text) for text in ["3.0.0", "3.5.1", "4.0.0b1"]]
+    latest = index.latest_version(available, versions.Version(current))
+    assert latest == (versions.Version(expected) if expected else None)
+
+
+def test_show_outdated(server: str) -> None:
+    """It yields outdated packages from the index."""
+    packages = [
+        lockfile.LockedPackage("marshmallow", "3.0.0"),
+        lockfile.LockedPackage("zope.interface", "5.1.0"),
+        lockfile.LockedPackage("surprise", "not a version"),
+        lockfile.LockedPackage("local", "1.0", source_type="directory"),
+    ]
+    outdated = list(index.show_outdated(server, packages))
+    assert outdated == [poetry.Package("marshmallow", "3.0.0", "3.5.1")]
+
+
+def test_show_outdated_shares_indexes(server: str, pages: Pages) -> None:
+    """It reuses the index clients passed by the caller, with their releases."""
+    packages = [lockfile.LockedPackage("marshmallow", "3.0.0")]
+    indexes: Dict[str, index.Index] = {}
+    for _ in range(2):
+        outdated = list(index.show_outdated(server, packages, indexes=indexes))
+        assert outdated == [poetry.Package("marshmallow", "3.0.0", "3.5.1")]
+        pages.clear()
+
+    assert list(indexes) == [server]
+
+
+def test_show_outdated_lock_file(server: str, repository: Path) -> None:
+    """It reads the packages from the lock file by default."""
+    assert list(index.show_outdated(server)) == [
+        poetry.Package("marshmallow", "3.0.0", "3.5.1")
+    ]
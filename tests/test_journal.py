@@ -0,0 +1,44 @@
+"""Tests for the journal module."""
+from pathlib import Path
+
+from poetry_up.journal import Journal
+
+
+def test_record(tmp_path: Path) -> None:
+    """It records completed steps."""
+    journal = Journal(tmp_path / "journal.jsonl")
+    journal.record("poetry-up/marshmallow-3.5.1", "committed")
+    assert journal.done("poetry-up/marshmallow-3.5.1", "committed")
+    assert not journal.done("poetry-up/marshmallow-3.5.1", "pushed")
+
+
+def test_resume(tmp_path: Path) -> None:
+    """It keeps the steps of the previous run when resuming."""
+    path = tmp_path / "journal.jsonl"
+    Journal(path).record("poetry-up/marshmallow-3.5.1", "committed")
+    journal = Journal(path, resume=True)
+    assert journal.done("poetry-up/marshmallow-3.5.1", "committed")
+
+
+def test_resume_without_journal(tmp_path: Path) -> None:
+    """It starts with an empty journal if there is nothing to resume."""
+    journal = Journal(tmp_path / "journal.jsonl", resume=True)
+    assert not journal.done("poetry-up/marshmallow-3.5.1", "committed")
+
+
+def test_clear(tmp_path: Path) -> None:
+    """It clears the journal when not resuming."""
+    path = tmp_path / "journal.jsonl"
+    Journal(path).record("poetry-up/marshmallow-3.5.1", "committed")
+    journal = Journal(path)
+    assert not journal.done("poetry-up/marshmallow-3.5.1", "committed")
+
+
+def test_resume_truncated(tmp_path: Path) -> None:
+    """It ignores a line truncated by a crash."""
+    path = tmp_path / "journal.jsonl"
+    Journal(path).record("poetry-up/marshmallow-3.5.1", "committed")
+    with path.open(mode="a") as io:
+        io.write('{"branch": "poetry-up/cl')
+    journal = Journal(path, resume=True)
+    assert journal.done("poetry-up/marshmallow-3.5.1", "committed")
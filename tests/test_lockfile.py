@@ -0,0 +1,86 @@
+"""Tests for lockfile module."""
+from pathlib import Path
+import subprocess  # noqa: S404
+import sys
+
+from poetry_up import lockfile
+
+
+def test_read(repository: Path) -> None:
+    """It reads the packages from the lock file."""
+    assert lockfile.read() == [lockfile.LockedPackage("marshmallow", "3.0.0")]
+
+
+def test_read_source(tmp_path: Path) -> None:
+    """It reads the package source."""
+    path = tmp_path / "poetry.lock"
+    path.write_text(
+        """\
+[[package]]
+name = "foo"
+version = "1.0"
+
+[package.source]
+type = "git"
+url = "https://example.com/foo.git"
+"""
+    )
+    [package] = lockfile.read(path)
+    assert package.source_url == "https://example.com/foo.git"
+    assert not package.from_index
+
+
+def test_diff() -> None:
+    """It reports changed, added, and removed packages by canonical name."""
+    old = [
+        lockfile.LockedPackage("Flask", "1.0"),
+        lockfile.LockedPackage("six", "1.0"),
+        lockfile.LockedPackage("click", "7.0"),
+    ]
+    new = [
+        lockfile.LockedPackage("flask", "2.0"),
+        lockfile.LockedPackage("click", "7.0"),
+        lockfile.LockedPackage("attrs", "20.1"),
+    ]
+    assert lockfile.diff(old, new) == [
+        lockfile.Change("attrs", None, "20.1"),
+        lockfile.Change("flask", "1.0", "2.0"),
+        lockfile.Change("six", "1.0", None),
+    ]
+
+
+def test_read_dependencies(tmp_path: Path) -> None:
+    """It reads the constraints of each dependency by canonical name."""
+    path = tmp_path / "poetry.lock"
+    path.write_text(
+        """\
+[[package]]
+name = "foo"
+version = "1.0"
+
+[package.dependencies]
+Bar_Baz = ">=1.0,<2.0"
+qux = {version = "^2.0", optional = true}
+quux = [
+    {version = "<3", markers = "python_version < \\"3.8\\""},
+    {version = ">=3", markers = "python_version >= \\"3.8\\""},
+]
+"""
+    )
+    [package] = lockfile.read(path)
+    assert package.dependencies == {
+        "bar-baz": [">=1.0,<2.0"],
+        "qux": ["^2.0"],
+        "quux": ["<3", ">=3"],
+    }
+
+
+def test_import_without_tomllib() -> None:
+    """It does not import tomlkit until a lock file is parsed."""
+    code = """\
+import sys
+sys.modules["tomllib"] = None
+import poetry_up.update
+assert "tomlkit" not in sys.modules
+"""
+    subprocess.run([sys.executable, "-c", code], check=True)  # noqa: S603
@@ -1,7 +1,10 @@
 """Tests for poetry module."""
 import contextlib
+import io
+import os
 from pathlib import Path
-from typing import Any
+import subprocess  # noqa: S404
+from typing import Any, List
 
 from _pytest.monkeypatch import MonkeyPatch
 import pretend
@@ -17,30 +20,90 @@ description = (
 )
 
 
-def test_show_outdated_matches_valid_output(
-    monkeypatch: MonkeyPatch, package: poetry.Package
-) -> None:
-    """It matches valid output."""
+def stub_popen(monkeypatch: MonkeyPatch, stdout: str, returncode: int = 0) -> None:
+    """Replace subprocess.Popen by a stub printing the given output."""
 
     def stub(*args: Any, **kwargs: Any) -> Any:
         return pretend.stub(
-            stdout=" ".join(
-                (package.name, package.old_version, package.new_version, description)
-            )
+            stdout=io.StringIO(stdout),
+            stderr=io.StringIO("error"),
+            wait=lambda: returncode,
         )
 
-    monkeypatch.setattr("subprocess.run", stub)
+    monkeypatch.setattr("subprocess.Popen", stub)
+
+
+def test_show_outdated_matches_valid_output(
+    monkeypatch: MonkeyPatch, package: poetry.Package
+) -> None:
+    """It matches valid output."""
+    stub_popen(
+        monkeypatch,
+        " ".join((package.name, package.old_version, package.new_version, description)),
+    )
     assert package in poetry.show_outdated()
 
 
+def test_show_outdated_yields_while_running(
+    monkeypatch: MonkeyPatch, package: poetry.Package
+) -> None:
+    """It yields packages before the output is complete."""
+    line = " ".join((package.name, package.old_version, package.new_version, "x\n"))
+    stub_popen(monkeypatch, line * 2, returncode=1)
+    packages = poetry.show_outdated()
+    assert next(packages) == package
+    assert next(packages) == package
+
+    with pytest.raises(subprocess.CalledProcessError):
+        next(packages)
+
+
+@pytest.mark.parametrize(
+    "line,expected",
+    [
+        (
+            "Flask-SQLAlchemy 2.4.0 2.4.1 Adds SQLAlchemy support",
+            poetry.Package("Flask-SQLAlchemy", "2.4.0", "2.4.1"),
+        ),
+        (
+            "zope.interface (!) 5.0.0 5.1.0.post1 Interfaces for Python",
+            poetry.Package("zope.interface", "5.0.0", "5.1.0.post1"),
+        ),
+        (
+            "typing_extensions 3.7.4 4.0.0rc1 Backported type hints",
+            poetry.Package("typing_extensions", "3.7.4", "4.0.0rc1"),
+        ),
+    ],
+)
+def test_show_outdated_matches_valid_names_and_versions(
+    monkeypatch: MonkeyPatch, line: str, expected: poetry.Package
+) -> None:
+    """It matches names and versions beyond lowercase letters and digits."""
+    stub_popen(monkeypatch, line)
+    assert list(poetry.show_outdated()) == [expected]
+
+
 def test_show_outdated_skips_unexpected_output(monkeypatch: MonkeyPatch) -> None:
     """It skips unpexpected output."""
+    stub_popen(monkeypatch, "Surprise!")
+    assert not tuple(poetry.show_outdated())
 
-    def stub(*args: Any, **kwargs: Any) -> Any:
-        return pretend.stub(stdout="Surprise!")
 
-    monkeypatch.setattr("subprocess.run", stub)
-    assert not tuple(poetry.show_outdated())
+def test_project_hash_changes_with_lock_file(repository: Path) -> None:
+    """It returns a different hash when the lock file changes."""
+    old = poetry.project_hash()
+    with Path("poetry.lock").open(mode="a") as io:
+        io.write("\n")
+    assert old != poetry.project_hash()
+
+
+def test_project_hash_changes_with_repositories(
+    repository: Path, monkeypatch: MonkeyPatch
+) -> None:
+    """It returns a different hash when repositories are configured."""
+    old = poetry.project_hash()
+    monkeypatch.setenv("POETRY_REPOSITORIES_FOO_URL", "https://example.com/simple/")
+    assert old != poetry.project_hash()
 
 
 @pytest.mark.parametrize("lock", [False, True])
@@ -57,6 +120,17 @@ def test_update_runs_subprocess(
     assert stub.calls
 
 
+def test_install_runs_subprocess(monkeypatch: MonkeyPatch) -> None:
+    """It synchronizes the environment with the lock file."""
+    stub = pretend.call_recorder(lambda *args, **kwargs: None)
+
+    monkeypatch.setattr("subprocess.run", stub)
+    poetry.install()
+
+    [call] = stub.calls
+    assert call.args[0] == ["poetry", "install", "--sync"]
+
+
 def get_dependency(config: poetry._Config, package: str) -> Any:
     """Return the package entry from the dependencies table."""
     return config._config["dependencies"][package]
@@ -113,3 +187,137 @@ def test_config_exit(package: poetry.Package, repository: Path) -> None:
             raise RuntimeError("boom")
 
     assert old_constraint == get_dependency(poetry._Config(), package.name)
+
+
+def test_config_update_constraint_group(
+    package: poetry.Package, repository: Path
+) -> None:
+    """It updates version constraints in dependency groups."""
+    Path("pyproject.toml").write_text(
+        """\
+[tool.poetry.dependencies]
+python = "^3.6"
+
+[tool.poetry.group.test.dependencies]
+Marshmallow = "^3.0.0"
+"""
+    )
+    config = poetry._Config()
+    config.update_constraint(package)
+
+    group = config._config["group"]["test"]["dependencies"]
+    assert group["Marshmallow"] == f"^{package.new_version}"
+
+
+def test_config_update_constraint_missing(
+    package: poetry.Package, repository: Path
+) -> None:
+    """It ignores packages which are not declared, and groups without them."""
+    text = """\
+[tool.poetry.dependencies]
+python = "^3.6"
+
+[tool.poetry.group.docs]
+optional = true
+"""
+    Path("pyproject.toml").write_text(text)
+    with poetry._Config() as config:
+        config.update_constraint(package)
+
+    assert Path("pyproject.toml").read_text() == text
+
+
+def test_config_refresh_unchanged(repository: Path) -> None:
+    """It does not reload the document if the file is unchanged."""
+    config = poetry._Config()
+    data = config._data
+    config.refresh()
+    assert config._data is data
+
+
+def test_config_refresh_touched(repository: Path) -> None:
+    """It does not reload the document if only the modification time changed."""
+    config = poetry._Config()
+    data = config._data
+    os.utime("pyproject.toml", ns=(0, 0))
+    config.refresh()
+    assert config._data is data
+
+
+def test_config_refresh_changed(package: poetry.Package, repository: Path) -> None:
+    """It reloads the document if the file has changed."""
+    config = poetry._Config()
+    path = Path("pyproject.toml")
+    path.write_text(path.read_text().replace("^3.0.0", "^3.1.0"))
+    config.refresh()
+    assert get_dependency(config, package.name) == "^3.1.0"
+
+
+def test_load_config_reuses_config(package: poetry.Package, repository: Path) -> None:
+    """It returns the same configuration, reflecting its own writes."""
+    with poetry._load_config() as config:
+        config.update_constraint(package)
+
+    assert poetry._load_config() is config
+    assert get_dependency(poetry._Config(), package.name) == "^3.5.1"
+
+
+def test_default_source(repository: Path) -> None:
+    """It returns the URL of the default package source."""
+    with Path("pyproject.toml").open(mode="a") as io:
+        io.write(
+            """
+[[tool.poetry.source]]
+name = "extra"
+url = "https://example.com/extra/simple/"
+secondary = true
+
+[[tool.poetry.source]]
+name = "mirror"
+url = "https://example.com/simple/"
+default = true
+"""
+        )
+    assert poetry.default_source() == "https://example.com/simple/"
+
+
+def test_constraints_missing(repository: Path) -> None:
+    """It returns None for packages which are not direct dependencies."""
+    assert poetry.constraints("surprise") is None
+
+
+def test_default_source_missing(repository: Path) -> None:
+    """It returns None if no default package source is configured."""
+    assert poetry.default_source() is None
+
+
+@pytest.mark.parametrize(
+    "declaration,expected",
+    [
+        ('marshmallow = "^3.0.0"', ["^3.5.1"]),
+        (
+            "marshmallow = "
+            '{ version = "^3.0.0", markers = "python_version < \'3.8\'" }',
+            ["^3.5.1"],
+        ),
+        (
+            '[tool.poetry.group.test.dependencies.marshmallow]\nversion = "^3.0.0"',
+            ["^3.5.1"],
+        ),
+        (
+            'marshmallow = [{ version = "^3.0.0", python = "<3.8" },'
+            ' { version = "^3.1.0", python = ">=3.8" }]',
+            ["^3.0.0", "^3.1.0"],
+        ),
+    ],
+    ids=["string", "inline-table", "group-table", "array"],
+)
+def test_update_constraints(
+    package: poetry.Package, repository: Path, declaration: str, expected: List[str]
+) -> None:
+    """It edits constraints in place, or falls back to the TOML parser."""
+    Path("pyproject.toml").write_text(
+        f'[tool.poetry.dependencies]\npython = "^3.6"\n{declaration}\n'
+    )
+    poetry._update_constraints([package])
+    assert poetry.constraints(package.name) == expected
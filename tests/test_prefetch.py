@@ -0,0 +1,190 @@
+"""Tests for prefetch module."""
+import hashlib
+import json
+from pathlib import Path
+from typing import List
+
+from _pytest.monkeypatch import MonkeyPatch
+import pytest
+
+from poetry_up import lockfile, poetry, prefetch
+
+
+@pytest.fixture
+def file_index(tmp_path: Path) -> str:
+    """Package index in the local filesystem, returning its URL."""
+    files = tmp_path / "files"
+    files.mkdir()
+    filenames = [
+        "marshmallow-3.5.1-py2.py3-none-any.whl",
+        "marshmallow-3.5.1.tar.gz",
+        "marshmallow-3.6.0-py2.py3-none-any.whl",
+    ]
+    for filename in filenames:
+        (files / filename).write_text(filename)
+
+    hashes = {
+        filename: hashlib.sha256(filename.encode()).hexdigest()
+        for filename in filenames
+    }
+
+    project = tmp_path / "simple" / "marshmallow"
+    project.mkdir(parents=True)
+    anchors = "".join(
+        f'<a href="../../files/{filename}#sha256={hashes[filename]}">{filename}</a>'
+        for filename in filenames
+    )
+    (project / "index.html").write_text(f"<html><body>{anchors}</body></html>")
+    return (tmp_path / "simple").as_uri() + "/"
+
+
+def test_poetry_cache_directory(monkeypatch: MonkeyPatch, tmp_path: Path) -> None:
+    """It honors POETRY_CACHE_DIR."""
+    monkeypatch.setenv("POETRY_CACHE_DIR", str(tmp_path))
+    assert prefetch.poetry_cache_directory() == tmp_path
+
+
+@pytest.mark.parametrize(
+    "platform,variable,expected",
+    [
+        ("linux", "XDG_CACHE_HOME", "pypoetry"),
+        ("win32", "LOCALAPPDATA", "pypoetry/Cache"),
+        ("darwin", "HOME", "Library/Caches/pypoetry"),
+    ],
+)
+def test_poetry_cache_directory_default(
+    monkeypatch: MonkeyPatch,
+    tmp_path: Path,
+    platform: str,
+    variable: str,
+    expected: str,
+) -> None:
+    """It returns the default cache directory of Poetry on the platform."""
+    monkeypatch.delenv("POETRY_CACHE_DIR", raising=False)
+    monkeypatch.setenv(variable, str(tmp_path))
+    monkeypatch.setattr("sys.platform", platform)
+    assert prefetch.poetry_cache_directory() == tmp_path / expected
+
+
+def test_artifact_directory(tmp_path: Path) -> None:
+    """It keys artifacts by the URL and the hash in its fragment."""
+    url = "https://example.com/foo-1.0.tar.gz"
+    directory = prefetch.artifact_directory(tmp_path, url)
+    parts = directory.relative_to(tmp_path / "artifacts").parts
+    assert [len(part) for part in parts] == [2, 2, 2, 58]
+    assert directory != prefetch.artifact_directory(tmp_path, f"{url}#sha256=0")
+
+
+@pytest.mark.parametrize(
+    "filenames,expected",
+    [
+        (["foo-1.0-py3-none-any.whl", "foo-1.0.tar.gz"], ["foo-1.0-py3-none-any.whl"]),
+        (["foo-1.0-cp38-cp38-manylinux1_x86_64.whl", "foo-1.0.tar.gz"], []),
+        (["foo-1.0.tar.gz", "foo-0.9.tar.gz"], ["foo-1.0.tar.gz"]),
+    ],
+)
+def test_select_files(filenames: List[str], expected: List[str]) -> None:
+    """It selects pure wheels, or source distributions if there are no wheels."""
+    files = [(filename, filename, False) for filename in filenames]
+    selected = prefetch.select_files(files, "foo", "1.0")
+    assert [filename for filename, _ in selected] == expected
+
+
+def test_prefetch(file_index: str, tmp_path: Path) -> None:
+    """It downloads the new version into the artifact cache."""
+    cache = tmp_path / "cache"
+    packages = [
+        poetry.Package("marshmallow", "3.0.0", "3.5.1"),
+        poetry.Package("missing", "1.0.0", "2.0.0"),
+    ]
+    locked = [lockfile.LockedPackage("marshmallow", "3.0.0")]
+    [path] = prefetch.prefetch(packages, file_index, locked, cache)
+
+    assert path.name == "marshmallow-3.5.1-py2.py3-none-any.whl"
+    assert path.read_text() == path.name
+    digest = hashlib.sha256(path.name.encode()).hexdigest()
+    assert path.parent == prefetch.artifact_directory(
+        cache, f"{(tmp_path / 'files' / path.name).as_uri()}#sha256={digest}"
+    )
+    assert prefetch.prefetch(packages, file_index, locked, cache) == [path]
+
+
+def test_prefetch_defaults(
+    file_index: str, repository: Path, monkeypatch: MonkeyPatch, tmp_path: Path
+) -> None:
+    """It reads the lock file, and downloads into the cache directory of Poetry."""
+    monkeypatch.setenv("POETRY_CACHE_DIR", str(tmp_path / "cache"))
+    packages = [poetry.Package("marshmallow", "3.0.0", "3.5.1")]
+    [path] = prefetch.prefetch(packages, file_index)
+    assert (tmp_path / "cache" / "artifacts") in path.parents
+
+
+@pytest.mark.parametrize(
+    "fragment",
+    [
+        "",
+        "#blake3=0",
+        "#sha256=",
+        "#shake_128=0",
+        f"#md5={hashlib.md5(b'data').hexdigest()}",  # noqa: S303
+        f"#sha256={hashlib.sha256(b'data').hexdigest().upper()}",
+    ],
+)
+def test_verify(fragment: str) -> None:
+    """It accepts matching digests, and files without a usable hash."""
+    prefetch._verify(f"https://example.com/foo-1.0.tar.gz{fragment}", b"data")
+
+
+@pytest.fixture
+def json_index(monkeypatch: MonkeyPatch) -> str:
+    """Package index serving a JSON page with a single wheel, returning its URL."""
+    url = "https://example.com/simple/"
+    file_url = "https://example.com/files/marshmallow-3.5.1-py2.py3-none-any.whl"
+    page = {
+        "meta": {"api-version": "1.0"},
+        "files": [
+            {
+                "filename": "marshmallow-3.5.1-py2.py3-none-any.whl",
+                "url": file_url,
+                "hashes": {"sha256": hashlib.sha256(b"wheel").hexdigest()},
+            }
+        ],
+    }
+    responses = {
+        f"{url}marshmallow/": (
+            200,
+            "application/vnd.pypi.simple.v1+json",
+            json.dumps(page).encode(),
+        ),
+        file_url: (200, "application/octet-stream", b"wheel"),
+    }
+    monkeypatch.setattr("poetry_up.index.Index._get", lambda self, url: responses[url])
+    return url
+
+
+def test_prefetch_json(json_index: str, tmp_path: Path) -> None:
+    """It keys files listed in JSON by the hash from the response."""
+    cache = tmp_path / "cache"
+    packages = [poetry.Package("marshmallow", "3.0.0", "3.5.1")]
+    locked = [lockfile.LockedPackage("marshmallow", "3.0.0")]
+    [path] = prefetch.prefetch(packages, json_index, locked, cache)
+
+    file_url = "https://example.com/files/marshmallow-3.5.1-py2.py3-none-any.whl"
+    digest = hashlib.sha256(b"wheel").hexdigest()
+    assert path.read_bytes() == b"wheel"
+    assert path.parent == prefetch.artifact_directory(
+        cache, f"{file_url}#sha256={digest}"
+    )
+
+
+def test_prefetch_rejects_hash_mismatch(
+    json_index: str, tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    """It does not write files which do not match the hash from the index."""
+    monkeypatch.setattr("poetry_up.index.Index.download", lambda self, url: b"wh")
+    cache = tmp_path / "cache"
+    packages = [poetry.Package("marshmallow", "3.0.0", "3.5.1")]
+    locked = [lockfile.LockedPackage("marshmallow", "3.0.0")]
+
+    assert prefetch.prefetch(packages, json_index, locked, cache) == []
+    assert not [path for path in cache.rglob("*") if path.is_file()]
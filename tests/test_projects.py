@@ -0,0 +1,202 @@
+"""Tests for projects module."""
+from pathlib import Path
+import shutil
+import subprocess  # noqa: S404
+from typing import Any, Dict, Iterator, List
+
+from _pytest.capture import CaptureFixture
+from _pytest.monkeypatch import MonkeyPatch
+import click
+import pytest
+
+from poetry_up import git, lockfile, poetry, projects, update
+
+
+def create_project(directory: Path, lock: bool = True) -> None:
+    """Create a minimal Poetry project."""
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "pyproject.toml").write_text('[tool.poetry]\nname = "example"\n')
+    if lock:
+        (directory / "poetry.lock").write_text("")
+
+
+def test_discover(tmp_path: Path) -> None:
+    """It finds Poetry projects with a lock file, skipping hidden directories."""
+    create_project(tmp_path)
+    create_project(tmp_path / "libs" / "a")
+    create_project(tmp_path / "libs" / "b", lock=False)
+    create_project(tmp_path / ".hidden")
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "pyproject.toml").write_text("[tool.black]\n")
+    (tmp_path / "other" / "poetry.lock").write_text("")
+
+    assert projects.discover(tmp_path) == [tmp_path, tmp_path / "libs" / "a"]
+
+
+def test_report() -> None:
+    """It lists the outcome of every package update, per project."""
+    results = [
+        projects.ProjectResult(".", [("click 8.0", "updated")]),
+        projects.ProjectResult("libs/a", error="boom"),
+        projects.ProjectResult("libs/b"),
+    ]
+    assert projects.report(results).splitlines() == [
+        "Project  Package    Outcome",
+        ".        click 8.0  updated",
+        "libs/a   -          error: boom",
+        "libs/b   -          up to date",
+    ]
+
+
+@pytest.fixture
+def monorepo(repository: Path, shared_datadir: Path, monkeypatch: MonkeyPatch) -> Path:
+    """Repository with a second project in a subdirectory."""
+    subproject = repository / "libs" / "a"
+    subproject.mkdir(parents=True)
+    for filename in ["pyproject.toml", "poetry.lock"]:
+        shutil.copy(repository / filename, subproject / filename)
+    git.add(["libs"])
+    git.commit("Add subproject")
+
+    def stub_show_outdated() -> List[poetry.Package]:
+        return [poetry.Package("marshmallow", "3.0.0", "3.5.1")]
+
+    def stub_update(package: poetry.Package, lock: bool, latest: bool) -> None:
+        source = shared_datadir / "poetry.lock.new"
+        Path("poetry.lock").write_text(source.read_text())
+
+    monkeypatch.setattr("poetry_up.poetry.show_outdated", stub_show_outdated)
+    monkeypatch.setattr("poetry_up.poetry.update", stub_update)
+    return repository
+
+
+def options(**kwargs: object) -> update.Options:
+    """Return options for the update operation."""
+    return update.Options(
+        latest=True,
+        install=False,
+        commit=True,
+        push=False,
+        merge_request=False,
+        pull_request=False,
+        upstream="master",
+        remote="origin",
+        dry_run=False,
+        packages=(),
+        **kwargs,  # type: ignore[arg-type]
+    )
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"jobs": 2, "checkout": False}])
+def test_run(monorepo: Path, capsys: CaptureFixture, kwargs: dict) -> None:
+    """It updates every project on its own branch, and reports the outcomes."""
+    projects.run(monorepo, options(**kwargs))
+
+    assert git.branch_exists("poetry-up/marshmallow-3.5.1")
+    assert git.branch_exists("poetry-up/libs/a/marshmallow-3.5.1")
+    assert git.current_branch() == "master"
+    assert git.is_clean()
+
+    output = capsys.readouterr().out
+    assert "libs/a   marshmallow 3.5.1  updated" in output
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"jobs": 2, "checkout": False}])
+def test_run_reports_listing_errors(
+    monorepo: Path, capsys: CaptureFixture, monkeypatch: MonkeyPatch, kwargs: dict
+) -> None:
+    """It updates the other projects if listing outdated packages fails."""
+
+    def stub_show_outdated() -> List[poetry.Package]:
+        if Path.cwd().name == "a":
+            raise subprocess.CalledProcessError(1, ["poetry", "show"])
+        return [poetry.Package("marshmallow", "3.0.0", "3.5.1")]
+
+    monkeypatch.setattr("poetry_up.poetry.show_outdated", stub_show_outdated)
+
+    with pytest.raises(click.ClickException, match="Updating failed for libs/a"):
+        projects.run(monorepo, options(**kwargs))
+
+    assert git.branch_exists("poetry-up/marshmallow-3.5.1")
+    assert not git.branch_exists("poetry-up/libs/a/marshmallow-3.5.1")
+
+    output = capsys.readouterr().out
+    assert "libs/a   -                  error: CalledProcessError:" in output
+
+
+def test_run_reports_update_errors(
+    monorepo: Path, capsys: CaptureFixture, monkeypatch: MonkeyPatch
+) -> None:
+    """It updates the other projects if updating a project fails."""
+    run = update.Updater.run
+
+    def stub_run(self: update.Updater) -> None:
+        if Path.cwd().name == "a":
+            raise click.ClickException("boom")
+        run(self)
+
+    monkeypatch.setattr("poetry_up.update.Updater.run", stub_run)
+
+    with pytest.raises(click.ClickException, match="Updating failed for libs/a"):
+        projects.run(monorepo, options())
+
+    assert git.branch_exists("poetry-up/marshmallow-3.5.1")
+    assert "libs/a   -                  error: boom" in capsys.readouterr().out
+
+
+def test_run_ndjson(monorepo: Path, capsys: CaptureFixture) -> None:
+    """It does not print the report table in NDJSON format."""
+    projects.run(monorepo, options(output_format="ndjson"))
+    assert "Project" not in capsys.readouterr().out
+
+
+def test_run_fails_on_dirty_worktree(monorepo: Path) -> None:
+    """It fails if the working tree is not clean."""
+    Path("poetry.lock").write_text("")
+    with pytest.raises(click.ClickException, match="Working tree is not clean"):
+        projects.run(monorepo, options())
+
+
+def test_run_natively(monorepo: Path, monkeypatch: MonkeyPatch) -> None:
+    """It shares the index clients between projects, reporting errors."""
+    calls: List[Dict[str, Any]] = []
+
+    def stub_show_outdated(
+        url: str, packages: List[lockfile.LockedPackage], indexes: Dict[str, Any]
+    ) -> Iterator[poetry.Package]:
+        calls.append(indexes)
+        if Path.cwd().name != "a":
+            yield poetry.Package("marshmallow", "3.0.0", "3.5.1")
+
+    monkeypatch.setattr("poetry_up.index.show_outdated", stub_show_outdated)
+
+    projects.run(monorepo, options(native=True))
+
+    assert git.branch_exists("poetry-up/marshmallow-3.5.1")
+    assert len(calls) == 2 and calls[0] is calls[1]
+
+
+def test_run_reports_native_listing_errors(
+    monorepo: Path, monkeypatch: MonkeyPatch
+) -> None:
+    """It reports a project whose outdated packages could not be listed."""
+    (monorepo / "libs" / "a" / "poetry.lock").write_text("[[package]\n")
+    git.add(["libs"])
+    git.commit("Break lock file")
+    monkeypatch.setattr(
+        "poetry_up.index.show_outdated",
+        lambda url, packages, indexes: [
+            poetry.Package("marshmallow", "3.0.0", "3.5.1")
+        ],
+    )
+
+    with pytest.raises(click.ClickException, match="Updating failed for libs/a"):
+        projects.run(monorepo, options(native=True))
+
+    assert git.branch_exists("poetry-up/marshmallow-3.5.1")
+
+
+def test_run_without_projects(tmp_path: Path) -> None:
+    """It fails if there are no Poetry projects."""
+    with pytest.raises(click.ClickException):
+        projects.run(tmp_path, options())
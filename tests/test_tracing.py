@@ -0,0 +1,108 @@
+"""Tests for tracing module."""
+import json
+from pathlib import Path
+import subprocess  # noqa: S404
+import sys
+from typing import Iterator
+
+import pytest
+
+from poetry_up import tracing
+
+
+@pytest.fixture
+def profiler() -> Iterator[tracing.Profiler]:
+    """Enabled profiler."""
+    profiler = tracing.enable()
+    yield profiler
+    tracing.disable()
+
+
+def test_span_disabled() -> None:
+    """It records nothing if profiling is disabled."""
+    with tracing.span("Update", package="marshmallow") as args:
+        assert args == {"package": "marshmallow"}
+
+
+def test_span_records_commands(profiler: tracing.Profiler) -> None:
+    """It records commands with their exit status in the enclosing span."""
+    with tracing.span("Update", package="marshmallow"):
+        tracing.run(["git", "--version"], check=True, capture_output=True)
+        with pytest.raises(subprocess.CalledProcessError):
+            tracing.run(["git", "surprise"], check=True, capture_output=True)
+
+    first, second, action = profiler.spans
+    assert first.category == second.category == "command"
+    assert first.name == "git --version"
+    assert second.args["returncode"] != 0
+    assert [command["returncode"] for command in action.args["commands"]] == [
+        0,
+        second.args["returncode"],
+    ]
+
+
+def test_span_records_commands_without_status(profiler: tracing.Profiler) -> None:
+    """It records commands which did not run to completion without a status."""
+    with tracing.span("Update", package="marshmallow"):
+        with pytest.raises(FileNotFoundError):
+            tracing.run(["poetry-up-missing-command"])
+
+    _, action = profiler.spans
+    [command] = action.args["commands"]
+    assert command["command"] == ["poetry-up-missing-command"]
+    assert "returncode" not in command
+
+
+def test_write(profiler: tracing.Profiler, tmp_path: Path) -> None:
+    """It writes the spans in Chrome trace event format."""
+    with tracing.span("Switch", package="marshmallow"):
+        pass
+
+    path = tmp_path / "trace.json"
+    profiler.write(path)
+
+    [event] = json.loads(path.read_text())["traceEvents"]
+    assert event["name"] == "Switch"
+    assert event["ph"] == "X"
+    assert event["ts"] == 0
+
+
+def test_summary(profiler: tracing.Profiler) -> None:
+    """It returns a table with a row per package and a column per action."""
+    for package in ["marshmallow", "click"]:
+        with tracing.span("Update", package=package):
+            pass
+    with tracing.span("Push", package="click"):
+        pass
+    tracing.run(["git", "--version"], capture_output=True)
+
+    header, first, second = profiler.summary().splitlines()
+    assert header.split() == ["Package", "Update", "Push", "Total"]
+    assert first.split()[0] == "marshmallow"
+    assert first.split()[2] == "-"
+    assert second.split()[0] == "click"
+
+
+def test_stream(profiler: tracing.Profiler) -> None:
+    """It yields the output lines and records the command."""
+    lines = list(tracing.stream(["git", "--version"]))
+    assert lines[0].startswith("git version")
+    [span] = profiler.spans
+    assert span.args["returncode"] == 0
+
+
+def test_stream_error() -> None:
+    """It raises an exception if the command fails."""
+    with pytest.raises(subprocess.CalledProcessError):
+        list(tracing.stream(["git", "surprise"]))
+
+
+def test_stream_large_error_output() -> None:
+    """It does not block if the command writes a lot to standard error."""
+    code = "import sys; sys.stderr.write('x' * 200000); print('done'); sys.exit(1)"
+    lines = []
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        for line in tracing.stream([sys.executable, "-c", code]):
+            lines.append(line)
+    assert lines == ["done\n"]
+    assert len(excinfo.value.stderr) == 200000
@@ -1,12 +1,179 @@
 """Tests for update module."""
-from poetry_up import poetry, update
+import os
+from pathlib import Path
+import subprocess  # noqa: S404
+from typing import Callable, List
+
+from _pytest.capture import CaptureFixture
+import click
+import pytest
+
+from poetry_up import lockfile, poetry, update
+
+
+def options(**kwargs: object) -> update.Options:
+    """Return options for the update operation."""
+    return update.Options(
+        latest=True,
+        install=True,
+        commit=True,
+        push=False,
+        merge_request=False,
+        pull_request=False,
+        upstream="master",
+        remote="origin",
+        dry_run=False,
+        packages=(),
+        **kwargs,  # type: ignore[arg-type]
+    )
 
 
 def test_actions_are_required_by_default(package: poetry.Package) -> None:
     """It returns True by default."""
+    updater = update.PackageUpdater(package, options(), "master")
+    assert update.Action(updater).required
+
+
+def test_package_updater_loads_refs(repository: Path, package: poetry.Package) -> None:
+    """It reads the local branches when first needed."""
+    updater = update.PackageUpdater(package, options(), "master")
+    refs = updater.refs
+    assert refs.current_branch() == "master"
+    assert updater.refs is refs
+
+
+def test_package_updater_fetches_pull_requests(
+    package: poetry.Package, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """It fetches the open pull requests when first needed."""
+    monkeypatch.setattr("poetry_up.github.open_pull_requests", lambda: {"topic"})
+    updater = update.PackageUpdater(package, options(), "master")
+    assert updater.pull_requests == {"topic"}
+
+
+def test_package_updater_without_journal(package: poetry.Package) -> None:
+    """It does not record steps if there is no journal."""
+    updater = update.PackageUpdater(package, options(), "master")
+    updater.record("pushed")
+    assert not updater.done("pushed")
+
+
+def test_describe_changes(package: poetry.Package) -> None:
+    """It lists added, removed, and changed packages other than the update."""
+    changes = [
+        lockfile.Change("marshmallow", "3.0.0", "3.5.1"),
+        lockfile.Change("six", None, "1.15.0"),
+        lockfile.Change("idna", "2.9", None),
+        lockfile.Change("urllib3", "1.25.8", "1.25.9"),
+    ]
+    assert update._describe_changes(changes, [package]).splitlines() == [
+        "Other changes to poetry.lock:",
+        "",
+        "- six: added 1.15.0",
+        "- idna: removed 2.9",
+        "- urllib3: 1.25.8 → 1.25.9",
+    ]
+
+
+def test_pipeline_runs_tasks_in_order() -> None:
+    """It runs the tasks in submission order."""
+    results: List[int] = []
+
+    def task(number: int) -> Callable[[], None]:
+        return lambda: results.append(number)
+
+    pipeline = update.Pipeline(maxsize=1)
+    for number in range(3):
+        pipeline.submit(str(number), task(number))
+    pipeline.join()
+    pipeline.check()
+    assert results == [0, 1, 2]
+
+
+def test_pipeline_reports_errors() -> None:
+    """It raises an exception after all tasks have run."""
+
+    def fail() -> None:
+        raise RuntimeError("boom")
+
+    results: List[int] = []
+    pipeline = update.Pipeline()
+    pipeline.submit("first", fail)
+    pipeline.submit("second", lambda: results.append(2))
+    pipeline.join()
+
+    with pytest.raises(click.ClickException, match="first"):
+        pipeline.check()
+
+    assert results == [2]
+
+
+@pytest.fixture
+def locked_packages() -> List[lockfile.LockedPackage]:
+    """Locked packages with a dependent of marshmallow."""
+    return [
+        lockfile.LockedPackage("marshmallow", "3.0.0"),
+        lockfile.LockedPackage(
+            "marshmallow-enum", "1.5.1", dependencies={"marshmallow": [">=2.0,<3.2"]}
+        ),
+    ]
+
+
+def test_preflight_rejects_locked_dependent(
+    package: poetry.Package, locked_packages: List[lockfile.LockedPackage]
+) -> None:
+    """It reports a locked package excluding the new version."""
+    preflight = update.Preflight(latest=True, packages=locked_packages)
+    assert preflight.check(package) == "marshmallow-enum 1.5.1 requires >=2.0,<3.2"
+
+
+def test_preflight_ignores_invalid_versions(
+    locked_packages: List[lockfile.LockedPackage],
+) -> None:
+    """It assumes that updates to versions it cannot parse may succeed."""
+    preflight = update.Preflight(latest=True, packages=locked_packages)
+    package = poetry.Package("marshmallow", "3.0.0", "not a version")
+    assert preflight.check(package) is None
+
+
+def test_preflight_ignores_dependents_updated_along(
+    package: poetry.Package, locked_packages: List[lockfile.LockedPackage]
+) -> None:
+    """It ignores dependents which are updated as well."""
+    preflight = update.Preflight(latest=True, packages=locked_packages)
+    assert preflight.check(package, updating={"marshmallow-enum"}) is None
+
+
+def test_preflight_rejects_declared_constraint(
+    repository: Path, package: poetry.Package
+) -> None:
+    """It reports a constraint in pyproject.toml excluding the new version."""
+    preflight = update.Preflight(latest=False, packages=[])
+    new_package = poetry.Package(package.name, package.old_version, "4.0.0")
+    assert preflight.check(package) is None
+    assert preflight.check(new_package) == "pyproject.toml requires ^3.0.0"
+
+
+def test_updater_watch_skips_seen_packages(
+    repository: Path, package: poetry.Package, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """It lists outdated packages on every run, but updates each version once."""
+    listings: List[None] = []
+    updates: List[poetry.Package] = []
+
+    def stub_show_outdated() -> List[poetry.Package]:
+        listings.append(None)
+        return [package]
+
+    monkeypatch.setattr("poetry_up.poetry.show_outdated", stub_show_outdated)
+    monkeypatch.setattr(
+        "poetry_up.poetry.update",
+        lambda package, lock, latest: updates.append(package),
+    )
+
     options = update.Options(
         latest=True,
-        install=True,
+        install=False,
         commit=True,
         push=False,
         merge_request=False,
@@ -15,6 +182,81 @@ def test_actions_are_required_by_default(package: poetry.Package) -> None:
         remote="origin",
         dry_run=False,
         packages=(),
+        watch=0.01,
     )
-    updater = update.PackageUpdater(package, options, "master")
-    assert update.Action(updater).required
+    update.Updater(options).watch(cycles=2)
+    assert len(listings) == 2
+    assert updates == [package]
+
+
+def test_updater_watch_retries_failed_packages(
+    repository: Path, package: poetry.Package, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """It reports errors without exiting, and retries the failed version."""
+    updates: List[poetry.Package] = []
+
+    def stub_update(package: poetry.Package, lock: bool, latest: bool) -> None:
+        updates.append(package)
+        raise subprocess.CalledProcessError(1, ["poetry", "update"])
+
+    monkeypatch.setattr("poetry_up.poetry.show_outdated", lambda: [package])
+    monkeypatch.setattr("poetry_up.poetry.update", stub_update)
+
+    options = update.Options(
+        latest=True,
+        install=False,
+        commit=True,
+        push=False,
+        merge_request=False,
+        pull_request=False,
+        upstream="master",
+        remote="origin",
+        dry_run=False,
+        packages=(),
+        watch=0.01,
+    )
+    update.Updater(options).watch(cycles=2)
+    assert updates == [package, package]
+
+
+def test_updater_watch_reports_errors(repository: Path, capsys: CaptureFixture) -> None:
+    """It reports failed runs without exiting, even without a lock file."""
+    Path("poetry.lock").unlink()
+    update.Updater(options(watch=0.01)).watch(cycles=2)
+    assert capsys.readouterr().err.count("Working tree is not clean") == 2
+
+
+def test_updater_watch_reconsiders_packages_when_lock_changes(
+    repository: Path, package: poetry.Package, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """It updates a version seen before if poetry.lock changes on disk."""
+    updates: List[poetry.Package] = []
+
+    def stub_update(package: poetry.Package, lock: bool, latest: bool) -> None:
+        updates.append(package)
+        path = Path("poetry.lock")
+        text = path.read_text().replace('version = "3.0.0"', 'version = "3.5.1"', 1)
+        path.write_text(text)
+
+    def stub_sleep(seconds: float) -> None:
+        os.utime("poetry.lock", ns=(0, 0))
+
+    monkeypatch.setattr("poetry_up.poetry.show_outdated", lambda: [package])
+    monkeypatch.setattr("poetry_up.poetry.update", stub_update)
+    monkeypatch.setattr("poetry_up.update.time.sleep", stub_sleep)
+
+    options = update.Options(
+        latest=True,
+        install=False,
+        commit=True,
+        push=False,
+        merge_request=False,
+        pull_request=False,
+        upstream="master",
+        remote="origin",
+        dry_run=False,
+        packages=(),
+        watch=60,
+    )
+    update.Updater(options).watch(cycles=2)
+    assert updates == [package, package]
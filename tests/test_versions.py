@@ -0,0 +1,116 @@
+"""Tests for versions module."""
+import pytest
+
+from poetry_up import versions
+
+
+@pytest.mark.parametrize(
+    "lower,higher",
+    [
+        ("1.0", "1.1"),
+        ("1.0.dev0", "1.0a1"),
+        ("1.0a1", "1.0b1"),
+        ("1.0b2", "1.0rc1"),
+        ("1.0rc1", "1.0"),
+        ("1.0", "1.0.post1"),
+        ("1.0", "1.0+local"),
+        ("1.0+abc", "1.0+1"),
+        ("1.0.post1.dev0", "1.0.post1"),
+        ("2.0", "1!1.0"),
+        ("1.9", "1.10"),
+    ],
+)
+def test_ordering(lower: str, higher: str) -> None:
+    """It orders versions according to PEP 440."""
+    assert versions.Version(lower) < versions.Version(higher)
+
+
+@pytest.mark.parametrize(
+    "first,second", [("1.0", "1.0.0"), ("1.0alpha1", "1.0a1"), ("1.0-1", "1.0.post1")]
+)
+def test_equality(first: str, second: str) -> None:
+    """It normalizes equivalent versions."""
+    assert versions.Version(first) == versions.Version(second)
+    assert hash(versions.Version(first)) == hash(versions.Version(second))
+
+
+def test_equality_other_type() -> None:
+    """It does not compare equal to strings."""
+    assert versions.Version("1.0") != "1.0"
+
+
+@pytest.mark.parametrize(
+    "text,expected", [("1.0", False), ("1.0rc1", True), ("1.0.dev1", True)]
+)
+def test_is_prerelease(text: str, expected: bool) -> None:
+    """It detects pre-releases and development releases."""
+    assert versions.Version(text).is_prerelease is expected
+
+
+def test_parse_invalid() -> None:
+    """It returns None for invalid versions."""
+    assert versions.parse("surprise") is None
+
+
+def test_str() -> None:
+    """It returns the original version string."""
+    version = versions.Version("1.0-1")
+    assert str(version) == "1.0-1"
+    assert repr(version) == "Version('1.0-1')"
+
+
+@pytest.mark.parametrize(
+    "constraint,version",
+    [
+        ("*", "1.0"),
+        ("^3.0", "3.5.1"),
+        ("^0.2.3", "0.2.9"),
+        ("^0.0.3", "0.0.3"),
+        ("~1.2", "1.2.9"),
+        ("~=1.4", "1.9"),
+        (">=1.0,<2.0", "1.5"),
+        (">= 1.0 < 2.0", "1.5"),
+        ("1.2.*", "1.2.7"),
+        ("==1.0", "1.0.0"),
+        ("1.0", "1.0"),
+        ("!=1.1", "1.0"),
+        ("^1.0 || ^2.0", "2.5"),
+        ("===1.0", "1.0"),
+    ],
+)
+def test_constraint_allows(constraint: str, version: str) -> None:
+    """It allows versions satisfying the constraint."""
+    assert versions.Constraint(constraint).allows(versions.Version(version))
+
+
+@pytest.mark.parametrize(
+    "constraint,version",
+    [
+        ("^3.0", "4.0"),
+        ("^0.2.3", "0.3.0"),
+        ("^0.0.3", "0.0.4"),
+        ("~1.2", "1.3"),
+        ("~=1.4.5", "1.5"),
+        (">=1.0,<2.0", "2.0a1"),
+        ("!=1.2.*", "1.2.7"),
+        ("<1.0", "1.0"),
+        ("^1.0 || ^2.0", "3.0"),
+        ("===1.0", "1.0.0"),
+    ],
+)
+def test_constraint_excludes(constraint: str, version: str) -> None:
+    """It excludes versions not satisfying the constraint."""
+    assert not versions.Constraint(constraint).allows(versions.Version(version))
+
+
+def test_constraint_str() -> None:
+    """It converts to the constraint string, and shows it in its representation."""
+    constraint = versions.Constraint(">=1.0, <2.0")
+    assert str(constraint) == ">=1.0, <2.0"
+    assert repr(constraint) == "Constraint('>=1.0, <2.0')"
+
+
+@pytest.mark.parametrize("constraint", ["foo", ">=<1.0", "~=1", "^1.*"])
+def test_parse_constraint_invalid(constraint: str) -> None:
+    """It returns None for unsupported constraints."""
+    assert versions.parse_constraint(constraint) is None